@@ -0,0 +1,220 @@
+"""Catálogo de sintomas guardado no banco e a extração dos sintomas de um texto.
+
+As tabelas são criadas pelo create_database.py e podem ser ampliadas sem
+reiniciar o agente:
+  - `sintomas`: um sintoma por linha, com a especialidade sugerida na urgência
+    média e a prioridade (na urgência média, o primeiro sintoma com
+    especialidade define o especialista);
+  - `sintoma_dicas`: as dicas de cada sintoma, em ordem;
+  - `sinonimos`: as palavras e expressões que indicam cada sintoma. Gatilhos
+    mantêm o índice FTS5 `sinonimos_busca`, sem acentos e sem diferença de
+    maiúsculas, com um marcador colado ao fim de cada sinônimo.
+
+Um sinônimo está no texto se for igual a uma sequência de palavras seguidas do
+texto. A consulta FTS5 pede, de uma vez, cada sequência de até `palavras_max`
+palavras como frase no início do sinônimo e terminada pelo marcador
+(`^"dor de cabecazzfim"`), então o índice devolve só os sinônimos que batem
+por inteiro: nem o catálogo é percorrido, nem sobram candidatos para conferir.
+Sinônimos terminados em "*" são radicais: para eles, a consulta pede também
+cada sequência com a última palavra cortada nos tamanhos dos radicais do
+catálogo (`^"vomitzzraiz"` para "vomitou"). Como a consulta cresce com o
+texto, só as primeiras `palavras_max_texto` palavras são consideradas.
+
+As consultas usam parâmetros fixos (o `sqlite3` mantém as instruções preparadas
+em cache por conexão, uma conexão por thread) e os resultados ficam em caches
+LRU no processo. Os caches são esvaziados quando o banco muda, com a mesma
+verificação espaçada do `IndiceMedicos`.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from comum.palavras_chave import normalizar_texto
+from create_database import MARCADOR_FIM_TERMO, MARCADOR_RADICAL, SUFIXO_RADICAL
+
+# Mesmo critério do tokenizador `unicode61` do FTS5, aplicado ao texto já sem acentos.
+PALAVRA = re.compile(r"[a-z0-9]+")
+
+CONSULTA_SINONIMOS = (
+    "SELECT DISTINCT sinonimos.sintoma FROM sinonimos_busca "
+    "JOIN sinonimos ON sinonimos.id = sinonimos_busca.rowid WHERE sinonimos_busca MATCH ?"
+)
+CONSULTA_TERMOS = "SELECT termo FROM sinonimos"
+CONSULTA_SINTOMA = "SELECT especialidade, prioridade FROM sintomas WHERE id = ?"
+CONSULTA_DICAS = "SELECT dica FROM sintoma_dicas WHERE sintoma = ? ORDER BY ordem"
+CONSULTA_SINTOMAS_COM_DICAS = (
+    "SELECT id FROM sintomas WHERE id IN (SELECT sintoma FROM sintoma_dicas) ORDER BY prioridade, id"
+)
+TABELAS_CATALOGO = {"sintomas", "sintoma_dicas", "sinonimos", "sinonimos_busca"}
+# Caracteres lidos do texto por palavra considerada, para não normalizar textos enormes inteiros.
+CARACTERES_POR_PALAVRA = 64
+# Sintomas citados em `sinonimos` sem linha em `sintomas` ficam por último.
+PRIORIDADE_PADRAO = 1_000_000
+
+
+def palavras(texto: str) -> List[str]:
+    return PALAVRA.findall(normalizar_texto(texto))
+
+
+def consulta_fts(sequencia: Sequence[str], palavras_max: int, tamanhos_radical: Iterable[int] = ()) -> str:
+    """Expressão FTS5 que encontra os sinônimos iguais a algum trecho de até `palavras_max` palavras.
+
+    `tamanhos_radical` são os tamanhos (em letras) da última palavra dos radicais do catálogo.
+    """
+    tamanhos_radical = sorted(tamanhos_radical)
+    frases = {}
+    for inicio in range(len(sequencia)):
+        for fim in range(inicio + 1, min(len(sequencia), inicio + palavras_max) + 1):
+            trecho = " ".join(sequencia[inicio:fim])
+            frases[f'^"{trecho}{MARCADOR_FIM_TERMO}"'] = None
+            ultima = sequencia[fim - 1]
+            for tamanho in tamanhos_radical:
+                if tamanho > len(ultima):
+                    break
+                frases[f'^"{trecho[:len(trecho) - len(ultima) + tamanho]}{MARCADOR_RADICAL}"'] = None
+    return " OR ".join(frases)
+
+
+class CatalogoSintomas:
+    """Consultas ao catálogo de sintomas, com cache dos resultados."""
+
+    def __init__(
+        self,
+        caminho_db: str,
+        capacidade_cache: int = 4096,
+        intervalo_verificacao_s: float = 2.0,
+        palavras_max_texto: int = 300,
+    ):
+        self.caminho_db = caminho_db
+        self.intervalo_verificacao_s = intervalo_verificacao_s
+        # Palavras do texto consideradas na extração; o restante é ignorado.
+        self.palavras_max_texto = palavras_max_texto
+        self._local = threading.local()
+        self._trava = threading.Lock()
+        # Muda quando o arquivo é recriado: as conexões das threads são reabertas.
+        self._geracao = 0
+        self._conn_verificacao: Optional[sqlite3.Connection] = None
+        self._assinatura_arquivo: Optional[Tuple[int, int, int]] = None
+        self._versao_dados: Optional[int] = None
+        self._proxima_verificacao = 0.0
+        self.disponivel = False
+        self.total_sinonimos = 0
+        # Palavras do maior sinônimo: trechos maiores do texto nem são consultados.
+        self.palavras_max = 1
+        # Tamanhos da última palavra dos radicais ("vomit*": 5); vazio se o catálogo não tiver radicais.
+        self.tamanhos_radical: Set[int] = set()
+        self.recargas = 0
+        self._extrair = lru_cache(maxsize=capacidade_cache)(self._extrair_sem_cache)
+        self._sintoma = lru_cache(maxsize=capacidade_cache)(self._sintoma_sem_cache)
+        self._dicas = lru_cache(maxsize=capacidade_cache)(self._dicas_sem_cache)
+        self.recarregar()
+
+    def _assinatura(self) -> Tuple[int, int, int]:
+        info = os.stat(self.caminho_db)
+        return info.st_ino, info.st_mtime_ns, info.st_size
+
+    def _conexao(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "geracao", None) != self._geracao:
+            if getattr(local, "conn", None) is not None:
+                local.conn.close()
+            local.conn = sqlite3.connect(self.caminho_db)
+            local.geracao = self._geracao
+        return local.conn
+
+    def recarregar(self) -> None:
+        """Esvazia os caches e relê o estado do catálogo (reabrindo as conexões se o arquivo mudou)."""
+        with self._trava:
+            assinatura = self._assinatura()
+            if self._conn_verificacao is None or assinatura[0] != (self._assinatura_arquivo or (None,))[0]:
+                if self._conn_verificacao is not None:
+                    self._conn_verificacao.close()
+                self._conn_verificacao = sqlite3.connect(self.caminho_db, check_same_thread=False)
+                self._geracao += 1
+            conn = self._conn_verificacao
+            tabelas = {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master")}
+            self.disponivel = TABELAS_CATALOGO <= tabelas
+            self.total_sinonimos, self.palavras_max, self.tamanhos_radical = 0, 1, set()
+            if self.disponivel:
+                for (termo,) in conn.execute(CONSULTA_TERMOS):
+                    self.total_sinonimos += 1
+                    palavras_termo = palavras(termo)
+                    self.palavras_max = max(self.palavras_max, len(palavras_termo))
+                    if termo.strip().endswith(SUFIXO_RADICAL) and palavras_termo:
+                        self.tamanhos_radical.add(len(palavras_termo[-1]))
+            else:
+                print(f"Aviso: '{self.caminho_db}' não tem o catálogo de sintomas; recrie-o com o create_database.py")
+            for cache in (self._extrair, self._sintoma, self._dicas):
+                cache.cache_clear()
+            self.recargas += 1
+            self._assinatura_arquivo = self._assinatura()
+            self._versao_dados = conn.execute("PRAGMA data_version").fetchone()[0]
+            self._proxima_verificacao = time.monotonic() + self.intervalo_verificacao_s
+
+    def verificar_atualizacao(self) -> None:
+        """Esvazia os caches se o banco mudou desde a última carga (verificação barata e espaçada)."""
+        if time.monotonic() < self._proxima_verificacao:
+            return
+        with self._trava:
+            self._proxima_verificacao = time.monotonic() + self.intervalo_verificacao_s
+            try:
+                mudou = self._assinatura() != self._assinatura_arquivo
+                if not mudou:
+                    mudou = self._conn_verificacao.execute("PRAGMA data_version").fetchone()[0] != self._versao_dados
+            except (OSError, sqlite3.Error) as e:
+                print(f"Aviso: não foi possível verificar o catálogo de sintomas: {e}")
+                return
+        if mudou:
+            self.recarregar()
+
+    def extrair(self, texto: str) -> Tuple[str, ...]:
+        """Sintomas citados no texto, em ordem de prioridade."""
+        self.verificar_atualizacao()
+        # O cache guarda as palavras já normalizadas e cortadas, e não o texto: cada entrada tem
+        # tamanho limitado, e textos que só diferem em acentos, maiúsculas ou pontuação a compartilham.
+        limite = self.palavras_max_texto
+        return self._extrair(tuple(palavras(texto[:limite * CARACTERES_POR_PALAVRA])[:limite]))
+
+    def _extrair_sem_cache(self, sequencia: Tuple[str, ...]) -> Tuple[str, ...]:
+        if not self.disponivel or not sequencia:
+            return ()
+        consulta = consulta_fts(sequencia, self.palavras_max, self.tamanhos_radical)
+        encontrados = [linha[0] for linha in self._conexao().execute(CONSULTA_SINONIMOS, (consulta,))]
+        return tuple(sorted(encontrados, key=lambda sintoma: (self._prioridade(sintoma), sintoma)))
+
+    def _sintoma_sem_cache(self, sintoma: str) -> Tuple[Optional[str], int]:
+        linha = self._conexao().execute(CONSULTA_SINTOMA, (sintoma,)).fetchone()
+        return (linha[0], linha[1]) if linha else (None, PRIORIDADE_PADRAO)
+
+    def _dicas_sem_cache(self, sintoma: str) -> Tuple[str, ...]:
+        return tuple(linha[0] for linha in self._conexao().execute(CONSULTA_DICAS, (sintoma,)))
+
+    def _prioridade(self, sintoma: str) -> int:
+        return self._sintoma(sintoma)[1]
+
+    def especialidade(self, sintoma: str) -> Optional[str]:
+        """Especialidade sugerida para o sintoma na urgência média, se houver."""
+        return self._sintoma(sintoma)[0] if self.disponivel else None
+
+    def dicas(self, sintoma: str) -> Tuple[str, ...]:
+        return self._dicas(sintoma) if self.disponivel else ()
+
+    def sintomas_com_dicas(self) -> List[str]:
+        if not self.disponivel:
+            return []
+        return [linha[0] for linha in self._conexao().execute(CONSULTA_SINTOMAS_COM_DICAS)]
+
+    def estatisticas(self) -> Dict[str, object]:
+        extracoes = self._extrair.cache_info()
+        return {
+            "sinonimos": self.total_sinonimos,
+            "cache_acertos": extracoes.hits,
+            "cache_falhas": extracoes.misses,
+            "cache_itens": extracoes.currsize,
+            "recargas": self.recargas,
+        }
@@ -3,49 +3,192 @@ import os
 
 DB_FILE = "medicos.db"
 
-# Remove o banco de dados antigo, se existir, para garantir um estado limpo
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
-
-# Conecta ao banco de dados (será criado se não existir)
-conn = sqlite3.connect(DB_FILE)
-cursor = conn.cursor()
-
-# Cria a tabela de médicos
-cursor.execute("""
-CREATE TABLE medicos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nome_local TEXT NOT NULL,
-    especialidade TEXT NOT NULL,
-    endereco TEXT NOT NULL,
-    telefone TEXT,
-    nivel_urgencia TEXT NOT NULL -- 'alta', 'media', 'baixa'
+# Colado ao fim de cada sinônimo no índice de busca: "dor de cabeça" vira "dor de cabeçazzfim",
+# e a busca por ^"dor de cabecazzfim" só encontra o sinônimo inteiro (ver catalogo_sintomas.py).
+MARCADOR_FIM_TERMO = "zzfim"
+# Um sinônimo terminado em "*" é um radical: "vomit*" vira "vomitzzraiz" e indica o sintoma
+# em qualquer palavra que comece por ele (vomito, vomitou, vomitei, vomitando...).
+SUFIXO_RADICAL = "*"
+MARCADOR_RADICAL = "zzraiz"
+# Sinônimos com pontuação no fim ("dor.") seriam indexados sem o marcador colado.
+CHAVE_BUSCA_SQL = (
+    "CASE WHEN trim({termo}) LIKE '%" + SUFIXO_RADICAL + "' "
+    "THEN rtrim(trim({termo}), '" + SUFIXO_RADICAL + "') || '" + MARCADOR_RADICAL + "' "
+    "ELSE rtrim(trim({termo}), '.,;:!?') || '" + MARCADOR_FIM_TERMO + "' END"
 )
-""")
 
-# Popula o banco de dados com médicos e locais fictícios
-medicos = [
+# Popula o banco de dados com médicos e locais fictícios (coordenadas na região de Lavras - MG)
+MEDICOS = [
     # Alta Urgência (Hospitais e Pronto-Socorros)
-    ('Hospital Central de Emergência', 'Pronto-Socorro', 'Av. da Saúde, 123, Centro', '(11) 91234-5678', 'alta'),
-    ('Hospital Municipal', 'Emergência Geral', 'Rua das Ambulâncias, 456, Bairro Norte', '(21) 98765-4321', 'alta'),
-    ('UPA 24 Horas', 'Atendimento de Urgência', 'Praça do Socorro, 789, Bairro Sul', '(31) 99887-7665', 'alta'),
+    ('Hospital Central de Emergência', 'Pronto-Socorro', 'Av. da Saúde, 123, Centro', '(11) 91234-5678', 'alta', -21.2458, -44.9996),
+    ('Hospital Municipal', 'Emergência Geral', 'Rua das Ambulâncias, 456, Bairro Norte', '(21) 98765-4321', 'alta', -21.2301, -44.9862),
+    ('UPA 24 Horas', 'Atendimento de Urgência', 'Praça do Socorro, 789, Bairro Sul', '(31) 99887-7665', 'alta', -21.2612, -45.0105),
 
     # Média Urgência (Clínicos Gerais e Especialistas)
-    ('Clínica Geral Dr. House', 'Clínico Geral', 'Rua dos Diagnósticos, 101, Vila Madalena', '(41) 98877-6655', 'media'),
-    ('Consultório Dr. Marcus Renan', 'Clínico Geral', 'Alameda dos Ipês, 202, Jardins', '(51) 97766-5544', 'media'),
-    ('Clínica Otorrino Center', 'Otorrinolaringologista', 'Av. do Ouvido, 303, Moema', '(61) 96655-4433', 'media'),
-    ('NeuroClínica', 'Neurologista', 'Rua da Mente, 404, Pinheiros', '(71) 95544-3322', 'media'),
-    ('GastroCenter', 'Gastroenterologista', 'Travessa do Estômago, 505, Lapa', '(81) 94433-2211', 'media'),
+    ('Clínica Geral Dr. House', 'Clínico Geral', 'Rua dos Diagnósticos, 101, Vila Madalena', '(41) 98877-6655', 'media', -21.2395, -45.0041),
+    ('Consultório Dr. Marcus Renan', 'Clínico Geral', 'Alameda dos Ipês, 202, Jardins', '(51) 97766-5544', 'media', -21.2487, -44.9921),
+    ('Clínica Otorrino Center', 'Otorrinolaringologista', 'Av. do Ouvido, 303, Moema', '(61) 96655-4433', 'media', -21.2356, -44.9978),
+    ('NeuroClínica', 'Neurologista', 'Rua da Mente, 404, Pinheiros', '(71) 95544-3322', 'media', -21.2521, -45.0062),
+    ('GastroCenter', 'Gastroenterologista', 'Travessa do Estômago, 505, Lapa', '(81) 94433-2211', 'media', -21.2433, -45.0127),
 
     # Baixa Urgência (Postos de Saúde e Médicos de Família)
-    ('Posto de Saúde Bem-Estar', 'Médico de Família', 'Rua da Comunidade, 606, Bairro Leste', '(91) 93322-1100', 'baixa'),
-    ('UBS Família Feliz', 'Clínica Médica', 'Av. da Vizinhança, 707, Bairro Oeste', '(92) 92211-0099', 'baixa'),
-    ('Clínica Cuida Bem', 'Médico de Família', 'Rua do Aconchego, 808, Centro Comunitário', '(93) 91100-9988', 'baixa'),
+    ('Posto de Saúde Bem-Estar', 'Médico de Família', 'Rua da Comunidade, 606, Bairro Leste', '(91) 93322-1100', 'baixa', -21.2279, -44.9807),
+    ('UBS Família Feliz', 'Clínica Médica', 'Av. da Vizinhança, 707, Bairro Oeste', '(92) 92211-0099', 'baixa', -21.2574, -44.9893),
+    ('Clínica Cuida Bem', 'Médico de Família', 'Rua do Aconchego, 808, Centro Comunitário', '(93) 91100-9988', 'baixa', -21.2412, -44.9754),
 ]
 
-cursor.executemany("INSERT INTO medicos (nome_local, especialidade, endereco, telefone, nivel_urgencia) VALUES (?, ?, ?, ?, ?)", medicos)
+# Catálogo inicial de sintomas: (id, especialidade sugerida na urgência média, prioridade).
+# Na urgência média, o primeiro sintoma encontrado (menor prioridade) com especialidade define o especialista.
+SINTOMAS = [
+    ('tosse', 'Otorrinolaringologista', 1),
+    ('febre', 'Clínico Geral', 2),
+    ('dor_cabeca', 'Neurologista', 3),
+    ('nausea', 'Gastroenterologista', 4),
+    ('dor_garganta', 'Otorrinolaringologista', 5),
+    ('dor_abdominal', 'Gastroenterologista', 6),
+]
+
+# Palavras e expressões que indicam cada sintoma (a busca ignora acentos e maiúsculas).
+# A busca compara palavras inteiras; com "*" no fim, a última palavra é um radical e cobre
+# plurais e conjugações ("toss*": tosse, tossiu, tossindo). Flexões de expressões entram por extenso.
+SINONIMOS = {
+    'tosse': ['toss*', 'pigarro'],
+    'febre': ['febr*', 'temperatura', 'temperatura alta'],
+    'dor_cabeca': ['dor de cabeça', 'dores de cabeça', 'cefaleia', 'enxaqueca', 'cabeça doendo'],
+    'nausea': ['náuse*', 'enjo*', 'vomit*'],
+    'dor_garganta': ['dor de garganta', 'garganta inflamada', 'garganta doendo'],
+    'dor_abdominal': ['dor abdominal', 'dor de barriga', 'dor na barriga', 'dor no estômago'],
+}
+
+# Dicas específicas de cada sintoma, na ordem em que aparecem na resposta.
+DICAS = {
+    'tosse': [
+        'Mantenha-se hidratado para fluidificar secreções',
+        'Evite ambientes com fumaça ou poluição',
+        'Use umidificador de ar se possível',
+        'Chá de mel pode ajudar a acalmar a tosse',
+    ],
+    'febre': [
+        'Monitore a temperatura regularmente',
+        'Use roupas leves e mantenha o ambiente fresco',
+        'Beba líquidos em abundância',
+        'Compressas frias na testa podem ajudar',
+    ],
+    'dor_cabeca': [
+        'Descanse em ambiente escuro e silencioso',
+        'Aplique compressas frias na testa',
+        'Mantenha-se hidratado',
+        'Evite telas de computador e celular',
+    ],
+    'nausea': [
+        'Coma alimentos leves e em pequenas quantidades',
+        'Evite alimentos gordurosos ou muito condimentados',
+        'Chá de gengibre pode ajudar',
+        'Mantenha-se hidratado com pequenos goles',
+    ],
+}
+
+
+def criar_banco(caminho: str) -> sqlite3.Connection:
+    """Cria um banco vazio com o esquema do agente (tabela, índices e modo WAL)."""
+    # Remove o banco de dados antigo (e os arquivos do modo WAL), se existir, para garantir um estado limpo
+    for arquivo in (caminho, f"{caminho}-wal", f"{caminho}-shm"):
+        if os.path.exists(arquivo):
+            os.remove(arquivo)
+
+    # Conecta ao banco de dados (será criado se não existir)
+    conn = sqlite3.connect(caminho)
+    cursor = conn.cursor()
+
+    # Modo WAL: o agente lê o banco enquanto ele é atualizado, sem bloqueios
+    cursor.execute("PRAGMA journal_mode=WAL")
+
+    # Cria a tabela de médicos
+    cursor.execute("""
+    CREATE TABLE medicos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome_local TEXT NOT NULL,
+        especialidade TEXT NOT NULL,
+        endereco TEXT NOT NULL,
+        telefone TEXT,
+        nivel_urgencia TEXT NOT NULL, -- 'alta', 'media', 'baixa'
+        latitude REAL, -- opcional: usada para sugerir os locais mais próximos
+        longitude REAL
+    )
+    """)
+
+    # Índice usado nas buscas por urgência e especialidade
+    cursor.execute("CREATE INDEX idx_medicos_urgencia_especialidade ON medicos (nivel_urgencia, especialidade)")
+
+    # Catálogo de sintomas (ver catalogo_sintomas.py)
+    cursor.execute("""
+    CREATE TABLE sintomas (
+        id TEXT PRIMARY KEY,
+        especialidade TEXT, -- sugerida na urgência média; opcional
+        prioridade INTEGER NOT NULL DEFAULT 1000
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE sintoma_dicas (
+        sintoma TEXT NOT NULL REFERENCES sintomas (id),
+        ordem INTEGER NOT NULL,
+        dica TEXT NOT NULL,
+        PRIMARY KEY (sintoma, ordem)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE sinonimos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        termo TEXT NOT NULL,
+        sintoma TEXT NOT NULL REFERENCES sintomas (id)
+    )
+    """)
+    # Índice de texto completo dos sinônimos (acentos e maiúsculas não fazem diferença),
+    # mantido pelos gatilhos abaixo: basta alterar a tabela `sinonimos`
+    cursor.execute("""
+    CREATE VIRTUAL TABLE sinonimos_busca USING fts5(
+        chave, content = '', tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """)
+    chave_nova, chave_antiga = CHAVE_BUSCA_SQL.format(termo="new.termo"), CHAVE_BUSCA_SQL.format(termo="old.termo")
+    cursor.executescript(f"""
+    CREATE TRIGGER sinonimos_inclusao AFTER INSERT ON sinonimos BEGIN
+        INSERT INTO sinonimos_busca (rowid, chave) VALUES (new.id, {chave_nova});
+    END;
+    CREATE TRIGGER sinonimos_exclusao AFTER DELETE ON sinonimos BEGIN
+        INSERT INTO sinonimos_busca (sinonimos_busca, rowid, chave) VALUES ('delete', old.id, {chave_antiga});
+    END;
+    CREATE TRIGGER sinonimos_alteracao AFTER UPDATE OF termo ON sinonimos BEGIN
+        INSERT INTO sinonimos_busca (sinonimos_busca, rowid, chave) VALUES ('delete', old.id, {chave_antiga});
+        INSERT INTO sinonimos_busca (rowid, chave) VALUES (new.id, {chave_nova});
+    END;
+    """)
+    conn.commit()
+    return conn
+
+
+def inserir_medicos(conn: sqlite3.Connection, medicos) -> None:
+    conn.executemany("INSERT INTO medicos (nome_local, especialidade, endereco, telefone, nivel_urgencia, latitude, longitude) VALUES (?, ?, ?, ?, ?, ?, ?)", medicos)
+    conn.commit()
+
+
+def inserir_catalogo(conn: sqlite3.Connection, sintomas, sinonimos, dicas) -> None:
+    conn.executemany("INSERT INTO sintomas (id, especialidade, prioridade) VALUES (?, ?, ?)", sintomas)
+    conn.executemany(
+        "INSERT INTO sinonimos (termo, sintoma) VALUES (?, ?)",
+        ((termo, sintoma) for sintoma, termos in sinonimos.items() for termo in termos),
+    )
+    conn.executemany(
+        "INSERT INTO sintoma_dicas (sintoma, ordem, dica) VALUES (?, ?, ?)",
+        ((sintoma, ordem, dica) for sintoma, lista in dicas.items() for ordem, dica in enumerate(lista)),
+    )
+    conn.commit()
+
 
-conn.commit()
-conn.close()
+if __name__ == "__main__":
+    conn = criar_banco(DB_FILE)
+    inserir_medicos(conn, MEDICOS)
+    inserir_catalogo(conn, SINTOMAS, SINONIMOS, DICAS)
+    conn.close()
 
-print(f"Banco de dados '{DB_FILE}' criado e populado com sucesso.")
\ No newline at end of file
+    print(f"Banco de dados '{DB_FILE}' criado e populado com sucesso.")
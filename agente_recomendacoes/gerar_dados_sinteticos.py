@@ -0,0 +1,102 @@
+# =================================================================================
+# gerar_dados_sinteticos.py - Gera um banco de locais de atendimento em larga escala
+#
+# Uso: python gerar_dados_sinteticos.py [--quantidade 100000] [--sinonimos 0] [--saida medicos_sinteticos.db]
+#
+# Cria um banco com o mesmo esquema do create_database.py, populado com locais
+# fictícios distribuídos entre as urgências e especialidades que o agente usa,
+# com coordenadas espalhadas por uma região do tamanho de um estado.
+# O catálogo de sintomas é o do create_database.py, acrescido de `--sinonimos`
+# sinônimos fictícios (para medir a busca com um vocabulário grande).
+# Serve para testes de carga e benchmarks; para usá-lo no agente, aponte
+# RECOMENDACOES_ARQUIVO_DB para o arquivo gerado.
+# =================================================================================
+
+import argparse
+import random
+
+from create_database import DICAS, SINONIMOS, SINTOMAS, criar_banco, inserir_catalogo, inserir_medicos
+
+ESPECIALIDADES_POR_URGENCIA = {
+    "alta": ["Pronto-Socorro", "Emergência Geral", "Atendimento de Urgência"],
+    "media": ["Clínico Geral", "Otorrinolaringologista", "Neurologista", "Gastroenterologista"],
+    "baixa": ["Médico de Família", "Clínica Médica"],
+}
+TIPOS_LOCAL = {
+    "alta": ["Hospital", "UPA", "Pronto-Socorro"],
+    "media": ["Clínica", "Consultório", "Centro Médico"],
+    "baixa": ["Posto de Saúde", "UBS", "Clínica da Família"],
+}
+LOGRADOUROS = ["Rua", "Av.", "Travessa", "Alameda", "Praça"]
+NOMES = ["das Flores", "da Saúde", "Central", "do Comércio", "dos Ipês", "da Paz", "São José", "XV de Novembro"]
+# Retângulo aproximado do estado de Minas Gerais (latitude, longitude).
+REGIAO = ((-22.9, -14.2), (-51.0, -39.9))
+
+# Vocabulário dos sinônimos fictícios: "<sensação> <preposição> <parte do corpo> <detalhe>".
+SENSACOES = ["dor", "ardência", "inchaço", "coceira", "formigamento", "dormência", "queimação", "pontada",
+             "rigidez", "vermelhidão", "manchas", "sangramento", "fraqueza", "latejamento"]
+PARTES_CORPO = ["cabeça", "peito", "braço", "perna", "joelho", "ombro", "costas", "pescoço", "olho", "ouvido",
+                "nariz", "garganta", "barriga", "pé", "mão", "dente", "pele", "língua", "tornozelo", "quadril"]
+SILABAS = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ru", "sa", "te", "vi", "xo", "za", "cra", "tri"]
+SINONIMOS_POR_SINTOMA = 5
+
+
+def gerar_medicos(quantidade: int, semente: int):
+    aleatorio = random.Random(semente)
+    urgencias = list(ESPECIALIDADES_POR_URGENCIA)
+    (lat_min, lat_max), (lon_min, lon_max) = REGIAO
+    for i in range(quantidade):
+        urgencia = aleatorio.choice(urgencias)
+        yield (
+            f"{aleatorio.choice(TIPOS_LOCAL[urgencia])} {i:06d}",
+            aleatorio.choice(ESPECIALIDADES_POR_URGENCIA[urgencia]),
+            f"{aleatorio.choice(LOGRADOUROS)} {aleatorio.choice(NOMES)}, {aleatorio.randint(1, 9999)}",
+            f"({aleatorio.randint(11, 99)}) 9{aleatorio.randint(1000, 9999)}-{aleatorio.randint(1000, 9999)}",
+            urgencia,
+            round(aleatorio.uniform(lat_min, lat_max), 6),
+            round(aleatorio.uniform(lon_min, lon_max), 6),
+        )
+
+
+def gerar_catalogo(quantidade_sinonimos: int, semente: int):
+    """Sintomas fictícios (`sintetico_<n>`) com `SINONIMOS_POR_SINTOMA` sinônimos cada."""
+    aleatorio = random.Random(semente)
+    especialidades = ESPECIALIDADES_POR_URGENCIA["media"]
+    sintomas, sinonimos = [], {}
+    for i in range(0, quantidade_sinonimos, SINONIMOS_POR_SINTOMA):
+        sintoma = f"sintetico_{i // SINONIMOS_POR_SINTOMA:05d}"
+        sintomas.append((sintoma, aleatorio.choice(especialidades), 100 + i // SINONIMOS_POR_SINTOMA))
+        termos = sinonimos[sintoma] = []
+        for _ in range(min(SINONIMOS_POR_SINTOMA, quantidade_sinonimos - i)):
+            # Um termo inventado em cada sinônimo, como os nomes técnicos de um vocabulário real.
+            inventado = "".join(aleatorio.choice(SILABAS) for _ in range(aleatorio.randint(3, 5)))
+            termos.append(aleatorio.choice([
+                inventado,
+                f"{aleatorio.choice(SENSACOES)} {inventado}",
+                f"{aleatorio.choice(SENSACOES)} na {aleatorio.choice(PARTES_CORPO)} {inventado}",
+            ]))
+    return sintomas, sinonimos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um banco sintético de locais de atendimento.")
+    parser.add_argument("--quantidade", type=int, default=100_000)
+    parser.add_argument("--saida", default="medicos_sinteticos.db")
+    parser.add_argument("--sinonimos", type=int, default=0, help="Sinônimos fictícios acrescentados ao catálogo.")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = criar_banco(args.saida)
+    inserir_medicos(conn, gerar_medicos(args.quantidade, args.semente))
+    inserir_catalogo(conn, SINTOMAS, SINONIMOS, DICAS)
+    if args.sinonimos:
+        inserir_catalogo(conn, *gerar_catalogo(args.sinonimos, args.semente), {})
+    conn.close()
+    print(
+        f"Banco sintético '{args.saida}' criado com {args.quantidade} locais de atendimento "
+        f"e {args.sinonimos} sinônimos fictícios."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Árvore k-d para encontrar os locais de atendimento mais próximos do paciente.
+
+As coordenadas (latitude, longitude) são convertidas para pontos na esfera
+unitária em 3D. Nessa representação a distância euclidiana (corda) cresce
+junto com a distância ao longo da superfície da Terra, então a árvore devolve
+exatamente os vizinhos mais próximos, sem as distorções de uma projeção plana.
+"""
+
+import heapq
+import math
+from typing import List, Sequence, Tuple
+
+RAIO_TERRA_KM = 6371.0088
+
+
+def para_cartesiano(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+def corda_para_km(corda_quadrada: float) -> float:
+    """Converte o quadrado da distância em corda para a distância ao longo da superfície."""
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(corda_quadrada) / 2))
+
+
+class ArvoreKD:
+    """Árvore k-d estática sobre pontos (latitude, longitude)."""
+
+    def __init__(self, coordenadas: Sequence[Tuple[float, float]], tamanho_folha: int = 8):
+        self._pontos = [para_cartesiano(lat, lon) for lat, lon in coordenadas]
+        self._indices = list(range(len(self._pontos)))
+        self._tamanho_folha = tamanho_folha
+        # Cada nó: (início, fim, eixo, corte, esquerda, direita); eixo -1 indica folha.
+        self._nos: List[Tuple[int, int, int, float, int, int]] = []
+        self._raiz = self._construir(0, len(self._indices)) if self._pontos else -1
+
+    def __len__(self) -> int:
+        return len(self._pontos)
+
+    def _construir(self, inicio: int, fim: int) -> int:
+        no = len(self._nos)
+        if fim - inicio <= self._tamanho_folha:
+            self._nos.append((inicio, fim, -1, 0.0, -1, -1))
+            return no
+
+        pontos, indices = self._pontos, self._indices
+        # Divide pelo eixo de maior amplitude neste trecho.
+        amplitudes = []
+        for eixo in range(3):
+            valores = [pontos[i][eixo] for i in indices[inicio:fim]]
+            amplitudes.append(max(valores) - min(valores))
+        eixo = amplitudes.index(max(amplitudes))
+
+        indices[inicio:fim] = sorted(indices[inicio:fim], key=lambda i: pontos[i][eixo])
+        meio = (inicio + fim) // 2
+        corte = pontos[indices[meio]][eixo]
+
+        self._nos.append(None)
+        esquerda = self._construir(inicio, meio)
+        direita = self._construir(meio, fim)
+        self._nos[no] = (inicio, fim, eixo, corte, esquerda, direita)
+        return no
+
+    def mais_proximos(self, latitude: float, longitude: float, k: int) -> List[Tuple[float, int]]:
+        """Devolve até `k` pares (distância em km, índice do ponto), do mais próximo ao mais distante."""
+        if self._raiz < 0 or k <= 0:
+            return []
+        alvo = para_cartesiano(latitude, longitude)
+        ax, ay, az = alvo
+        pontos, indices, nos = self._pontos, self._indices, self._nos
+        # Heap de máximo (distâncias negativas) com os k melhores candidatos.
+        melhores: List[Tuple[float, int]] = []
+
+        def visitar(no: int) -> None:
+            inicio, fim, eixo, corte, esquerda, direita = nos[no]
+            if eixo < 0:
+                for j in range(inicio, fim):
+                    i = indices[j]
+                    px, py, pz = pontos[i]
+                    d2 = (px - ax) ** 2 + (py - ay) ** 2 + (pz - az) ** 2
+                    if len(melhores) < k:
+                        heapq.heappush(melhores, (-d2, i))
+                    elif d2 < -melhores[0][0]:
+                        heapq.heapreplace(melhores, (-d2, i))
+                return
+            diferenca = alvo[eixo] - corte
+            primeiro, segundo = (esquerda, direita) if diferenca < 0 else (direita, esquerda)
+            visitar(primeiro)
+            # Só desce pelo outro lado se ele puder conter algo mais próximo.
+            if len(melhores) < k or diferenca * diferenca < -melhores[0][0]:
+                visitar(segundo)
+
+        visitar(self._raiz)
+        return [(corda_para_km(-d2), i) for d2, i in sorted(melhores, reverse=True)]
@@ -0,0 +1,159 @@
+"""Índice em memória dos locais de atendimento (tabela `medicos`).
+
+Na inicialização a tabela inteira é carregada em "baldes" indexados por
+urgência e por (urgência, especialidade), de modo que sortear locais é uma
+operação O(k) em memória, sem `ORDER BY RANDOM()` a cada requisição.
+
+O índice é recarregado quando o banco muda: o arquivo é verificado no máximo
+a cada `intervalo_verificacao_s` segundos, comparando inode/mtime (o banco foi
+recriado) e o `PRAGMA data_version` (outra conexão gravou no banco).
+
+Os locais com latitude/longitude também entram em uma árvore k-d por balde,
+usada para sugerir os locais mais próximos do paciente.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from indice_espacial import ArvoreKD
+
+COLUNAS_MEDICOS = "nome_local, especialidade, endereco, telefone, nivel_urgencia"
+# Bancos criados antes das coordenadas não têm latitude/longitude.
+COLUNAS_COORDENADAS = ", latitude, longitude"
+INDICE_URGENCIA_ESPECIALIDADE = (
+    "CREATE INDEX IF NOT EXISTS idx_medicos_urgencia_especialidade ON medicos (nivel_urgencia, especialidade)"
+)
+
+
+def abrir_conexao(caminho_db: str) -> sqlite3.Connection:
+    """Conexão reutilizável, em modo WAL (leitores não bloqueiam o escritor)."""
+    conn = sqlite3.connect(caminho_db, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(INDICE_URGENCIA_ESPECIALIDADE)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        # Banco somente leitura: o índice em memória funciona do mesmo jeito.
+        print(f"Aviso: não foi possível configurar WAL/índices em '{caminho_db}': {e}")
+    return conn
+
+
+class Balde:
+    """Locais de um mesmo grupo, com uma árvore k-d dos que têm coordenadas."""
+
+    __slots__ = ("medicos", "_coordenados", "_coordenadas", "_arvore")
+
+    def __init__(self):
+        self.medicos: List[Dict[str, Any]] = []
+        self._coordenados: List[Dict[str, Any]] = []
+        self._coordenadas: List[Tuple[float, float]] = []
+        self._arvore: Optional[ArvoreKD] = None
+
+    def adicionar(self, medico: Dict[str, Any], latitude: Optional[float], longitude: Optional[float]) -> None:
+        self.medicos.append(medico)
+        if latitude is not None and longitude is not None:
+            self._coordenados.append(medico)
+            self._coordenadas.append((latitude, longitude))
+
+    def finalizar(self) -> None:
+        self._arvore = ArvoreKD(self._coordenadas)
+        self._coordenadas = []
+
+    def mais_proximos(self, latitude: float, longitude: float, quantidade: int) -> List[Dict[str, Any]]:
+        if self._arvore is None:
+            return []
+        return [
+            dict(self._coordenados[i], distancia_km=round(distancia, 1))
+            for distancia, i in self._arvore.mais_proximos(latitude, longitude, quantidade)
+        ]
+
+
+class IndiceMedicos:
+    """Locais de atendimento agrupados por urgência e especialidade."""
+
+    def __init__(self, caminho_db: str, intervalo_verificacao_s: float = 2.0):
+        self.caminho_db = caminho_db
+        self.intervalo_verificacao_s = intervalo_verificacao_s
+        self._trava = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._assinatura_arquivo: Optional[Tuple[int, int, int]] = None
+        self._versao_dados: Optional[int] = None
+        self._proxima_verificacao = 0.0
+        # Trocados juntos, em uma única atribuição, a cada recarga.
+        self._baldes: Tuple[Dict[str, Balde], Dict[Tuple[str, str], Balde]] = ({}, {})
+        self.total = 0
+        self.recargas = 0
+        self.recarregar()
+
+    def _assinatura(self) -> Tuple[int, int, int]:
+        info = os.stat(self.caminho_db)
+        return info.st_ino, info.st_mtime_ns, info.st_size
+
+    def recarregar(self) -> None:
+        with self._trava:
+            assinatura = self._assinatura()
+            if self._conn is None or assinatura[0] != (self._assinatura_arquivo or (None,))[0]:
+                # Arquivo novo (ex.: recriado pelo create_database.py): reabre a conexão.
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = abrir_conexao(self.caminho_db)
+            colunas = {linha["name"] for linha in self._conn.execute("PRAGMA table_info(medicos)")}
+            consulta = f"SELECT {COLUNAS_MEDICOS}"
+            if {"latitude", "longitude"} <= colunas:
+                consulta += COLUNAS_COORDENADAS
+            por_urgencia: Dict[str, Balde] = {}
+            por_especialidade: Dict[Tuple[str, str], Balde] = {}
+            total = 0
+            for linha in self._conn.execute(f"{consulta} FROM medicos"):
+                medico = dict(linha)
+                urgencia = medico.pop("nivel_urgencia")
+                latitude, longitude = medico.pop("latitude", None), medico.pop("longitude", None)
+                por_urgencia.setdefault(urgencia, Balde()).adicionar(medico, latitude, longitude)
+                chave = (urgencia, medico["especialidade"])
+                por_especialidade.setdefault(chave, Balde()).adicionar(medico, latitude, longitude)
+                total += 1
+            for balde in (*por_urgencia.values(), *por_especialidade.values()):
+                balde.finalizar()
+            self._baldes = (por_urgencia, por_especialidade)
+            self.total = total
+            self.recargas += 1
+            self._assinatura_arquivo = self._assinatura()
+            self._versao_dados = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self._proxima_verificacao = time.monotonic() + self.intervalo_verificacao_s
+
+    def verificar_atualizacao(self) -> None:
+        """Recarrega o índice se o banco mudou desde a última carga (verificação barata e espaçada)."""
+        if time.monotonic() < self._proxima_verificacao:
+            return
+        with self._trava:
+            self._proxima_verificacao = time.monotonic() + self.intervalo_verificacao_s
+            try:
+                mudou = self._assinatura() != self._assinatura_arquivo
+                if not mudou:
+                    mudou = self._conn.execute("PRAGMA data_version").fetchone()[0] != self._versao_dados
+            except (OSError, sqlite3.Error) as e:
+                print(f"Aviso: não foi possível verificar o banco de dados: {e}")
+                return
+        if mudou:
+            self.recarregar()
+
+    def _balde(self, urgencia: str, especialidade: Optional[str]) -> Balde:
+        por_urgencia, por_especialidade = self._baldes
+        balde = por_urgencia.get(urgencia) if especialidade is None else por_especialidade.get((urgencia, especialidade))
+        return balde or Balde()
+
+    def sortear(self, urgencia: str, quantidade: int, especialidade: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Sorteia até `quantidade` locais distintos da urgência (e especialidade) pedida."""
+        medicos = self._balde(urgencia, especialidade).medicos
+        return random.sample(medicos, min(quantidade, len(medicos)))
+
+    def mais_proximos(
+        self, urgencia: str, quantidade: int, latitude: float, longitude: float, especialidade: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Os `quantidade` locais mais próximos do ponto, com a distância em `distancia_km`."""
+        return self._balde(urgencia, especialidade).mais_proximos(latitude, longitude, quantidade)
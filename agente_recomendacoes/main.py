@@ -1,30 +1,42 @@
+import os
+import sys
 import uvicorn
 import json
-import sqlite3
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pathlib import Path
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+
+# O pacote compartilhado `comum` fica na raiz do repositório (no Docker, em /app/comum).
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from comum.json_rapido import objeto_json, serializar
+from comum.metricas import RegistroMetricas, instrumentar_app
+from comum.rastreamento import instrumentar_rastreamento
+from catalogo_sintomas import CatalogoSintomas
+from indice_medicos import IndiceMedicos
 
 print("Iniciando o Agente de Recomendações Médicas...")
 
 # --- Conexão com o Banco de Dados ---
-DB_FILE = "medicos.db"
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# Mapeamento de sintomas para especialidades (para urgência média)
-SINTOMA_ESPECIALIDADE_MAP = {
-    "tosse": "Otorrinolaringologista",
-    "febre": "Clínico Geral",
-    "dor_cabeca": "Neurologista",
-    "nausea": "Gastroenterologista",
-    "dor_garganta": "Otorrinolaringologista",
-    "dor_abdominal": "Gastroenterologista"
-}
+# O caminho é relativo a este arquivo, para funcionar também quando o agente é importado pelo Gateway.
+DB_FILE = os.getenv("RECOMENDACOES_ARQUIVO_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "medicos.db"))
+
+# Tabela `medicos` carregada em memória; recarregada quando o arquivo do banco muda.
+indice_medicos = IndiceMedicos(
+    DB_FILE, intervalo_verificacao_s=float(os.getenv("RECOMENDACOES_INTERVALO_VERIFICACAO_S", 2.0))
+)
+print(f"Índice de locais de atendimento carregado: {indice_medicos.total} registros.")
+
+# Sintomas, sinônimos, especialidades e dicas ficam em tabelas do mesmo banco (ver catalogo_sintomas.py).
+catalogo_sintomas = CatalogoSintomas(
+    DB_FILE,
+    capacidade_cache=int(os.getenv("RECOMENDACOES_CATALOGO_CACHE", 4096)),
+    intervalo_verificacao_s=float(os.getenv("RECOMENDACOES_INTERVALO_VERIFICACAO_S", 2.0)),
+    palavras_max_texto=int(os.getenv("RECOMENDACOES_PALAVRAS_MAX_TEXTO", 300)),
+)
+print(f"Catálogo de sintomas carregado: {catalogo_sintomas.total_sinonimos} sinônimos.")
 
 BASE_RECOMENDACOES = {
     "alta": {
@@ -101,41 +113,15 @@ BASE_RECOMENDACOES = {
     }
 }
 
-RECOMENDACOES_SINTOMAS = {
-    "tosse": {
-        "dicas": [
-            "Mantenha-se hidratado para fluidificar secreções",
-            "Evite ambientes com fumaça ou poluição",
-            "Use umidificador de ar se possível",
-            "Chá de mel pode ajudar a acalmar a tosse"
-        ]
-    },
-    "febre": {
-        "dicas": [
-            "Monitore a temperatura regularmente",
-            "Use roupas leves e mantenha o ambiente fresco",
-            "Beba líquidos em abundância",
-            "Compressas frias na testa podem ajudar"
-        ]
-    },
-    "dor_cabeca": {
-        "dicas": [
-            "Descanse em ambiente escuro e silencioso",
-            "Aplique compressas frias na testa",
-            "Mantenha-se hidratado",
-            "Evite telas de computador e celular"
-        ]
-    },
-    "nausea": {
-        "dicas": [
-            "Coma alimentos leves e em pequenas quantidades",
-            "Evite alimentos gordurosos ou muito condimentados",
-            "Chá de gengibre pode ajudar",
-            "Mantenha-se hidratado com pequenos goles"
-        ]
-    }
+OBSERVACOES = {
+    "alta": "⚠️ ATENÇÃO: Esta é uma situação de urgência. Busque atendimento médico imediatamente!",
+    "media": "⚡ Recomenda-se acompanhamento médico. Monitore os sintomas e procure ajuda se piorarem.",
+    "baixa": "💡 Situação de baixa urgência. Cuidados básicos podem ser suficientes, mas monitore a evolução.",
 }
 
+# Campos de cada local na resposta, na ordem de MedicoRecomendado.
+CAMPOS_MEDICO = ("nome_local", "especialidade", "endereco", "telefone", "distancia_km")
+
 app = FastAPI(
     title="API do Agente de Recomendações Médicas",
     description="Uma API que fornece recomendações médicas e sugere locais de atendimento baseados no resultado da triagem.",
@@ -150,16 +136,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas em GET /metrics (formato Prometheus): duração por rota e por etapa da recomendação.
+metricas = RegistroMetricas()
+instrumentar_app(app, metricas, "recomendacoes")
+instrumentar_rastreamento(app, "recomendacoes")
+duracao_etapas = metricas.histograma(
+    "recomendacoes_etapa_duracao_segundos", "Duração de cada etapa da geração de recomendações.", ("etapa",)
+)
+erros_banco = metricas.contador("recomendacoes_erros_banco_total", "Falhas ao consultar os locais de atendimento.")
+metricas.medidor_funcao(
+    "recomendacoes_locais_indexados", "Locais de atendimento carregados no índice em memória.",
+    lambda: {(): indice_medicos.total},
+)
+metricas.medidor_funcao(
+    "recomendacoes_sinonimos_catalogo", "Sinônimos de sintomas no catálogo.",
+    lambda: {(): catalogo_sintomas.total_sinonimos},
+)
+
+def consultas_cache_sintomas() -> Dict[Tuple[str, ...], float]:
+    estatisticas = catalogo_sintomas.estatisticas()
+    return {("acerto",): estatisticas["cache_acertos"], ("falha",): estatisticas["cache_falhas"]}
+
+metricas.medidor_funcao(
+    "recomendacoes_cache_sintomas", "Consultas ao cache de extração de sintomas, por resultado.",
+    consultas_cache_sintomas, ("resultado",),
+)
+
 class TriagemInput(BaseModel):
     urgencia: str
     sintomas_texto: str
     resultado_triagem: str
+    # Localização opcional do paciente, para sugerir os locais mais próximos.
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class MedicoRecomendado(BaseModel):
     nome_local: str
     especialidade: str
     endereco: str
     telefone: Optional[str]
+    distancia_km: Optional[float] = None
 
 class RecomendacaoResponse(BaseModel):
     urgencia: str
@@ -169,87 +185,97 @@ class RecomendacaoResponse(BaseModel):
     observacoes: str
 
 def extrair_sintomas_chave(texto: str) -> List[str]:
-    texto_lower = texto.lower()
-    sintomas_encontrados = []
-    mapeamento_sintomas = {
-        "tosse": ["tosse", "tossir", "pigarro"],
-        "febre": ["febre", "febril", "temperatura"],
-        "dor_cabeca": ["dor de cabeça", "cefaleia", "enxaqueca", "cabeça doendo"],
-        "nausea": ["nausea", "náusea", "enjoo", "vomito", "vômito"]
-    }
-    for sintoma, palavras_chave in mapeamento_sintomas.items():
-        if any(palavra in texto_lower for palavra in palavras_chave):
-            sintomas_encontrados.append(sintoma)
-    return sintomas_encontrados
+    # Em ordem de prioridade, que define a especialidade na urgência média.
+    return list(catalogo_sintomas.extrair(texto))
 
 def gerar_recomendacoes_especificas(sintomas: List[str]) -> List[str]:
     recomendacoes = []
     for sintoma in sintomas:
-        if sintoma in RECOMENDACOES_SINTOMAS:
-            recomendacoes.extend(RECOMENDACOES_SINTOMAS[sintoma]["dicas"])
+        recomendacoes.extend(catalogo_sintomas.dicas(sintoma))
     return recomendacoes
 
-def recomendar_medicos(urgencia: str, sintomas_chave: List[str]) -> List[MedicoRecomendado]:
+def buscar_locais(urgencia: str, quantidade: int, localizacao: Optional[Tuple[float, float]], especialidade: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Locais mais próximos do paciente quando há localização; caso contrário, um sorteio."""
+    if localizacao is not None:
+        proximos = indice_medicos.mais_proximos(urgencia, quantidade, *localizacao, especialidade=especialidade)
+        if proximos:
+            return proximos
+    return indice_medicos.sortear(urgencia, quantidade, especialidade)
+
+def formatar_medico(linha: Dict[str, Any]) -> Dict[str, Any]:
+    return {campo: linha.get(campo) for campo in CAMPOS_MEDICO}
+
+def recomendar_medicos(urgencia: str, sintomas_chave: List[str], localizacao: Optional[Tuple[float, float]] = None) -> List[Dict[str, Any]]:
     recomendacoes = []
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
+        indice_medicos.verificar_atualizacao()
+
         if urgencia == 'media' and sintomas_chave:
             for sintoma in sintomas_chave:
-                if sintoma in SINTOMA_ESPECIALIDADE_MAP:
-                    especialidade = SINTOMA_ESPECIALIDADE_MAP[sintoma]
-                    cursor.execute(
-                        "SELECT nome_local, especialidade, endereco, telefone FROM medicos WHERE especialidade = ? AND nivel_urgencia = 'media' ORDER BY RANDOM() LIMIT 1",
-                        (especialidade,)
-                    )
-                    especialista = cursor.fetchone()
-                    if especialista:
-                        recomendacoes.append(MedicoRecomendado(**dict(especialista)))
+                especialidade = catalogo_sintomas.especialidade(sintoma)
+                if especialidade:
+                    for especialista in buscar_locais('media', 1, localizacao, especialidade):
+                        recomendacoes.append(formatar_medico(especialista))
                     break 
 
         limit = 2 - len(recomendacoes)
         if limit > 0:
-            cursor.execute(
-                "SELECT nome_local, especialidade, endereco, telefone FROM medicos WHERE nivel_urgencia = ? ORDER BY RANDOM() LIMIT ?",
-                (urgencia, limit)
-            )
-            rows = cursor.fetchall()
-            for row in rows:
-                if not any(rec.nome_local == row['nome_local'] for rec in recomendacoes):
-                    recomendacoes.append(MedicoRecomendado(**dict(row)))
-        conn.close()
+            # Busca alguns a mais para compensar um possível repetido do especialista.
+            for row in buscar_locais(urgencia, limit + len(recomendacoes), localizacao):
+                if len(recomendacoes) == 2:
+                    break
+                if not any(rec['nome_local'] == row['nome_local'] for rec in recomendacoes):
+                    recomendacoes.append(formatar_medico(row))
     except Exception as e:
+        erros_banco.inc()
         print(f"Erro ao acessar o banco de dados: {e}")
         return []
     
     return recomendacoes
 
+def renderizar_fragmentos() -> Dict[str, Tuple[bytes, bytes]]:
+    """Serializa, para cada urgência, o JSON antes das recomendações específicas e depois da lista de locais.
+
+    Só as dicas dos sintomas e a lista de locais mudam a cada requisição; o
+    resto da resposta sai daqui pronto. Cada fragmento é validado uma vez
+    contra `RecomendacaoResponse`.
+    """
+    fragmentos = {}
+    for urgencia, gerais in BASE_RECOMENDACOES.items():
+        prefixo = objeto_json([
+            ("urgencia", urgencia),
+            ("recomendacoes_gerais", gerais),
+        ])[:-1] + b',"recomendacoes_especificas":'
+        sufixo = b',"observacoes":' + serializar(OBSERVACOES[urgencia]) + b"}"
+        RecomendacaoResponse.model_validate_json(prefixo + b'[],"medicos_recomendados":[]' + sufixo)
+        fragmentos[urgencia] = (prefixo, sufixo)
+    return fragmentos
+
+FRAGMENTOS_RESPOSTA = renderizar_fragmentos()
+
+# `response_model` fica só na documentação: a resposta já sai serializada e não é revalidada.
 @app.post("/recomendacoes", response_model=RecomendacaoResponse, summary="Gera recomendações médicas e sugere locais de atendimento")
 def gerar_recomendacoes(triagem: TriagemInput):
+    with duracao_etapas.cronometrar("total"):
+        return Response(content=montar_recomendacoes(triagem), media_type="application/json")
+
+def montar_recomendacoes(triagem: TriagemInput) -> bytes:
+    """Corpo JSON da resposta: os fragmentos pré-serializados com a lista de locais no meio."""
     urgencia = triagem.urgencia.lower()
     if urgencia not in BASE_RECOMENDACOES:
         urgencia = "baixa"
 
-    recomendacoes_gerais = BASE_RECOMENDACOES[urgencia]
-    sintomas_identificados = extrair_sintomas_chave(triagem.sintomas_texto)
-    recomendacoes_especificas = gerar_recomendacoes_especificas(sintomas_identificados)
-    medicos = recomendar_medicos(urgencia, sintomas_identificados)
-
-    if urgencia == "alta":
-        observacoes = "⚠️ ATENÇÃO: Esta é uma situação de urgência. Busque atendimento médico imediatamente!"
-    elif urgencia == "media":
-        observacoes = "⚡ Recomenda-se acompanhamento médico. Monitore os sintomas e procure ajuda se piorarem."
-    else:
-        observacoes = "💡 Situação de baixa urgência. Cuidados básicos podem ser suficientes, mas monitore a evolução."
-
-    return RecomendacaoResponse(
-        urgencia=urgencia,
-        recomendacoes_gerais=recomendacoes_gerais,
-        recomendacoes_especificas=recomendacoes_especificas,
-        medicos_recomendados=medicos,
-        observacoes=observacoes
-    )
+    with duracao_etapas.cronometrar("extracao_sintomas"):
+        sintomas_identificados = extrair_sintomas_chave(triagem.sintomas_texto)
+    localizacao = None
+    if triagem.latitude is not None and triagem.longitude is not None:
+        localizacao = (triagem.latitude, triagem.longitude)
+    with duracao_etapas.cronometrar("consulta_locais"):
+        medicos = recomendar_medicos(urgencia, sintomas_identificados, localizacao)
+
+    prefixo, sufixo = FRAGMENTOS_RESPOSTA[urgencia]
+    especificas = serializar(gerar_recomendacoes_especificas(sintomas_identificados))
+    return prefixo + especificas + b',"medicos_recomendados":' + serializar(medicos) + sufixo
 
 @app.get("/health", summary="Verifica o status do serviço")
 def health_check():
@@ -257,9 +283,10 @@ def health_check():
 
 @app.get("/sintomas-suportados", summary="Lista sintomas com recomendações específicas")
 def listar_sintomas_suportados():
+    sintomas = catalogo_sintomas.sintomas_com_dicas()
     return {
-        "sintomas_suportados": list(RECOMENDACOES_SINTOMAS.keys()),
-        "total": len(RECOMENDACOES_SINTOMAS)
+        "sintomas_suportados": sintomas,
+        "total": len(sintomas)
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+# =================================================================================
+# gunicorn.conf.py - Modo pre-fork do Agente de Triagem
+#
+# Uso: gunicorn -c gunicorn.conf.py main:app
+#
+# Com `preload_app`, o processo mestre importa o main.py uma única vez (bibliotecas
+# e modelo carregados) e só então cria os workers com fork. Os workers herdam essa
+# memória em copy-on-write: vocabulário, coeficientes e o código de NumPy/SciPy/
+# scikit-learn ficam em páginas compartilhadas, em vez de uma cópia por worker.
+# Na recarga do modelo, só um worker retreina; os outros carregam o artefato que
+# ele gravar (ver recarga.py).
+#
+# Variáveis de ambiente:
+#   TRIAGEM_WORKERS  número de workers (padrão: CPUs disponíveis para o processo)
+#   TRIAGEM_PRELOAD  "0" faz cada worker importar o app por conta própria
+#   TRIAGEM_BIND     endereço de escuta (padrão 0.0.0.0:8000)
+# =================================================================================
+
+import gc
+import os
+
+
+def cpus_disponiveis() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.getenv("TRIAGEM_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("TRIAGEM_WORKERS", 0)) or cpus_disponiveis()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("TRIAGEM_PRELOAD", "1") == "1"
+# Em um reinício, requisições em andamento têm até 30 s para terminar.
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Chamado depois do preload e antes dos forks: congela os objetos já criados para
+    # que o coletor de lixo não escreva neles (o que copiaria as páginas em cada worker).
+    if preload_app:
+        gc.freeze()
+        server.log.info("Aplicação pré-carregada; %d objetos congelados para o fork.", gc.get_freeze_count())
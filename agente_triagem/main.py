@@ -2,49 +2,89 @@
 # main.py - Agente de IA de Triagem com Machine Learning
 #
 # Lógica Principal:
-# 1. Na inicialização, carrega um dataset de um CSV e treina um modelo de ML.
-# 2. Expõe um endpoint de API que:
+# 1. Na inicialização, carrega o artefato do modelo de ML gerado offline
+#    (treinar_modelo.py). Só treina novamente se o CSV de treino tiver mudado.
+# 2. Expõe endpoints de API (individual e em lote) que:
 #    a. Filtra saudações e entradas inválidas.
 #    b. Usa uma abordagem HÍBRIDA (regras + IA) para classificar a urgência.
+# 3. No endpoint individual, as previsões de requisições concorrentes são
+#    agrupadas em micro-lotes (ver microlotes.py).
+# 4. Troca o modelo sem reiniciar quando o CSV ou o artefato mudam, e aceita
+#    casos rotulados no modelo incremental (ver recarga.py).
 # =================================================================================
 
+import os
+import secrets
+import sys
+import time
 import uvicorn
-import pandas as pd
-from fastapi import FastAPI
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from fastapi import Depends, FastAPI, Header, HTTPException
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
-from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LogisticRegression
-from sklearn.feature_extraction.text import TfidfVectorizer
+
+# O pacote compartilhado `comum` fica na raiz do repositório (no Docker, em /app/comum).
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from comum.metricas import RegistroMetricas, instrumentar_app
+from comum.rastreamento import instrumentar_rastreamento
+from comum.regras_criticas import e_caso_critico
+from microlotes import AgrupadorPredicoes
+from modelo import ArtefatoIndisponivel
+from recarga import GerenciadorModelo
 
 SAUDACOES = ["oi", "ola", "olá"]
 
-print("Iniciando o processo de treinamento do modelo de IA...")
+print("Carregando o modelo de IA...")
 
 try:
-    # Carrega o dataset de treino a partir do arquivo CSV, usando ';' como separador.
-    df_treino = pd.read_csv('dados_triagem.csv', sep=';')
-    print(f"Arquivo 'dados_triagem.csv' carregado: {len(df_treino)} exemplos encontrados.")
-except FileNotFoundError:
-    print("ERRO CRÍTICO: 'dados_triagem.csv' não encontrado. Certifique-se de que ele está na mesma pasta que o main.py.")
+    gerenciador_modelo = GerenciadorModelo()
+except FileNotFoundError as e:
+    print(f"ERRO CRÍTICO: {e} Certifique-se de que 'dados_triagem.csv' está na mesma pasta que o main.py.")
     exit()
 
-# Define o pipeline de ML: transforma o texto em vetores e depois aplica um classificador.
-modelo_ia = Pipeline([
-    ('vectorizer', TfidfVectorizer()),
-    ('classifier', LogisticRegression(max_iter=1000))
-])
+print("Modelo de IA pronto!")
+
+# Micro-lotes: janela de espera (ms) e tamanho máximo de cada chamada agrupada ao modelo.
+# TRIAGEM_LOTE_TAMANHO_MAX=1 desativa o agrupamento (uma previsão por requisição).
+LOTE_JANELA_S = float(os.getenv("TRIAGEM_LOTE_JANELA_MS", 2)) / 1000
+LOTE_TAMANHO_MAX = int(os.getenv("TRIAGEM_LOTE_TAMANHO_MAX", 64))
+
+
+def registrar_microlote(tamanho: int, duracao: float) -> None:
+    itens_lote.observar(tamanho)
+    ocupacao_microlote.observar(tamanho / agrupador.tamanho_max)
+    duracao_etapas.observar(duracao, "predicao_modelo")
+
+
+def prever_com_versao(textos: List[str]) -> List[Tuple[str, str]]:
+    """Previsões de um lote, cada uma com a versão do modelo que a fez."""
+    # Uma leitura do artefato por lote: modelo e versão vêm da mesma troca.
+    artefato = gerenciador_modelo.artefato
+    return [(previsao, artefato["versao"]) for previsao in artefato["modelo"].predict(textos)]
+
+
+# O modelo é lido a cada lote (e não capturado aqui), para acompanhar uma eventual troca.
+agrupador = AgrupadorPredicoes(
+    prever_com_versao, LOTE_JANELA_S, LOTE_TAMANHO_MAX, ao_executar_lote=registrar_microlote
+)
 
-# Treina o modelo com os dados do CSV.
-modelo_ia.fit(df_treino['texto'], df_treino['urgencia'])
 
-print("Modelo de IA treinado e pronto!")
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    gerenciador_modelo.iniciar_monitoramento()
+    yield
+    gerenciador_modelo.parar_monitoramento()
+    agrupador.fechar()
 
 
 app = FastAPI(
     title="API do Agente de Triagem Médica",
     description="Uma API que utiliza Machine Learning para classificar a urgência de sintomas.",
-    version="1.2.0"
+    version="1.2.0",
+    lifespan=ciclo_de_vida
 )
 
 # Configura o CORS para permitir que o frontend (rodando em outra porta) acesse esta API.
@@ -56,9 +96,120 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas em GET /metrics (formato Prometheus): duração por rota e por etapa da triagem.
+metricas = RegistroMetricas()
+instrumentar_app(app, metricas, "triagem")
+instrumentar_rastreamento(app, "triagem")
+duracao_etapas = metricas.histograma(
+    "triagem_etapa_duracao_segundos", "Duração de cada etapa da triagem.", ("etapa",)
+)
+itens_lote = metricas.histograma(
+    "triagem_lote_itens", "Quantidade de textos por chamada ao modelo.",
+    limites=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+ocupacao_microlote = metricas.histograma(
+    "triagem_microlote_ocupacao", "Fração do tamanho máximo ocupada por cada micro-lote.",
+    limites=(0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+metricas.medidor_funcao(
+    "triagem_microlote_fila", "Textos aguardando o próximo micro-lote.", lambda: {(): agrupador.pendentes}
+)
+metricas.medidor_funcao(
+    "triagem_modelo_info", "Versão do modelo ativo (valor sempre 1).",
+    lambda: {(gerenciador_modelo.versao,): 1}, ("versao",)
+)
+metricas.medidor_funcao(
+    "triagem_modelo_recargas", "Trocas de modelo desde a inicialização.",
+    lambda: {(): gerenciador_modelo.recargas}
+)
+
+# Token exigido (cabeçalho X-Token-Admin) pelos endpoints que alteram o modelo; sem ele, ficam desativados.
+TOKEN_ADMIN = os.getenv("TRIAGEM_TOKEN_ADMIN", "")
+
+# Tamanho máximo aceito pelo endpoint de triagem em lote.
+TAMANHO_MAX_LOTE = int(os.getenv("TRIAGEM_TAMANHO_MAX_LOTE", 1000))
+
+MENSAGEM_SAUDACAO = "Olá! Sou o assistente TrIAgem. Por favor, descreva seus sintomas para que eu possa ajudar."
+MENSAGEM_ENTRADA_CURTA = "Para fazer uma análise melhor, por favor, descreva seus sintomas com um pouco mais de detalhes."
+MENSAGEM_ALTA_REGRAS = "Urgência ALTA. Sintoma crítico detectado. Busque atendimento presencial imediatamente!."
+MENSAGENS_PREVISAO = {
+    "alta": "Urgência ALTA. A análise sugere a necessidade de atendimento presencial imediato!",
+    "media": "Urgência MÉDIA. A análise sugere que uma teleconsulta ou consulta seja realizada para avaliação!",
+    "baixa": "Urgência BAIXA. A análise sugere monitorar os sintomas. Se persistirem, procure um especialista.",
+}
+
+# Origem da decisão, devolvida em cada resposta para a auditoria do Gateway.
+ORIGEM_FILTRO = "filtro_entrada"
+ORIGEM_REGRAS = "regras"
+ORIGEM_MODELO = "modelo"
+
 class SintomasInput(BaseModel):
     texto_sintomas: str
 
+class SintomasLoteInput(BaseModel):
+    textos_sintomas: List[str] = Field(..., max_length=TAMANHO_MAX_LOTE)
+
+class CasoRotulado(BaseModel):
+    texto: str = Field(..., min_length=1)
+    urgencia: Literal["alta", "media", "baixa"]
+
+class CasosRotuladosInput(BaseModel):
+    casos: List[CasoRotulado] = Field(..., min_length=1, max_length=TAMANHO_MAX_LOTE)
+
+
+def exigir_token_admin(x_token_admin: Optional[str] = Header(None)) -> None:
+    """Dependência dos endpoints administrativos: 403 se desativados, 401 sem o token correto."""
+    if not TOKEN_ADMIN:
+        raise HTTPException(status_code=403, detail="Endpoint administrativo desativado: defina TRIAGEM_TOKEN_ADMIN.")
+    if x_token_admin is None or not secrets.compare_digest(x_token_admin.encode(), TOKEN_ADMIN.encode()):
+        raise HTTPException(status_code=401, detail="Token administrativo ausente ou inválido (cabeçalho X-Token-Admin).")
+
+
+def filtrar_entrada(texto_usuario: str) -> Optional[str]:
+    """Devolve uma resposta pronta para saudações e entradas curtas demais, ou None."""
+    palavras = texto_usuario.split()
+
+    # Filtra saudações para uma resposta mais natural.
+    if texto_usuario in SAUDACOES:
+        return MENSAGEM_SAUDACAO
+
+    # Filtra entradas de palavra única e muito curta.
+    if len(palavras) == 1 and len(palavras[0]) < 4:
+        return MENSAGEM_ENTRADA_CURTA
+
+    return None
+
+
+def aplicar_regras(texto_lower: str) -> Optional[str]:
+    """Aplica as regras de casos críticos; devolve None se nenhuma se aplicar."""
+    if e_caso_critico(texto_lower):
+        return MENSAGEM_ALTA_REGRAS
+    return None
+
+
+def resposta_triagem(resultado: str, versao_modelo: str) -> Dict[str, Any]:
+    """Corpo da resposta de uma triagem, com a origem da decisão e a versão do modelo (para auditoria).
+
+    `versao_modelo` é a do modelo que fez a previsão, lida junto com ele: após uma troca, a
+    versão ativa pode já ser outra.
+    """
+    if resultado == MENSAGEM_ALTA_REGRAS:
+        origem = ORIGEM_REGRAS
+    elif resultado in (MENSAGEM_SAUDACAO, MENSAGEM_ENTRADA_CURTA):
+        origem = ORIGEM_FILTRO
+    else:
+        origem = ORIGEM_MODELO
+    return {
+        "resultado_triagem": resultado,
+        "critico": origem == ORIGEM_REGRAS,
+        "origem": origem,
+        "versao_modelo": versao_modelo,
+    }
+
+
+def mensagem_previsao(previsao: str) -> str:
+    return MENSAGENS_PREVISAO.get(previsao, MENSAGENS_PREVISAO["baixa"])
+
 
 def classificar_sintomas(texto: str) -> str:
     """Usa uma abordagem HÍBRIDA (regras + IA) para classificar o texto do sintoma."""
@@ -66,49 +217,127 @@ def classificar_sintomas(texto: str) -> str:
     texto_lower = texto.lower()
     
     # 1. Pré-filtro de regras para casos críticos que exigem urgência ALTA imediata.
-    palavras_chave_alta = [
-        "acidente", "avc", "boca torta", "convulsao", "convulsão", 
-        "confusão mental", "coração acelerado", "corte profundo", "derrame", 
-        "desmaio", "dor no peito", "dor excruciante", "engasgado", 
-        "envenenamento", "facada", "fala arrastada", "falta de ar", 
-        "fratura", "hemorragia", "infarto", "não consigo respirar", 
-        "pancada na cabeça", "paralisia", "perda de consciência", 
-        "pressão no peito", "queimadura grave", "rosto torto", 
-        "sangramento", "sufocando", "traumatismo", "visão dupla",
-        "baleado", "veneno", "suicidio"
-    ]
-    if any(keyword in texto_lower for keyword in palavras_chave_alta):
-        return "Urgência ALTA. Sintoma crítico detectado. Busque atendimento presencial imediatamente!."
+    with duracao_etapas.cronometrar("filtro_regras"):
+        resultado_regras = aplicar_regras(texto_lower)
+    if resultado_regras is not None:
+        return resultado_regras
 
     # 2. Se não for um caso crítico, usa o modelo de Machine Learning treinado.
-    previsao = modelo_ia.predict([texto_lower])[0]
-    
-    if previsao == "alta":
-        return "Urgência ALTA. A análise sugere a necessidade de atendimento presencial imediato!"
-    elif previsao == "media":
-        return "Urgência MÉDIA. A análise sugere que uma teleconsulta ou consulta seja realizada para avaliação!"
-    else: # previsao == "baixa"
-        return "Urgência BAIXA. A análise sugere monitorar os sintomas. Se persistirem, procure um especialista."
+    with duracao_etapas.cronometrar("predicao_modelo"):
+        previsao = gerenciador_modelo.modelo.predict([texto_lower])[0]
+    itens_lote.observar(1)
+    return mensagem_previsao(previsao)
+
+
+async def classificar_sintomas_agrupado(texto: str) -> Tuple[str, str]:
+    """Igual a `classificar_sintomas`, mas a previsão passa pela fila de micro-lotes.
+
+    Devolve também a versão do modelo que classificou o texto.
+    """
+    texto_lower = texto.lower()
+
+    with duracao_etapas.cronometrar("filtro_regras"):
+        resultado_regras = aplicar_regras(texto_lower)
+    if resultado_regras is not None:
+        return resultado_regras, gerenciador_modelo.versao
+
+    # Inclui a espera na fila; a duração da chamada ao modelo fica em "predicao_modelo".
+    with duracao_etapas.cronometrar("fila_e_predicao"):
+        previsao, versao = await agrupador.prever(texto_lower)
+    return mensagem_previsao(previsao), versao
+
+
+def classificar_lote(textos: List[str]) -> Tuple[List[str], str]:
+    """Classifica vários textos: filtros e regras por item, uma única chamada vetorizada ao modelo.
+
+    Devolve também a versão do modelo usado em todo o lote.
+    """
+    artefato = gerenciador_modelo.artefato
+    resultados: List[Optional[str]] = [None] * len(textos)
+    pendentes_indices: List[int] = []
+    pendentes_textos: List[str] = []
+
+    inicio = time.perf_counter()
+    for i, texto in enumerate(textos):
+        texto_usuario = texto.lower().strip()
+        resposta = filtrar_entrada(texto_usuario)
+        if resposta is None:
+            resposta = aplicar_regras(texto_usuario)
+        if resposta is None:
+            pendentes_indices.append(i)
+            pendentes_textos.append(texto_usuario)
+        else:
+            resultados[i] = resposta
+    duracao_etapas.observar(time.perf_counter() - inicio, "filtro_regras")
+
+    if pendentes_textos:
+        with duracao_etapas.cronometrar("predicao_modelo"):
+            previsoes = artefato["modelo"].predict(pendentes_textos)
+        itens_lote.observar(len(pendentes_textos))
+        for i, previsao in zip(pendentes_indices, previsoes):
+            resultados[i] = mensagem_previsao(previsao)
+
+    return resultados, artefato["versao"]
 
 @app.post("/triagem", summary="Executa a triagem de sintomas")
-def executar_triagem(sintomas: SintomasInput):
+async def executar_triagem(sintomas: SintomasInput):
     """Endpoint principal que filtra entradas antes de chamar a classificação."""
     
-    texto_usuario = sintomas.texto_sintomas.lower().strip()
-    palavras = texto_usuario.split()
-    
-    # Filtra saudações para uma resposta mais natural.
-    if texto_usuario in SAUDACOES:
-        return {"resultado_triagem": "Olá! Sou o assistente TrIAgem. Por favor, descreva seus sintomas para que eu possa ajudar."}
+    with duracao_etapas.cronometrar("total"):
+        texto_usuario = sintomas.texto_sintomas.lower().strip()
 
-    # Filtra entradas de palavra única e muito curta.
-    if len(palavras) == 1 and len(palavras[0]) < 4:
-        return {"resultado_triagem": "Para fazer uma análise melhor, por favor, descreva seus sintomas com um pouco mais de detalhes."}
+        with duracao_etapas.cronometrar("filtro_entrada"):
+            resposta = filtrar_entrada(texto_usuario)
+        if resposta is not None:
+            return resposta_triagem(resposta, gerenciador_modelo.versao)
+
+        # Se a entrada for válida, chama a função de classificação.
+        resultado, versao = await classificar_sintomas_agrupado(texto_usuario)
+        return resposta_triagem(resultado, versao)
+
+@app.post("/triagem/lote", summary="Executa a triagem de vários sintomas de uma só vez")
+def executar_triagem_lote(lote: SintomasLoteInput):
+    """Triagem em lote (ex.: sincronização de quiosques); os resultados seguem a ordem de entrada."""
+    with duracao_etapas.cronometrar("total_lote"):
+        resultados, versao = classificar_lote(lote.textos_sintomas)
+    return {"resultados": [resposta_triagem(resultado, versao) for resultado in resultados]}
+
+@app.get("/health", summary="Verifica o status do serviço")
+def health_check():
+    """Verificação barata para o Gateway e orquestradores: não toca no modelo nem renderiza páginas."""
+    return {"status": "healthy", "service": "Agente de Triagem", "modelo": gerenciador_modelo.versao}
 
-    # Se a entrada for válida, chama a função de classificação.
-    resultado = classificar_sintomas(texto_usuario)
-    return {"resultado_triagem": resultado}
+@app.get("/modelo", summary="Versão e estado do modelo ativo")
+def obter_modelo():
+    return gerenciador_modelo.informacoes()
+
+@app.post(
+    "/modelo/recarregar", summary="Recarrega o modelo a partir do disco", dependencies=[Depends(exigir_token_admin)]
+)
+def recarregar_modelo():
+    """Carrega o artefato (ou retreina, se o CSV mudou) e troca o modelo sem interromper as requisições."""
+    try:
+        return gerenciador_modelo.recarregar()
+    except ArtefatoIndisponivel as e:
+        raise HTTPException(status_code=503, detail=f"{e} Versão {gerenciador_modelo.versao} mantida.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Falha ao recarregar o modelo; versão {gerenciador_modelo.versao} mantida: {e}")
+
+@app.post(
+    "/modelo/casos-rotulados", summary="Incorpora casos rotulados ao modelo incremental",
+    dependencies=[Depends(exigir_token_admin)],
+)
+def incorporar_casos_rotulados(entrada: CasosRotuladosInput):
+    """Atualiza o modelo com casos revisados por profissionais, sem retreino completo."""
+    if not gerenciador_modelo.incremental:
+        raise HTTPException(
+            status_code=409,
+            detail="O modelo ativo não aceita atualização incremental (use TRIAGEM_TIPO_MODELO=hashing_sgd).",
+        )
+    return gerenciador_modelo.incorporar_casos(
+        [caso.texto for caso in entrada.casos], [caso.urgencia for caso in entrada.casos]
+    )
 
 # Bloco que permite a execução direta do script com "python main.py".
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,331 @@
+# =================================================================================
+# modelo.py - Treino, serialização e carregamento do modelo de triagem
+#
+# O modelo é treinado offline (ver treinar_modelo.py) e salvo como um artefato
+# versionado, marcado com o hash do arquivo de treino. Na inicialização o
+# serviço apenas carrega esse artefato e só treina novamente se o hash estiver
+# desatualizado (ou se o artefato não existir).
+#
+# Há dois tipos de modelo (TRIAGEM_TIPO_MODELO):
+#   - tfidf_logistica (padrão): TF-IDF + regressão logística, só com treino completo;
+#   - hashing_sgd: HashingVectorizer + SGDClassifier, que aceita atualização
+#     incremental (`partial_fit`) com casos rotulados por profissionais de saúde.
+#
+# O modelo tfidf_logistica também é exportado para um .npz ao lado do artefato
+# (ver modelo_compilado.py). Com TRIAGEM_MOTOR=compilado (padrão), o serviço
+# prevê com ele e nem importa scikit-learn, scipy ou joblib; se o .npz faltar ou
+# estiver desatualizado, é gerado de novo a partir do artefato.
+# =================================================================================
+
+import contextlib
+import copy
+import csv
+import hashlib
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from modelo_compilado import ModeloCompilado, exportar, verificar_paridade
+
+DIRETORIO_BASE = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_DADOS = os.getenv("TRIAGEM_ARQUIVO_DADOS", os.path.join(DIRETORIO_BASE, "dados_triagem.csv"))
+ARQUIVO_MODELO = os.getenv("TRIAGEM_ARQUIVO_MODELO", os.path.join(DIRETORIO_BASE, "modelo_triagem.joblib"))
+
+# Incrementar sempre que o formato do artefato mudar de forma incompatível.
+FORMATO_ARTEFATO = 1
+
+TIPO_TFIDF = "tfidf_logistica"
+TIPO_INCREMENTAL = "hashing_sgd"
+TIPO_MODELO = os.getenv("TRIAGEM_TIPO_MODELO", TIPO_TFIDF)
+
+# "compilado": previsão só com NumPy (apenas tfidf_logistica); "sklearn": o pipeline do artefato.
+MOTOR_COMPILADO = "compilado"
+MOTOR_SKLEARN = "sklearn"
+MOTOR = os.getenv("TRIAGEM_MOTOR", MOTOR_COMPILADO)
+
+# Mapeia os arrays NumPy do artefato direto do arquivo (somente leitura): processos
+# que carregam o mesmo artefato compartilham essas páginas pelo cache do sistema.
+MMAP_MODELO = os.getenv("TRIAGEM_MMAP_MODELO", "0") == "1"
+
+
+def calcular_hash_dados(caminho: str = ARQUIVO_DADOS) -> str:
+    """Hash SHA-256 (abreviado) do arquivo de treino, usado para versionar o modelo."""
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 16), b""):
+            sha.update(bloco)
+    return sha.hexdigest()[:16]
+
+
+def ler_dados_treino(caminho: str = ARQUIVO_DADOS) -> Tuple[List[str], List[str]]:
+    """Lê o CSV de treino (separador ';') sem depender do pandas."""
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        linhas = list(csv.DictReader(arquivo, delimiter=";"))
+    return [linha["texto"] for linha in linhas], [linha["urgencia"] for linha in linhas]
+
+
+def treinar_pipeline(textos: List[str], rotulos: List[str], tipo: str = TIPO_MODELO):
+    """Define e treina o pipeline de ML: vetoriza o texto e aplica um classificador."""
+    from sklearn.pipeline import Pipeline
+
+    if tipo == TIPO_INCREMENTAL:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+
+        # O HashingVectorizer não tem vocabulário a aprender: textos novos não exigem refazer a vetorização.
+        modelo = Pipeline([
+            ('vectorizer', HashingVectorizer(n_features=2 ** 18, alternate_sign=False, norm="l2")),
+            ('classifier', SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=50, tol=None, random_state=42))
+        ])
+    elif tipo == TIPO_TFIDF:
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        modelo = Pipeline([
+            ('vectorizer', TfidfVectorizer()),
+            ('classifier', LogisticRegression(max_iter=1000))
+        ])
+    else:
+        raise ValueError(f"Tipo de modelo desconhecido: '{tipo}'")
+    modelo.fit(textos, rotulos)
+    return modelo
+
+
+def aceita_atualizacao_incremental(artefato: Dict[str, Any]) -> bool:
+    modelo = artefato["modelo"]
+    return hasattr(modelo, "steps") and hasattr(modelo.steps[-1][1], "partial_fit")
+
+
+def atualizar_incrementalmente(
+    artefato: Dict[str, Any], textos: Sequence[str], rotulos: Sequence[str]
+) -> Dict[str, Any]:
+    """Devolve um novo artefato com os casos incorporados via `partial_fit` (o original não muda)."""
+    if not aceita_atualizacao_incremental(artefato):
+        raise ValueError(f"O modelo '{artefato.get('tipo', TIPO_TFIDF)}' não aceita atualização incremental.")
+    modelo = copy.deepcopy(artefato["modelo"])
+    vetorizador, classificador = modelo.steps[0][1], modelo.steps[-1][1]
+    desconhecidos = set(rotulos) - set(classificador.classes_)
+    if desconhecidos:
+        raise ValueError(f"Rótulos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    classificador.partial_fit(vetorizador.transform(list(textos)), list(rotulos))
+
+    atualizacoes = artefato.get("atualizacoes_incrementais", 0) + 1
+    return dict(
+        artefato,
+        modelo=modelo,
+        versao=f"{FORMATO_ARTEFATO}-{artefato['hash_dados']}+inc{atualizacoes}",
+        atualizacoes_incrementais=atualizacoes,
+        exemplos_incrementais=artefato.get("exemplos_incrementais", 0) + len(textos),
+        criado_em=time.strftime("%Y-%m-%dT%H:%M:%S"),
+    )
+
+
+def _versao_sklearn() -> str:
+    import sklearn
+    return sklearn.__version__
+
+
+def construir_artefato(caminho_dados: str = ARQUIVO_DADOS, tipo: str = TIPO_MODELO) -> Dict[str, Any]:
+    """Treina o modelo a partir do CSV e devolve o artefato com seus metadados."""
+    hash_dados = calcular_hash_dados(caminho_dados)
+    textos, rotulos = ler_dados_treino(caminho_dados)
+    modelo = treinar_pipeline(textos, rotulos, tipo)
+    return {
+        "formato": FORMATO_ARTEFATO,
+        "tipo": tipo,
+        "versao": f"{FORMATO_ARTEFATO}-{hash_dados}",
+        "hash_dados": hash_dados,
+        "sklearn_versao": _versao_sklearn(),
+        "exemplos_treino": len(textos),
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "modelo": modelo,
+    }
+
+
+class ArtefatoIndisponivel(RuntimeError):
+    """Não há artefato válido no disco e este processo não deve treinar um novo."""
+
+
+def gravar_atomicamente(caminho: str, gravar: Callable[[str], None]) -> None:
+    """Grava em um temporário único no mesmo diretório e renomeia: quem lê nunca vê um arquivo pela metade.
+
+    O nome único evita que dois processos (os workers do gunicorn) troquem os arquivos um do outro.
+    """
+    descritor, temporario = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(caminho)), prefix=f"{os.path.basename(caminho)}.", suffix=".tmp"
+    )
+    os.close(descritor)
+    try:
+        gravar(temporario)
+        # O mkstemp cria o arquivo só para o dono; o artefato final tem as permissões de sempre.
+        os.chmod(temporario, 0o644)
+        os.replace(temporario, caminho)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporario)
+        raise
+
+
+def salvar_artefato(artefato: Dict[str, Any], caminho: str = ARQUIVO_MODELO) -> None:
+    import joblib
+
+    gravar_atomicamente(caminho, lambda temporario: joblib.dump(artefato, temporario))
+
+
+def artefato_valido(artefato: Dict[str, Any], hash_dados: str, tipo: str = TIPO_MODELO) -> bool:
+    return (
+        artefato.get("formato") == FORMATO_ARTEFATO
+        and artefato.get("tipo", TIPO_TFIDF) == tipo
+        and artefato.get("hash_dados") == hash_dados
+        and artefato.get("sklearn_versao") == _versao_sklearn()
+    )
+
+
+def _carregar_artefato_valido(
+    caminho_modelo: str, hash_dados: Optional[str], tipo: str
+) -> Optional[Dict[str, Any]]:
+    """O artefato salvo, se existir e corresponder aos dados de treino; senão None."""
+    import joblib
+
+    if not os.path.exists(caminho_modelo):
+        return None
+    try:
+        artefato = joblib.load(caminho_modelo, mmap_mode="r" if MMAP_MODELO else None)
+    except Exception as e:
+        print(f"Não foi possível carregar o artefato '{caminho_modelo}': {e}.")
+        return None
+    if hash_dados is None or artefato_valido(artefato, hash_dados, tipo):
+        print(f"Modelo de IA carregado de '{caminho_modelo}' (versão {artefato['versao']}).")
+        return artefato
+    print("Artefato do modelo desatualizado em relação aos dados de treino.")
+    return None
+
+
+def _treinar_artefato(caminho_dados: str, hash_dados: Optional[str], tipo: str, treinar: bool) -> Dict[str, Any]:
+    if hash_dados is None:
+        raise FileNotFoundError(
+            f"'{caminho_dados}' não encontrado e nenhum artefato de modelo válido disponível."
+        )
+    if not treinar:
+        raise ArtefatoIndisponivel("Nenhum artefato válido para os dados de treino atuais; aguardando o treino.")
+    print("Treinando o modelo...")
+    artefato = construir_artefato(caminho_dados, tipo)
+    print(f"Modelo de IA treinado com {artefato['exemplos_treino']} exemplos (versão {artefato['versao']}).")
+    return artefato
+
+
+def _salvar_artefato_treinado(artefato: Dict[str, Any], caminho_modelo: str) -> None:
+    try:
+        salvar_artefato(artefato, caminho_modelo)
+    except OSError as e:
+        # O serviço continua funcionando mesmo em sistemas de arquivos somente leitura.
+        print(f"Aviso: não foi possível salvar o artefato do modelo: {e}")
+
+
+def carregar_modelo(
+    caminho_dados: str = ARQUIVO_DADOS, caminho_modelo: str = ARQUIVO_MODELO, tipo: str = TIPO_MODELO,
+    treinar: bool = True,
+) -> Dict[str, Any]:
+    """Carrega o artefato salvo; treina (e salva) novamente apenas se estiver desatualizado.
+
+    Com `treinar=False`, levanta `ArtefatoIndisponivel` em vez de treinar.
+    """
+    hash_dados = calcular_hash_dados(caminho_dados) if os.path.exists(caminho_dados) else None
+    artefato = _carregar_artefato_valido(caminho_modelo, hash_dados, tipo)
+    if artefato is None:
+        artefato = _treinar_artefato(caminho_dados, hash_dados, tipo, treinar)
+        _salvar_artefato_treinado(artefato, caminho_modelo)
+    return artefato
+
+
+def caminho_compilado(caminho_modelo: str = ARQUIVO_MODELO) -> str:
+    """O modelo compilado fica ao lado do artefato, com a extensão .npz."""
+    return os.path.splitext(caminho_modelo)[0] + ".npz"
+
+
+def compilar_artefato(artefato: Dict[str, Any], caminho_dados: str = ARQUIVO_DADOS) -> Optional[ModeloCompilado]:
+    """Exporta o modelo do artefato e confere a paridade com o scikit-learn nos textos de treino.
+
+    Devolve None se o tipo de modelo não puder ser compilado ou se as previsões divergirem.
+    """
+    if artefato.get("tipo", TIPO_TFIDF) != TIPO_TFIDF or not os.path.exists(caminho_dados):
+        return None
+    metadados = {
+        campo: artefato[campo] for campo in ("versao", "hash_dados", "tipo", "exemplos_treino", "criado_em")
+    }
+    try:
+        compilado = exportar(artefato["modelo"], metadados)
+    except ValueError as e:
+        print(f"Aviso: o modelo não pode ser compilado ({e}).")
+        return None
+    textos, _ = ler_dados_treino(caminho_dados)
+    paridade = verificar_paridade(artefato["modelo"], compilado, textos)
+    if not paridade["ok"]:
+        print(
+            f"Aviso: modelo compilado descartado: {paridade['divergencias']} previsões divergentes "
+            f"(diferença máxima {paridade['diferenca_max']:.2e})."
+        )
+        return None
+    return compilado
+
+
+def salvar_compilado(compilado: ModeloCompilado, caminho: str) -> None:
+    gravar_atomicamente(caminho, compilado.salvar)
+
+
+def artefato_compilado(compilado: ModeloCompilado) -> Dict[str, Any]:
+    """Artefato equivalente ao do joblib, com o modelo compilado no lugar do pipeline."""
+    metadados = compilado.metadados
+    return {
+        "formato": FORMATO_ARTEFATO,
+        "tipo": metadados.get("tipo", TIPO_TFIDF),
+        "versao": metadados["versao"],
+        "hash_dados": metadados.get("hash_dados"),
+        "exemplos_treino": int(metadados.get("exemplos_treino", 0)),
+        "criado_em": metadados.get("criado_em"),
+        "motor": MOTOR_COMPILADO,
+        "modelo": compilado,
+    }
+
+
+def carregar_modelo_servico(
+    caminho_dados: str = ARQUIVO_DADOS, caminho_modelo: str = ARQUIVO_MODELO,
+    tipo: str = TIPO_MODELO, motor: str = MOTOR, treinar: bool = True,
+) -> Dict[str, Any]:
+    """Artefato usado pelo serviço: o modelo compilado quando possível, senão o do `carregar_modelo`.
+
+    Com `treinar=False`, só lê o que já está no disco (nada é treinado nem gravado) e levanta
+    `ArtefatoIndisponivel` se não houver um artefato válido para os dados de treino atuais.
+    """
+    if motor != MOTOR_COMPILADO or tipo != TIPO_TFIDF:
+        return dict(carregar_modelo(caminho_dados, caminho_modelo, tipo, treinar), motor=MOTOR_SKLEARN)
+
+    caminho = caminho_compilado(caminho_modelo)
+    hash_dados = calcular_hash_dados(caminho_dados) if os.path.exists(caminho_dados) else None
+    if os.path.exists(caminho):
+        try:
+            compilado = ModeloCompilado.carregar(caminho)
+            if hash_dados is None or compilado.metadados.get("versao") == f"{FORMATO_ARTEFATO}-{hash_dados}":
+                print(f"Modelo compilado carregado de '{caminho}' (versão {compilado.metadados['versao']}).")
+                return artefato_compilado(compilado)
+            print("Modelo compilado desatualizado em relação aos dados de treino.")
+        except Exception as e:
+            print(f"Não foi possível carregar o modelo compilado '{caminho}': {e}.")
+
+    artefato = _carregar_artefato_valido(caminho_modelo, hash_dados, tipo)
+    treinado = artefato is None
+    if treinado:
+        artefato = _treinar_artefato(caminho_dados, hash_dados, tipo, treinar)
+    compilado = compilar_artefato(artefato, caminho_dados)
+    # O .npz vai para o disco antes do artefato: quem recarrega ao ver o artefato novo já encontra o compilado.
+    if compilado is not None and treinar:
+        try:
+            salvar_compilado(compilado, caminho)
+        except OSError as e:
+            print(f"Aviso: não foi possível salvar o modelo compilado: {e}")
+    if treinado:
+        _salvar_artefato_treinado(artefato, caminho_modelo)
+    if compilado is None:
+        return dict(artefato, motor=MOTOR_SKLEARN)
+    return dict(artefato, modelo=compilado, motor=MOTOR_COMPILADO)
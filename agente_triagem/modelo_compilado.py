@@ -0,0 +1,238 @@
+# =================================================================================
+# modelo_compilado.py - Previsão do modelo TF-IDF + regressão logística só com NumPy
+#
+# O pipeline `tfidf_logistica` treinado pelo scikit-learn é exportado para um
+# arquivo .npz ao lado do artefato (`modelo_triagem.npz`) com o vocabulário, o
+# IDF, os coeficientes e os interceptos. O agente carrega esse arquivo sem
+# importar scikit-learn, scipy ou joblib, e o `ModeloCompilado.predict`
+# reproduz o `predict` do pipeline: mesma tokenização e as mesmas contas em
+# precisão dupla (as pontuações diferem só no último bit, pela ordem das somas).
+#
+# A exportação só é aceita depois de `verificar_paridade`: as previsões dos dois
+# modelos têm de ser iguais em todos os textos de treino.
+# =================================================================================
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Incrementar sempre que o conteúdo do .npz mudar de forma incompatível.
+FORMATO_COMPILADO = 1
+
+# Diferença máxima aceita entre as pontuações dos dois modelos na verificação de paridade.
+TOLERANCIA_PARIDADE = 1e-9
+
+
+class ModeloCompilado:
+    """Vetorização TF-IDF (analisador de palavras) seguida de um classificador linear."""
+
+    def __init__(
+        self,
+        termos: Sequence[str],
+        idf: np.ndarray,
+        coeficientes: np.ndarray,
+        interceptos: np.ndarray,
+        classes: Sequence[str],
+        padrao_token: str = r"(?u)\b\w\w+\b",
+        ngramas: Tuple[int, int] = (1, 1),
+        minusculas: bool = True,
+        tf_sublinear: bool = False,
+        norma_l2: bool = True,
+        metadados: Dict[str, Any] = None,
+    ):
+        self.vocabulario = {termo: coluna for coluna, termo in enumerate(termos)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        # Uma linha por termo: as colunas de um texto são lidas de uma vez com indexação.
+        self.coeficientes_t = np.ascontiguousarray(np.asarray(coeficientes, dtype=np.float64).T)
+        self.interceptos = np.asarray(interceptos, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.padrao_token = padrao_token
+        self._token = re.compile(padrao_token)
+        self.ngramas = (int(ngramas[0]), int(ngramas[1]))
+        self.minusculas = minusculas
+        self.tf_sublinear = tf_sublinear
+        self.norma_l2 = norma_l2
+        self.metadados = dict(metadados or {})
+
+    def _termos(self, texto: str) -> List[str]:
+        """Os mesmos termos do analisador `word` do TfidfVectorizer."""
+        if self.minusculas:
+            texto = texto.lower()
+        tokens = self._token.findall(texto)
+        minimo, maximo = self.ngramas
+        if maximo == 1:
+            return tokens
+        termos = list(tokens) if minimo == 1 else []
+        for n in range(max(minimo, 2), min(maximo, len(tokens)) + 1):
+            termos.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return termos
+
+    def _contagens(self, texto: str) -> Tuple[List[int], List[int]]:
+        contagem = Counter(c for c in map(self.vocabulario.get, self._termos(texto)) if c is not None)
+        # Colunas em ordem crescente, como na matriz esparsa do scikit-learn: as somas saem na mesma ordem.
+        colunas = sorted(contagem)
+        return colunas, [contagem[coluna] for coluna in colunas]
+
+    def _pontuar_um(self, texto: str) -> np.ndarray:
+        """Um texto só: as mesmas contas, em Python, sem o custo fixo das operações vetorizadas."""
+        colunas, contagens = self._contagens(texto)
+        pontuacoes = [0.0] * len(self.interceptos)
+        if colunas:
+            if self.tf_sublinear:
+                contagens = (np.log(np.array(contagens, dtype=np.float64)) + 1).tolist()
+            valores = [contagem * idf for contagem, idf in zip(contagens, self.idf[colunas].tolist())]
+            if self.norma_l2:
+                soma = 0.0
+                for valor in valores:
+                    soma += valor * valor
+                norma = math.sqrt(soma)
+                valores = [valor / norma for valor in valores]
+            for linha, valor in zip(self.coeficientes_t[colunas].tolist(), valores):
+                for classe, coeficiente in enumerate(linha):
+                    pontuacoes[classe] += coeficiente * valor
+        return np.array(pontuacoes) + self.interceptos
+
+    def decision_function(self, textos: Iterable[str]) -> np.ndarray:
+        textos = list(textos)
+        if len(textos) == 1:
+            pontuacoes = self._pontuar_um(textos[0])[None, :]
+        else:
+            pontuacoes = self._pontuar_lote(textos)
+        # Duas classes: o scikit-learn guarda uma única coluna de coeficientes.
+        return pontuacoes[:, 0] if len(self.interceptos) == 1 else pontuacoes
+
+    def _pontuar_lote(self, textos: List[str]) -> np.ndarray:
+        colunas: List[int] = []
+        contagens: List[int] = []
+        tamanhos: List[int] = []
+        for texto in textos:
+            colunas_texto, contagens_texto = self._contagens(texto)
+            colunas += colunas_texto
+            contagens += contagens_texto
+            tamanhos.append(len(colunas_texto))
+
+        pontuacoes = np.zeros((len(tamanhos), len(self.interceptos)))
+        if colunas:
+            colunas_np = np.array(colunas, dtype=np.intp)
+            valores = np.array(contagens, dtype=np.float64)
+            if self.tf_sublinear:
+                valores = np.log(valores) + 1
+            valores *= self.idf[colunas_np]
+            tamanhos_np = np.array(tamanhos)
+            com_termos = tamanhos_np > 0
+            # Textos sem termos conhecidos não têm elementos: os inícios dos demais bastam para o reduceat.
+            inicios = (np.cumsum(tamanhos_np) - tamanhos_np)[com_termos]
+            if self.norma_l2:
+                normas = np.sqrt(np.add.reduceat(valores * valores, inicios))
+                valores /= np.repeat(normas, tamanhos_np[com_termos])
+            contribuicoes = self.coeficientes_t[colunas_np] * valores[:, None]
+            pontuacoes[com_termos] = np.add.reduceat(contribuicoes, inicios, axis=0)
+        pontuacoes += self.interceptos
+        return pontuacoes
+
+    def predict(self, textos: Iterable[str]) -> np.ndarray:
+        pontuacoes = self.decision_function(textos)
+        if pontuacoes.ndim == 1:
+            return self.classes[(pontuacoes > 0).astype(np.intp)]
+        return self.classes[pontuacoes.argmax(axis=1)]
+
+    def salvar(self, caminho: str) -> None:
+        """Grava o modelo em .npz (sem objetos Python: carrega com `allow_pickle=False`)."""
+        termos = [None] * len(self.vocabulario)
+        for termo, coluna in self.vocabulario.items():
+            termos[coluna] = termo
+        with open(caminho, "wb") as arquivo:
+            np.savez_compressed(
+                arquivo,
+                formato=np.array(FORMATO_COMPILADO),
+                termos=np.array(termos, dtype=str),
+                idf=self.idf,
+                coeficientes=self.coeficientes_t.T,
+                interceptos=self.interceptos,
+                classes=np.array(self.classes, dtype=str),
+                padrao_token=np.array(self.padrao_token),
+                ngramas=np.array(self.ngramas),
+                opcoes=np.array([self.minusculas, self.tf_sublinear, self.norma_l2]),
+                metadados_chaves=np.array(list(self.metadados), dtype=str),
+                metadados_valores=np.array([str(valor) for valor in self.metadados.values()], dtype=str),
+            )
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "ModeloCompilado":
+        with np.load(caminho, allow_pickle=False) as dados:
+            if int(dados["formato"]) != FORMATO_COMPILADO:
+                raise ValueError(f"Formato do modelo compilado incompatível: {int(dados['formato'])}")
+            minusculas, tf_sublinear, norma_l2 = (bool(opcao) for opcao in dados["opcoes"])
+            return cls(
+                termos=dados["termos"].tolist(),
+                idf=dados["idf"],
+                coeficientes=dados["coeficientes"],
+                interceptos=dados["interceptos"],
+                classes=dados["classes"].tolist(),
+                padrao_token=str(dados["padrao_token"]),
+                ngramas=tuple(dados["ngramas"].tolist()),
+                minusculas=minusculas,
+                tf_sublinear=tf_sublinear,
+                norma_l2=norma_l2,
+                metadados=dict(zip(dados["metadados_chaves"].tolist(), dados["metadados_valores"].tolist())),
+            )
+
+
+def exportar(pipeline, metadados: Dict[str, Any] = None) -> ModeloCompilado:
+    """Converte um pipeline TfidfVectorizer + classificador linear; levanta ValueError se não for possível."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vetorizador, classificador = pipeline.steps[0][1], pipeline.steps[-1][1]
+    if len(pipeline.steps) != 2 or not isinstance(vetorizador, TfidfVectorizer):
+        raise ValueError("Só pipelines TfidfVectorizer + classificador linear podem ser compilados.")
+    parametros = vetorizador.get_params()
+    nao_suportados = [
+        nome for nome, padrao in (
+            ("analyzer", "word"), ("preprocessor", None), ("tokenizer", None), ("stop_words", None),
+            ("strip_accents", None), ("binary", False), ("use_idf", True), ("input", "content"),
+        ) if parametros[nome] != padrao
+    ]
+    if parametros["norm"] not in ("l2", None):
+        nao_suportados.append("norm")
+    if re.compile(parametros["token_pattern"]).groups > 1:
+        nao_suportados.append("token_pattern")
+    if nao_suportados:
+        raise ValueError(f"Opções do TfidfVectorizer não suportadas: {', '.join(nao_suportados)}")
+    if not hasattr(classificador, "coef_") or not hasattr(classificador, "intercept_"):
+        raise ValueError(f"Classificador sem coeficientes lineares: {type(classificador).__name__}")
+
+    termos = [None] * len(vetorizador.vocabulary_)
+    for termo, coluna in vetorizador.vocabulary_.items():
+        termos[coluna] = termo
+    return ModeloCompilado(
+        termos=termos,
+        idf=vetorizador.idf_,
+        coeficientes=classificador.coef_,
+        interceptos=classificador.intercept_,
+        classes=[str(classe) for classe in classificador.classes_],
+        padrao_token=parametros["token_pattern"],
+        ngramas=parametros["ngram_range"],
+        minusculas=parametros["lowercase"],
+        tf_sublinear=parametros["sublinear_tf"],
+        norma_l2=parametros["norm"] == "l2",
+        metadados=metadados,
+    )
+
+
+def verificar_paridade(pipeline, compilado: ModeloCompilado, textos: Sequence[str]) -> Dict[str, Any]:
+    """Compara as previsões e as pontuações dos dois modelos nos mesmos textos."""
+    textos = list(textos)
+    previsoes_sklearn = pipeline.predict(textos)
+    previsoes_compilado = compilado.predict(textos)
+    diferenca = np.abs(pipeline.decision_function(textos) - compilado.decision_function(textos))
+    divergencias = int(np.sum(previsoes_sklearn != previsoes_compilado))
+    diferenca_max = float(diferenca.max()) if diferenca.size else 0.0
+    return {
+        "textos": len(textos),
+        "divergencias": divergencias,
+        "diferenca_max": diferenca_max,
+        "ok": divergencias == 0 and diferenca_max <= TOLERANCIA_PARIDADE,
+    }
@@ -0,0 +1,246 @@
+# =================================================================================
+# recarga.py - Troca do modelo em produção sem reiniciar o agente
+#
+# O `GerenciadorModelo` guarda o artefato ativo. Uma thread em segundo plano
+# verifica periodicamente se o CSV de treino ou o artefato mudaram no disco; se
+# mudaram, carrega (ou treina) o novo modelo fora do caminho das requisições e o
+# troca com uma única atribuição. Cada chamada lê `gerenciador.artefato` uma vez
+# e usa o modelo e a versão desse mesmo artefato: quem já começou termina com o
+# modelo antigo (e o informa), e nenhuma requisição é perdida.
+#
+# Com vários workers (gunicorn.conf.py), só um processo treina: o que obtém a
+# trava exclusiva `<artefato>.lock`. Ele acompanha o CSV, retreina e grava o
+# .npz e o artefato; os demais acompanham só esses arquivos e carregam o
+# resultado pronto, sem treinar nem gravar nada. Se o treinador morrer, a trava
+# é liberada e outro worker assume na verificação seguinte.
+#
+# Casos rotulados por profissionais de saúde podem ser incorporados ao modelo
+# incremental (hashing_sgd) sem retreino completo; ficam também registrados em
+# TRIAGEM_ARQUIVO_CASOS, para revisão e inclusão no CSV do próximo treino completo.
+# =================================================================================
+
+import csv
+import os
+import threading
+import time
+from typing import Any, Dict, IO, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem gunicorn, há um único processo
+    fcntl = None
+
+from modelo import (
+    ARQUIVO_DADOS, ARQUIVO_MODELO, DIRETORIO_BASE, MOTOR, MOTOR_SKLEARN, TIPO_MODELO, TIPO_TFIDF,
+    ArtefatoIndisponivel, aceita_atualizacao_incremental, atualizar_incrementalmente, caminho_compilado, carregar_modelo_servico,
+    salvar_artefato,
+)
+
+ARQUIVO_CASOS = os.getenv("TRIAGEM_ARQUIVO_CASOS", os.path.join(DIRETORIO_BASE, "casos_rotulados.csv"))
+# Intervalo entre as verificações dos arquivos; 0 desativa a recarga automática.
+INTERVALO_VERIFICACAO_S = float(os.getenv("TRIAGEM_INTERVALO_VERIFICACAO_S", 5))
+
+Assinatura = Optional[Tuple[int, int, int]]
+
+
+def assinatura_arquivo(caminho: str) -> Assinatura:
+    """Identifica uma versão do arquivo sem lê-lo (inode, data de modificação e tamanho)."""
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+
+class GerenciadorModelo:
+    """Mantém o modelo ativo e o substitui, de forma atômica, quando há um novo."""
+
+    def __init__(
+        self,
+        caminho_dados: str = ARQUIVO_DADOS,
+        caminho_modelo: str = ARQUIVO_MODELO,
+        tipo: str = TIPO_MODELO,
+        caminho_casos: str = ARQUIVO_CASOS,
+        intervalo_s: float = INTERVALO_VERIFICACAO_S,
+        motor: str = MOTOR,
+    ):
+        self.caminho_dados = caminho_dados
+        self.caminho_modelo = caminho_modelo
+        self.tipo = tipo
+        self.caminho_casos = caminho_casos
+        self.intervalo_s = intervalo_s
+        self.motor = motor
+        # Serializa recargas e atualizações incrementais; as previsões não passam por ela.
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._arquivo_trava: Optional[IO] = None
+        # Se este processo treina e grava o modelo; os outros workers só carregam o que ele gravou.
+        self.treinador = True
+        self.recargas = 0
+        self.falhas_recarga = 0
+        self.ultimo_erro: Optional[str] = None
+        self.artefato: Dict[str, Any] = carregar_modelo_servico(caminho_dados, caminho_modelo, tipo, motor)
+        self.carregado_em = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._assinaturas = self._ler_assinaturas()
+
+    @property
+    def modelo(self):
+        return self.artefato["modelo"]
+
+    @property
+    def versao(self) -> str:
+        return self.artefato["versao"]
+
+    def _ler_assinaturas(self) -> Tuple[Assinatura, Assinatura, Assinatura]:
+        return (
+            assinatura_arquivo(self.caminho_dados),
+            assinatura_arquivo(self.caminho_modelo),
+            assinatura_arquivo(caminho_compilado(self.caminho_modelo)),
+        )
+
+    def _assinaturas_monitoradas(self, assinaturas: Tuple[Assinatura, ...]) -> Tuple[Assinatura, ...]:
+        # Quem não treina ignora o CSV: espera o treinador gravar o artefato correspondente.
+        return assinaturas if self.treinador else assinaturas[1:]
+
+    def _tentar_ser_treinador(self) -> bool:
+        """Tenta obter a trava exclusiva do artefato; só um processo por vez a mantém."""
+        if fcntl is None:
+            return True
+        if self._arquivo_trava is None:
+            try:
+                self._arquivo_trava = open(f"{self.caminho_modelo}.lock", "a")
+            except OSError as e:
+                # Sem onde coordenar (diretório somente leitura), cada processo cuida do próprio modelo.
+                print(f"AVISO: trava do modelo indisponível ({e}); este processo treinará por conta própria.")
+                return True
+        try:
+            fcntl.flock(self._arquivo_trava.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def _trocar(self, artefato: Dict[str, Any]) -> None:
+        # Uma atribuição de referência: as previsões em curso seguem com o objeto antigo.
+        self.artefato = artefato
+        self.carregado_em = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.recargas += 1
+
+    def recarregar(self) -> Dict[str, Any]:
+        """Carrega o artefato (retreinando se o CSV mudou) e o coloca em uso.
+
+        Se algo falhar, o modelo atual continua ativo e o erro é relançado.
+        """
+        with self._trava:
+            versao_anterior = self.versao
+            try:
+                novo = carregar_modelo_servico(
+                    self.caminho_dados, self.caminho_modelo, self.tipo, self.motor, treinar=self.treinador
+                )
+            except ArtefatoIndisponivel:
+                # Não é falha: o treinador ainda não gravou o artefato dos dados atuais.
+                raise
+            except Exception as e:
+                self.falhas_recarga += 1
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                raise
+            # Lidas depois do carregamento, que pode ter regravado o artefato.
+            self._assinaturas = self._ler_assinaturas()
+            self._trocar(novo)
+            self.ultimo_erro = None
+        print(f"Modelo de IA recarregado: {versao_anterior} -> {self.versao}")
+        return {"versao_anterior": versao_anterior, **self.informacoes()}
+
+    def verificar_arquivos(self) -> bool:
+        """Recarrega o modelo se o CSV de treino, o artefato ou o modelo compilado mudaram desde a última carga.
+
+        Fora do processo treinador, o CSV não é observado.
+        """
+        assinaturas = self._ler_assinaturas()
+        if self._assinaturas_monitoradas(assinaturas) == self._assinaturas_monitoradas(self._assinaturas):
+            return False
+        try:
+            self.recarregar()
+        except ArtefatoIndisponivel:
+            # Espera a próxima gravação do treinador, sem reler os arquivos a cada verificação.
+            self._assinaturas = assinaturas
+            return False
+        return True
+
+    def _monitorar(self) -> None:
+        while not self._parar.wait(self.intervalo_s):
+            try:
+                self.treinador = self._tentar_ser_treinador()
+                self.verificar_arquivos()
+            except Exception as e:
+                # O modelo antigo continua ativo; tentamos de novo só quando os arquivos mudarem outra vez.
+                self._assinaturas = self._ler_assinaturas()
+                print(f"AVISO: falha ao recarregar o modelo ({e}); mantendo a versão {self.versao}.")
+
+    def iniciar_monitoramento(self) -> None:
+        if self.intervalo_s <= 0 or self._thread is not None:
+            return
+        self._parar.clear()
+        self.treinador = self._tentar_ser_treinador()
+        self._thread = threading.Thread(target=self._monitorar, name="recarga-modelo", daemon=True)
+        self._thread.start()
+
+    def parar_monitoramento(self) -> None:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if self._arquivo_trava is not None:
+            # Fechar o arquivo libera a trava para outro worker.
+            self._arquivo_trava.close()
+            self._arquivo_trava = None
+
+    @property
+    def incremental(self) -> bool:
+        return aceita_atualizacao_incremental(self.artefato)
+
+    def incorporar_casos(self, textos: Sequence[str], rotulos: Sequence[str]) -> Dict[str, Any]:
+        """Atualiza o modelo incremental com casos rotulados, sem retreino completo.
+
+        Levanta `ValueError` se o modelo ativo não aceitar atualização incremental.
+        """
+        textos = [texto.strip() for texto in textos]
+        with self._trava:
+            versao_anterior = self.versao
+            novo = atualizar_incrementalmente(self.artefato, textos, rotulos)
+            self._registrar_casos(textos, rotulos)
+            try:
+                salvar_artefato(novo, self.caminho_modelo)
+            except OSError as e:
+                print(f"AVISO: não foi possível salvar o modelo atualizado ({e}).")
+            # O artefato salvo por nós não deve disparar uma nova recarga.
+            self._assinaturas = self._ler_assinaturas()
+            self._trocar(novo)
+        return {"versao_anterior": versao_anterior, "casos_incorporados": len(textos), **self.informacoes()}
+
+    def _registrar_casos(self, textos: List[str], rotulos: Sequence[str]) -> None:
+        """Acrescenta os casos ao CSV de casos rotulados (mesmo formato do CSV de treino)."""
+        novo_arquivo = not os.path.exists(self.caminho_casos)
+        with open(self.caminho_casos, "a", encoding="utf-8", newline="") as arquivo:
+            escritor = csv.writer(arquivo, delimiter=";")
+            if novo_arquivo:
+                escritor.writerow(["texto", "urgencia"])
+            escritor.writerows(zip(textos, rotulos))
+
+    def informacoes(self) -> Dict[str, Any]:
+        artefato = self.artefato
+        return {
+            "versao": artefato["versao"],
+            "tipo": artefato.get("tipo", TIPO_TFIDF),
+            "motor": artefato.get("motor", MOTOR_SKLEARN),
+            "incremental": self.incremental,
+            "criado_em": artefato.get("criado_em"),
+            "carregado_em": self.carregado_em,
+            "exemplos_treino": artefato.get("exemplos_treino"),
+            "exemplos_incrementais": artefato.get("exemplos_incrementais", 0),
+            "recargas": self.recargas,
+            "falhas_recarga": self.falhas_recarga,
+            "ultimo_erro": self.ultimo_erro,
+            "monitoramento_ativo": self._thread is not None,
+            "treinador": self.treinador,
+        }
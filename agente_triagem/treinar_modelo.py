@@ -0,0 +1,46 @@
+# =================================================================================
+# treinar_modelo.py - Etapa de build offline do modelo de triagem
+#
+# Uso: python treinar_modelo.py [--dados dados_triagem.csv] [--saida modelo_triagem.joblib]
+#                               [--tipo tfidf_logistica|hashing_sgd]
+#
+# Gera o artefato versionado que o agente carrega na inicialização e, para o
+# tfidf_logistica, o modelo compilado (.npz ao lado do artefato, ver
+# modelo_compilado.py), depois de conferir que as previsões dos dois coincidem.
+# É executado durante o build da imagem Docker para que nenhum contêiner precise treinar.
+# =================================================================================
+
+import argparse
+import time
+
+from modelo import (
+    ARQUIVO_DADOS, ARQUIVO_MODELO, TIPO_INCREMENTAL, TIPO_MODELO, TIPO_TFIDF, caminho_compilado,
+    compilar_artefato, construir_artefato, salvar_artefato, salvar_compilado
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina e salva o artefato do modelo de triagem.")
+    parser.add_argument("--dados", default=ARQUIVO_DADOS, help="CSV de treino (separador ';').")
+    parser.add_argument("--saida", default=ARQUIVO_MODELO, help="Caminho do artefato gerado.")
+    parser.add_argument("--tipo", default=TIPO_MODELO, choices=(TIPO_TFIDF, TIPO_INCREMENTAL))
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    artefato = construir_artefato(args.dados, args.tipo)
+    salvar_artefato(artefato, args.saida)
+    compilado = compilar_artefato(artefato, args.dados)
+    if compilado is not None:
+        salvar_compilado(compilado, caminho_compilado(args.saida))
+    duracao = time.perf_counter() - inicio
+
+    print(f"Artefato '{args.saida}' gerado em {duracao:.2f}s")
+    print(f"  versão: {artefato['versao']} ({artefato['tipo']})")
+    print(f"  exemplos de treino: {artefato['exemplos_treino']}")
+    print(f"  scikit-learn: {artefato['sklearn_versao']}")
+    if compilado is not None:
+        print(f"  modelo compilado: '{caminho_compilado(args.saida)}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""Benchmarks e testes de carga do sistema TrIAgem.
+
+Execute os módulos a partir da raiz do repositório, por exemplo:
+
+    python -m benchmarks.carga --concorrencia 32 --taxa 200
+    python -m benchmarks.micro
+
+Os resultados são gravados em `benchmarks/resultados/` como JSON e podem ser
+comparados com uma execução anterior usando `--comparar`.
+"""
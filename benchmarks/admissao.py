@@ -0,0 +1,128 @@
+# =================================================================================
+# admissao.py - Benchmark do controle de admissão do Gateway sob sobrecarga
+#
+# Uso: python -m benchmarks.admissao [--requisicoes 1200] [--taxa 60] [--criticos 0.1]
+#                                    [--limite 2] [--espera-max-ms 100] [--latencia-stub-ms 25]
+#                                    [--concorrencia-stub 1]
+#
+# Sobe os agentes stub, com capacidade limitada, e o Gateway duas vezes, sem e
+# com controle de admissão, e dispara em malha aberta uma taxa acima da
+# capacidade dos agentes, com uma fração de casos críticos. Relata, por classe
+# (crítico / normal), a latência das requisições atendidas e quantas foram
+# recusadas com 429.
+# =================================================================================
+
+import argparse
+import asyncio
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from benchmarks.carga import PORTA_GATEWAY, PORTA_RECOMENDACOES, PORTA_TRIAGEM
+from benchmarks.servicos import (
+    aguardar, encerrar_servicos, iniciar_servico, resumir_latencias, salvar_resultados
+)
+
+TEXTO_CRITICO = "meu pai está com dor no peito e falta de ar"
+TEXTO_NORMAL = "nariz escorrendo e um pouco de espirro"
+
+
+def iniciar_ambiente(args, limite: int) -> list:
+    env_stub = {"STUB_LATENCIA_MS": str(args.latencia_stub_ms), "STUB_CONCORRENCIA": str(args.concorrencia_stub)}
+    processos = [
+        iniciar_servico(".", PORTA_TRIAGEM, env_stub, "benchmarks.agentes_stub:app_triagem"),
+        iniciar_servico(".", PORTA_RECOMENDACOES, env_stub, "benchmarks.agentes_stub:app_recomendacoes"),
+        iniciar_servico("gateway", PORTA_GATEWAY, {
+            "AGENTE_TRIAGEM_URL": f"http://127.0.0.1:{PORTA_TRIAGEM}",
+            "AGENTE_RECOMENDACOES_URL": f"http://127.0.0.1:{PORTA_RECOMENDACOES}",
+            "GATEWAY_CACHE_CAPACIDADE": "0",
+            "GATEWAY_ADMISSAO_LIMITE": str(limite),
+            "GATEWAY_ADMISSAO_ESPERA_MAX_MS": str(args.espera_max_ms),
+        }),
+    ]
+    try:
+        aguardar(f"http://127.0.0.1:{PORTA_TRIAGEM}/health")
+        aguardar(f"http://127.0.0.1:{PORTA_RECOMENDACOES}/health")
+        aguardar(f"http://127.0.0.1:{PORTA_GATEWAY}/")
+    except RuntimeError:
+        encerrar_servicos(processos)
+        raise
+    return processos
+
+
+async def sobrecarregar(args) -> dict:
+    url = f"http://127.0.0.1:{PORTA_GATEWAY}/triagem-completa"
+    latencias = defaultdict(list)
+    status = defaultdict(Counter)
+    retry_after = Counter()
+    a_cada = max(1, round(1 / args.criticos)) if args.criticos > 0 else 0
+
+    async with httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=None)) as cliente:
+        inicio = time.perf_counter()
+
+        async def disparar(i: int):
+            classe = "critico" if a_cada and i % a_cada == 0 else "normal"
+            agendado = inicio + i / args.taxa
+            await asyncio.sleep(max(0.0, agendado - time.perf_counter()))
+            texto = TEXTO_CRITICO if classe == "critico" else TEXTO_NORMAL
+            try:
+                resposta = await cliente.post(url, json={"texto_sintomas": texto})
+            except httpx.HTTPError:
+                status[classe]["falha_rede"] += 1
+                return
+            status[classe][resposta.status_code] += 1
+            if resposta.status_code == 200:
+                latencias[classe].append(time.perf_counter() - agendado)
+            elif resposta.status_code == 429:
+                retry_after[resposta.headers.get("retry-after")] += 1
+
+        await asyncio.gather(*(disparar(i) for i in range(args.requisicoes)))
+        duracao = time.perf_counter() - inicio
+
+    return {
+        classe: {
+            **resumir_latencias(latencias[classe], duracao),
+            "status": {str(codigo): n for codigo, n in sorted(status[classe].items(), key=str)},
+        }
+        for classe in ("critico", "normal")
+    } | {"retry_after": dict(retry_after)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Controle de admissão do Gateway sob sobrecarga.")
+    parser.add_argument("--requisicoes", type=int, default=1200)
+    parser.add_argument("--taxa", type=float, default=60.0, help="Requisições por segundo (acima da capacidade).")
+    parser.add_argument("--criticos", type=float, default=0.1, help="Fração de casos críticos.")
+    parser.add_argument("--limite", type=int, default=2, help="GATEWAY_ADMISSAO_LIMITE na rodada com controle.")
+    parser.add_argument("--espera-max-ms", type=float, default=100.0)
+    parser.add_argument("--latencia-stub-ms", type=float, default=25.0)
+    parser.add_argument("--concorrencia-stub", type=int, default=1, help="Respostas simultâneas de cada agente stub.")
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    resultados = {}
+    for nome, limite in (("sem_admissao", 0), ("com_admissao", args.limite)):
+        processos = iniciar_ambiente(args, limite)
+        try:
+            resultados[nome] = asyncio.run(sobrecarregar(args))
+        finally:
+            encerrar_servicos(processos)
+
+    print(f"\n{'rodada':<14} {'classe':<8} {'atendidas':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}  status")
+    for nome, rodada in resultados.items():
+        for classe in ("critico", "normal"):
+            r = rodada[classe]
+            print(
+                f"{nome:<14} {classe:<8} {r['requisicoes']:>9} {r.get('p50_ms', 0):>9.1f} "
+                f"{r.get('p95_ms', 0):>9.1f} {r.get('p99_ms', 0):>9.1f}  {r['status']}"
+            )
+    print(f"Retry-After recebidos (com admissão): {resultados['com_admissao']['retry_after']}")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "saida"}
+    caminho = salvar_resultados("admissao", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
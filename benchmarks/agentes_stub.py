@@ -0,0 +1,76 @@
+"""Agentes falsos para medir o Gateway isoladamente.
+
+Respondem com o mesmo contrato dos agentes reais, sem modelo nem banco de
+dados. `STUB_LATENCIA_MS` acrescenta um atraso fixo a cada resposta, para
+simular o tempo de processamento dos agentes, e `STUB_CONCORRENCIA` limita
+quantas respostas são processadas ao mesmo tempo (0 = sem limite), para
+simular um agente com capacidade finita.
+
+    uvicorn benchmarks.agentes_stub:app_triagem --port 8000
+    uvicorn benchmarks.agentes_stub:app_recomendacoes --port 8001
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+
+LATENCIA_S = float(os.getenv("STUB_LATENCIA_MS", 0)) / 1000
+CONCORRENCIA = int(os.getenv("STUB_CONCORRENCIA", 0))
+
+RESULTADO_TRIAGEM = {
+    "resultado_triagem": "Urgência MÉDIA. A análise sugere que uma teleconsulta ou consulta seja realizada para avaliação!",
+    "critico": False,
+}
+RECOMENDACOES = {
+    "urgencia": "media",
+    "recomendacoes_gerais": {"orientacoes": ["Agende uma consulta médica nas próximas 24-48 horas"]},
+    "recomendacoes_especificas": [],
+    "medicos_recomendados": [
+        {"nome_local": "Clínica Stub", "especialidade": "Clínico Geral", "endereco": "Rua Falsa, 123",
+         "telefone": "(00) 90000-0000", "distancia_km": None},
+    ],
+    "observacoes": "Resposta gerada pelo agente de teste.",
+}
+
+
+_vagas = asyncio.Semaphore(CONCORRENCIA) if CONCORRENCIA > 0 else None
+
+
+async def simular_processamento() -> None:
+    if not LATENCIA_S:
+        return
+    if _vagas is None:
+        await asyncio.sleep(LATENCIA_S)
+        return
+    async with _vagas:
+        await asyncio.sleep(LATENCIA_S)
+
+
+app_triagem = FastAPI(title="Agente de Triagem (stub)")
+app_recomendacoes = FastAPI(title="Agente de Recomendações (stub)")
+
+
+@app_triagem.post("/triagem")
+async def triagem(entrada: Dict[str, Any]):
+    await simular_processamento()
+    return RESULTADO_TRIAGEM
+
+
+@app_triagem.post("/triagem/lote")
+async def triagem_lote(entrada: Dict[str, List[str]]):
+    await simular_processamento()
+    return {"resultados": [RESULTADO_TRIAGEM] * len(entrada.get("textos_sintomas", []))}
+
+
+@app_recomendacoes.post("/recomendacoes")
+async def recomendacoes(entrada: Dict[str, Any]):
+    await simular_processamento()
+    return RECOMENDACOES
+
+
+@app_triagem.get("/health")
+@app_recomendacoes.get("/health")
+async def saude():
+    return {"status": "healthy", "service": "stub"}
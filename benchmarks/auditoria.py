@@ -0,0 +1,130 @@
+# =================================================================================
+# auditoria.py - Custo da trilha de auditoria do Gateway no caminho da requisição
+#
+# Uso: python -m benchmarks.auditoria [--registros 20000] [--taxa 5000]
+#                                     [--fila-max 10000] [--saida resultados.json]
+#
+# Oferece `--registros` registros de auditoria a `--taxa` registros/s, de dentro
+# do event loop como o Gateway, e compara:
+#   - sincrono: cada registro é serializado e escrito no arquivo JSONL na hora
+#     (com e sem fsync por registro), como um log direto no caminho da requisição;
+#   - fila: `AuditoriaTriagem.registrar`, com a gravação em lotes em segundo
+#     plano, para cada formato (jsonl, sqlite) e política de fsync.
+# Para cada caso: tempo por registro no caminho da requisição (p50/p99 em µs),
+# registros descartados por fila cheia e tempo até tudo estar gravado.
+# =================================================================================
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.servicos import RAIZ, salvar_resultados
+
+sys.path.insert(0, os.path.join(RAIZ, "gateway"))
+
+from auditoria import AuditoriaTriagem, FORMATO_JSONL, FORMATO_SQLITE, FSYNC_INTERVALO, FSYNC_LOTE, FSYNC_NUNCA
+from comum.json_rapido import serializar
+
+RESULTADO_TRIAGEM = {
+    "resultado_triagem": "Urgência MÉDIA. A análise sugere que uma teleconsulta ou consulta seja realizada para avaliação!",
+    "critico": False, "origem": "modelo", "versao_modelo": "1-0123456789abcdef",
+}
+RECOMENDACOES = serializar({"urgencia": "media", "medicos_recomendados": [
+    {"nome_local": "Clínica Geral Dr. House", "especialidade": "Clínico Geral", "endereco": "Rua A, 1", "telefone": None},
+    {"nome_local": "UBS Família Feliz", "especialidade": "Clínica Médica", "endereco": "Rua B, 2", "telefone": None},
+]})
+# Registros oferecidos de uma vez antes de devolver o controle ao event loop.
+RAJADA = 50
+
+
+def resumir(tempos: list) -> dict:
+    quantis = statistics.quantiles(tempos, n=100)
+    return {"p50_us": round(quantis[49], 2), "p99_us": round(quantis[98], 2), "max_us": round(max(tempos), 1)}
+
+
+async def oferecer(registrar, registros: int, taxa: int) -> list:
+    tempos = []
+    inicio = time.perf_counter()
+    for i in range(registros):
+        t = time.perf_counter()
+        registrar(f"febre alta e dor no corpo há {i} dias")
+        tempos.append((time.perf_counter() - t) * 1e6)
+        if i % RAJADA == RAJADA - 1:
+            # Mantém a taxa pedida e deixa a tarefa de gravação rodar entre as rajadas.
+            await asyncio.sleep(max(0.0, inicio + (i + 1) / taxa - time.perf_counter()))
+    return tempos
+
+
+async def medir_sincrono(diretorio: str, fsync: bool, args) -> dict:
+    with open(os.path.join(diretorio, f"sincrono-{int(fsync)}.jsonl"), "ab") as arquivo:
+        def registrar(texto):
+            arquivo.write(serializar({
+                "registrado_em": time.time(), "texto": texto, "urgencia": "media", **RESULTADO_TRIAGEM,
+                "locais": RECOMENDACOES.decode(),
+            }) + b"\n")
+            arquivo.flush()
+            if fsync:
+                os.fsync(arquivo.fileno())
+
+        inicio = time.perf_counter()
+        tempos = await oferecer(registrar, args.registros, args.taxa)
+    return dict(resumir(tempos), descartados=0, tempo_total_s=round(time.perf_counter() - inicio, 3))
+
+
+async def medir_fila(diretorio: str, formato: str, politica_fsync: str, args) -> dict:
+    auditoria = AuditoriaTriagem(
+        os.path.join(diretorio, f"{formato}-{politica_fsync}"), formato=formato,
+        capacidade=args.fila_max, politica_fsync=politica_fsync,
+    )
+    await auditoria.iniciar()
+
+    def registrar(texto):
+        auditoria.registrar("triagem-completa", texto, RESULTADO_TRIAGEM, "media", False, RECOMENDACOES, False)
+
+    inicio = time.perf_counter()
+    tempos = await oferecer(registrar, args.registros, args.taxa)
+    fila_ao_fim = auditoria.na_fila
+    await auditoria.fechar()
+    estatisticas = auditoria.estatisticas()
+    return dict(
+        resumir(tempos), descartados=estatisticas["descartados"], gravados=estatisticas["gravados"],
+        fila_ao_fim=fila_ao_fim, tempo_total_s=round(time.perf_counter() - inicio, 3),
+    )
+
+
+async def executar(args) -> dict:
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        for fsync in (False, True):
+            resultados[f"sincrono/{'fsync' if fsync else 'sem_fsync'}"] = await medir_sincrono(diretorio, fsync, args)
+        for formato in (FORMATO_JSONL, FORMATO_SQLITE):
+            for politica in (FSYNC_NUNCA, FSYNC_INTERVALO, FSYNC_LOTE):
+                resultados[f"fila/{formato}/{politica}"] = await medir_fila(diretorio, formato, politica, args)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo da auditoria no caminho da requisição.")
+    parser.add_argument("--registros", type=int, default=20000)
+    parser.add_argument("--taxa", type=int, default=5000, help="Registros oferecidos por segundo.")
+    parser.add_argument("--fila-max", type=int, default=10000)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(executar(args))
+    print(f"\n{'caso':<24} {'p50 µs':>8} {'p99 µs':>8} {'máx µs':>9} {'descartados':>11} {'total s':>8}")
+    for nome, r in resultados.items():
+        print(f"{nome:<24} {r['p50_us']:>8.2f} {r['p99_us']:>8.2f} {r['max_us']:>9.1f} "
+              f"{r['descartados']:>11} {r['tempo_total_s']:>8.2f}")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "saida"}
+    caminho = salvar_resultados("auditoria", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# =================================================================================
+# carga.py - Teste de carga reproduzível do Gateway
+#
+# Uso: python -m benchmarks.carga [--agentes reais|stub|externo] [--url URL]
+#                                 [--endpoints triagem-completa,triagem-completa/stream,...]
+#                                 [--requisicoes 1000] [--concorrencia 16] [--taxa 0]
+#                                 [--corpus arquivo] [--saida resultados.json]
+#                                 [--comparar execucao_anterior.json]
+#
+# Reproduz um corpus de sintomas contra o Gateway e mede, por endpoint, vazão e
+# latência (p50/p95/p99). Os agentes podem ser os reais ou stubs (para medir só o
+# Gateway), ambos iniciados em localhost; com `--agentes externo`, usa o Gateway
+# já em execução em `--url`.
+#
+# `--taxa N` dispara N req/s em malha aberta: cada requisição tem um horário
+# agendado e a latência é contada a partir dele, então atrasos na fila aparecem
+# nos quantis. Com `--taxa 0`, cada trabalhador dispara assim que recebe a resposta.
+# O cache do Gateway é desativado nos serviços iniciados aqui (ver `--com-cache`).
+# =================================================================================
+
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+import httpx
+
+from benchmarks.servicos import (
+    CORPUS_PADRAO, aguardar, carregar_textos, comparar_resultados, encerrar_servicos, iniciar_servico,
+    resumir_latencias, salvar_resultados,
+)
+
+PORTA_TRIAGEM, PORTA_RECOMENDACOES, PORTA_GATEWAY = 18200, 18201, 18280
+ENDPOINTS = ("triagem-completa", "triagem-completa/stream", "triagem-completa/lote")
+
+
+async def disparar(
+    url: str, gerar_corpo: Callable[[int], dict], requisicoes: int, concorrencia: int,
+    taxa: float = 0.0, aquecimento: int = 20,
+) -> Dict[str, float]:
+    """Executa `requisicoes` POSTs em `url` e resume as latências."""
+    latencias: List[float] = []
+    erros = 0
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+
+    async with httpx.AsyncClient(timeout=60.0, limits=limites) as cliente:
+        # Aquecimento: abre conexões e carrega caches do sistema operacional.
+        for i in range(aquecimento):
+            await cliente.post(url, json=gerar_corpo(i))
+
+        proximo = itertools.count()
+        inicio = time.perf_counter()
+
+        async def trabalhador():
+            nonlocal erros
+            while (i := next(proximo)) < requisicoes:
+                agendado = inicio + i / taxa if taxa else time.perf_counter()
+                espera = agendado - time.perf_counter()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                try:
+                    resposta = await cliente.post(url, json=gerar_corpo(i))
+                    resposta.raise_for_status()
+                    latencias.append(time.perf_counter() - agendado)
+                except httpx.HTTPError:
+                    erros += 1
+
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio
+
+    return resumir_latencias(latencias, duracao, erros)
+
+
+def geradores_de_corpo(textos: List[str], tamanho_lote: int) -> Dict[str, Callable[[int], dict]]:
+    return {
+        "triagem-completa": lambda i: {"texto_sintomas": textos[i % len(textos)]},
+        "triagem-completa/stream": lambda i: {"texto_sintomas": textos[i % len(textos)]},
+        "triagem-completa/lote": lambda i: {
+            "textos_sintomas": [textos[(i * tamanho_lote + j) % len(textos)] for j in range(tamanho_lote)]
+        },
+    }
+
+
+def iniciar_ambiente(args) -> list:
+    env_gateway = {
+        "AGENTE_TRIAGEM_URL": f"http://127.0.0.1:{PORTA_TRIAGEM}",
+        "AGENTE_RECOMENDACOES_URL": f"http://127.0.0.1:{PORTA_RECOMENDACOES}",
+    }
+    if not args.com_cache:
+        env_gateway["GATEWAY_CACHE_CAPACIDADE"] = "0"
+    if args.agentes == "stub":
+        env_stub = {"STUB_LATENCIA_MS": str(args.latencia_stub_ms)}
+        processos = [
+            iniciar_servico(".", PORTA_TRIAGEM, env_stub, "benchmarks.agentes_stub:app_triagem"),
+            iniciar_servico(".", PORTA_RECOMENDACOES, env_stub, "benchmarks.agentes_stub:app_recomendacoes"),
+        ]
+    else:
+        processos = [
+            iniciar_servico("agente_triagem", PORTA_TRIAGEM, {}),
+            iniciar_servico("agente_recomendacoes", PORTA_RECOMENDACOES, {}),
+        ]
+    processos.append(iniciar_servico("gateway", PORTA_GATEWAY, env_gateway))
+    try:
+        aguardar(f"http://127.0.0.1:{PORTA_TRIAGEM}/docs")
+        aguardar(f"http://127.0.0.1:{PORTA_RECOMENDACOES}/health")
+        aguardar(f"http://127.0.0.1:{PORTA_GATEWAY}/")
+    except RuntimeError:
+        encerrar_servicos(processos)
+        raise
+    return processos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do Gateway TrIAgem.")
+    parser.add_argument("--agentes", choices=("reais", "stub", "externo"), default="reais")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{PORTA_GATEWAY}", help="Gateway (com --agentes externo).")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--requisicoes", type=int, default=1000, help="Requisições por endpoint.")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--taxa", type=float, default=0.0, help="Requisições por segundo (0 = sem limite).")
+    parser.add_argument("--tamanho-lote", type=int, default=20)
+    parser.add_argument("--aquecimento", type=int, default=20)
+    parser.add_argument("--corpus", default=CORPUS_PADRAO)
+    parser.add_argument("--semente", type=int, default=42, help="Embaralha o corpus de forma reproduzível.")
+    parser.add_argument("--latencia-stub-ms", type=float, default=0.0)
+    parser.add_argument("--com-cache", action="store_true", help="Mantém o cache de triagem do Gateway ativo.")
+    parser.add_argument("--saida")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior; compara o p95.")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Piora aceitável do p95 (fração).")
+    args = parser.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    desconhecidos = set(endpoints) - set(ENDPOINTS)
+    if desconhecidos:
+        parser.error(f"endpoints desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    textos = carregar_textos(args.corpus)
+    random.Random(args.semente).shuffle(textos)
+    geradores = geradores_de_corpo(textos, args.tamanho_lote)
+
+    processos = [] if args.agentes == "externo" else iniciar_ambiente(args)
+    url_base = args.url.rstrip("/")
+    resultados = {}
+    try:
+        print(f"{'endpoint':<24} {'vazão (req/s)':>14} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'erros':>6}")
+        for endpoint in endpoints:
+            r = asyncio.run(disparar(
+                f"{url_base}/{endpoint}", geradores[endpoint], args.requisicoes, args.concorrencia,
+                args.taxa, args.aquecimento,
+            ))
+            resultados[endpoint] = r
+            if "p50_ms" in r:
+                print(f"{endpoint:<24} {r['vazao_rps']:>14.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                      f"{r['p99_ms']:>9.2f} {r['erros']:>6}")
+            else:
+                print(f"{endpoint:<24} {'-':>14} {'-':>9} {'-':>9} {'-':>9} {r['erros']:>6}")
+    finally:
+        encerrar_servicos(processos)
+
+    parametros = {chave: valor for chave, valor in vars(args).items() if chave not in ("saida", "comparar")}
+    caminho = salvar_resultados("carga", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+    if args.comparar and comparar_resultados(args.comparar, resultados, "p95_ms", args.tolerancia):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
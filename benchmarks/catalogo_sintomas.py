@@ -0,0 +1,108 @@
+# =================================================================================
+# catalogo_sintomas.py - Extração de sintomas com catálogos grandes
+#
+# Uso: python -m benchmarks.catalogo_sintomas [--sinonimos 1000,10000,50000]
+#                                             [--textos 1000] [--saida resultados.json]
+#
+# Para cada tamanho de catálogo, gera um banco com o catálogo do create_database.py
+# mais sinônimos fictícios e mede, por texto do corpus de sintomas, o tempo de
+# `CatalogoSintomas.extrair`:
+#   - sem_cache: uma consulta FTS5 a cada texto;
+#   - com_cache: os mesmos textos outra vez, já no cache LRU.
+# Como referência, mede também o autômato de Aho–Corasick em memória com os
+# mesmos sinônimos (tempo de montagem e por texto) e confere que os dois
+# encontram os mesmos sintomas.
+# =================================================================================
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.servicos import RAIZ, carregar_textos, salvar_resultados
+
+sys.path.insert(0, os.path.join(RAIZ, "agente_recomendacoes"))
+
+from catalogo_sintomas import CatalogoSintomas, palavras
+from comum.palavras_chave import AutomatoPalavrasChave
+from create_database import DICAS, SINONIMOS, SINTOMAS, SUFIXO_RADICAL, criar_banco, inserir_catalogo
+from gerar_dados_sinteticos import gerar_catalogo
+
+
+def tempos_ms(funcao, textos) -> list:
+    tempos = []
+    for texto in textos:
+        inicio = time.perf_counter()
+        funcao(texto)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def resumir(tempos: list) -> dict:
+    quantis = statistics.quantiles(tempos, n=100)
+    return {"media_ms": round(statistics.fmean(tempos), 4), "p50_ms": round(quantis[49], 4),
+            "p99_ms": round(quantis[98], 4), "max_ms": round(max(tempos), 4)}
+
+
+def medir(caminho_db: str, sinonimos: dict, textos: list) -> dict:
+    catalogo = CatalogoSintomas(caminho_db, capacidade_cache=len(textos) * 2, intervalo_verificacao_s=3600)
+    sem_cache = tempos_ms(catalogo.extrair, textos)
+    com_cache = tempos_ms(catalogo.extrair, textos)
+
+    inicio = time.perf_counter()
+    # Com palavras inteiras, como no catálogo: cada sinônimo e o texto entre espaços
+    # (radicais, terminados em "*", sem o espaço do fim).
+    automato = AutomatoPalavrasChave(
+        (f" {' '.join(palavras(termo))}{'' if termo.endswith(SUFIXO_RADICAL) else ' '}", sintoma)
+        for sintoma, termos in sinonimos.items() for termo in termos
+    )
+    montagem_ms = (time.perf_counter() - inicio) * 1000
+
+    def extrair_automato(texto):
+        return automato.encontrar(f" {' '.join(palavras(texto))} ")
+
+    divergencias = sum(set(catalogo.extrair(texto)) != extrair_automato(texto) for texto in textos)
+    return {
+        "sem_cache": resumir(sem_cache),
+        "com_cache": resumir(com_cache),
+        "automato": dict(resumir(tempos_ms(extrair_automato, textos)), montagem_ms=round(montagem_ms, 1)),
+        "divergencias": divergencias,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extração de sintomas com catálogos de tamanhos diferentes.")
+    parser.add_argument("--sinonimos", default="1000,10000,50000", help="Sinônimos fictícios em cada catálogo.")
+    parser.add_argument("--textos", type=int, default=1000)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    # Textos distintos, para a primeira passada não acertar o cache.
+    textos = list(dict.fromkeys(carregar_textos()))[: args.textos]
+    resultados = {}
+    print(f"\n{'sinônimos':>10} {'sem cache p50/p99 (ms)':>23} {'com cache p50 (ms)':>19} "
+          f"{'autômato p50 (ms)':>18} {'divergências':>13}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for quantidade in (int(n) for n in args.sinonimos.split(",")):
+            caminho_db = os.path.join(diretorio, f"catalogo-{quantidade}.db")
+            conn = criar_banco(caminho_db)
+            inserir_catalogo(conn, SINTOMAS, SINONIMOS, DICAS)
+            sintomas_ficticios, sinonimos_ficticios = gerar_catalogo(quantidade, 42)
+            inserir_catalogo(conn, sintomas_ficticios, sinonimos_ficticios, {})
+            conn.close()
+
+            r = resultados[str(quantidade)] = medir(caminho_db, {**SINONIMOS, **sinonimos_ficticios}, textos)
+            print(
+                f"{quantidade:>10} {r['sem_cache']['p50_ms']:>14.3f} / {r['sem_cache']['p99_ms']:<6.3f} "
+                f"{r['com_cache']['p50_ms']:>19.4f} {r['automato']['p50_ms']:>18.3f} {r['divergencias']:>13}"
+            )
+
+    parametros = {k: v for k, v in vars(args).items() if k != "saida"}
+    caminho = salvar_resultados("catalogo_sintomas", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
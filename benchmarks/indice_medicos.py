@@ -0,0 +1,69 @@
+# =================================================================================
+# indice_medicos.py - Benchmark da seleção de locais de atendimento
+#
+# Uso: python benchmarks/indice_medicos.py [--quantidade 100000] [--repeticoes 200]
+#
+# Gera um banco sintético e compara, por chamada de `recomendar_medicos`:
+#   - legado: nova conexão SQLite + `ORDER BY RANDOM() LIMIT n` a cada requisição;
+#   - índice: sorteio nos baldes em memória do IndiceMedicos.
+# =================================================================================
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import timeit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "agente_recomendacoes"))
+
+from gerar_dados_sinteticos import gerar_medicos
+from create_database import criar_banco, inserir_medicos
+
+
+def recomendar_legado(caminho_db: str, urgencia: str, especialidade: str):
+    conn = sqlite3.connect(caminho_db)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT nome_local, especialidade, endereco, telefone FROM medicos WHERE especialidade = ? AND nivel_urgencia = 'media' ORDER BY RANDOM() LIMIT 1",
+        (especialidade,)
+    )
+    linhas = [cursor.fetchone()]
+    cursor.execute(
+        "SELECT nome_local, especialidade, endereco, telefone FROM medicos WHERE nivel_urgencia = ? ORDER BY RANDOM() LIMIT ?",
+        (urgencia, 1)
+    )
+    linhas += cursor.fetchall()
+    conn.close()
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da seleção de locais de atendimento.")
+    parser.add_argument("--quantidade", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho_db = os.path.join(tmp, "medicos.db")
+        conn = criar_banco(caminho_db)
+        inserir_medicos(conn, gerar_medicos(args.quantidade, 42))
+        conn.close()
+
+        os.environ["RECOMENDACOES_ARQUIVO_DB"] = caminho_db
+        import main as agente
+
+        n = args.repeticoes
+        t_legado = timeit.timeit(lambda: recomendar_legado(caminho_db, "media", "Neurologista"), number=n) / n
+        t_indice = timeit.timeit(lambda: agente.recomendar_medicos("media", ["dor_cabeca"]), number=n) / n
+
+    print(f"Locais no banco: {args.quantidade}")
+    print(f"legado (SQLite, ORDER BY RANDOM): {t_legado * 1e3:9.3f} ms/chamada")
+    print(f"índice em memória:                {t_indice * 1e3:9.3f} ms/chamada")
+    print(f"aceleração: {t_legado / t_indice:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# =================================================================================
+# inicializacao_triagem.py - Benchmark do tempo de inicialização do Agente de Triagem
+#
+# Uso: python benchmarks/inicializacao_triagem.py [--repeticoes 5] [--multiplicador 1]
+#
+# Mede, em processos novos (cold start), o tempo para importar o `main` do agente:
+#   - legado:   FastAPI + pandas.read_csv + treino do pipeline no import (comportamento antigo);
+#   - treino:   sem artefato disponível, o agente treina e salva o modelo;
+#   - artefato: o agente apenas carrega o artefato versionado.
+#
+# `--multiplicador N` replica o CSV de treino N vezes, simulando um dataset maior:
+# o custo do treino cresce com os dados, o do carregamento do artefato não.
+# =================================================================================
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DIRETORIO_AGENTE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agente_triagem")
+
+CODIGO_LEGADO = """
+import os
+import fastapi
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import LogisticRegression
+from sklearn.feature_extraction.text import TfidfVectorizer
+df = pd.read_csv(os.environ['TRIAGEM_ARQUIVO_DADOS'], sep=';')
+modelo = Pipeline([('vectorizer', TfidfVectorizer()), ('classifier', LogisticRegression(max_iter=1000))])
+modelo.fit(df['texto'], df['urgencia'])
+"""
+
+
+def medir(codigo: str, env: dict) -> float:
+    inicio = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", codigo], cwd=DIRETORIO_AGENTE, env=env,
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - inicio
+
+
+def gerar_csv(destino: str, multiplicador: int) -> int:
+    with open(os.path.join(DIRETORIO_AGENTE, "dados_triagem.csv"), encoding="utf-8") as origem:
+        cabecalho, *linhas = origem.read().splitlines()
+    with open(destino, "w", encoding="utf-8") as saida:
+        saida.write(cabecalho + "\n")
+        for i in range(multiplicador):
+            # Um sufixo numérico evita que as cópias sejam exatamente iguais.
+            sufixo = f" {i}" if i else ""
+            for linha in linhas:
+                texto, urgencia = linha.rsplit(";", 1)
+                saida.write(f"{texto}{sufixo};{urgencia}\n")
+    return len(linhas) * multiplicador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cold start do Agente de Triagem.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--multiplicador", type=int, default=1, help="Replica o CSV de treino N vezes.")
+    args = parser.parse_args()
+
+    resultados = {"legado": [], "treino": [], "artefato": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dados = os.path.join(tmp, "dados_triagem.csv")
+        artefato = os.path.join(tmp, "modelo_triagem.joblib")
+        exemplos = gerar_csv(dados, args.multiplicador)
+        env = dict(
+            os.environ, PYTHONDONTWRITEBYTECODE="1",
+            TRIAGEM_ARQUIVO_DADOS=dados, TRIAGEM_ARQUIVO_MODELO=artefato,
+        )
+
+        for _ in range(args.repeticoes):
+            resultados["legado"].append(medir(CODIGO_LEGADO, env))
+            if os.path.exists(artefato):
+                os.remove(artefato)
+            resultados["treino"].append(medir("import main", env))
+            # O artefato gerado na rodada anterior agora é reaproveitado.
+            resultados["artefato"].append(medir("import main", env))
+
+    print(f"Exemplos de treino: {exemplos} | repetições: {args.repeticoes}")
+    print(f"{'cenário':<10} {'mediana (s)':>12} {'mín (s)':>10} {'máx (s)':>10}")
+    for nome, tempos in resultados.items():
+        print(f"{nome:<10} {statistics.median(tempos):>12.3f} {min(tempos):>10.3f} {max(tempos):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# =================================================================================
+# micro.py - Microbenchmarks dos caminhos quentes dos agentes
+#
+# Uso: python -m benchmarks.micro [--repeticoes 7] [--saida resultados.json]
+#                                 [--comparar execucao_anterior.json] [--tolerancia 0.15]
+#
+# Mede o tempo por chamada de `classificar_sintomas`, `extrair_sintomas_chave`,
+# `recomendar_medicos` e `montar_recomendacoes`, importando os agentes como no
+# modo nó único do Gateway.
+# Cada caso roda em várias repetições e o resultado usa a mediana, que é pouco
+# sensível a interrupções ocasionais. Com `--comparar`, termina com código 1 se
+# algum caso piorar além da tolerância.
+# =================================================================================
+
+import argparse
+import statistics
+import sys
+import timeit
+
+from benchmarks.servicos import carregar_textos, comparar_resultados, salvar_resultados
+from gateway.no_unico import DIRETORIO_AGENTE_RECOMENDACOES, DIRETORIO_AGENTE_TRIAGEM, carregar_modulo_agente
+
+TEXTO_MODELO = "estou com tosse e um pouco de febre desde ontem"
+TEXTO_CRITICO = "meu pai está com dor no peito e falta de ar"
+TEXTO_SINTOMAS = "dor de cabeça forte, febre e enjoo depois do almoço"
+LOCALIZACAO = (-21.245, -45.0)
+
+
+def casos(triagem, recomendacoes, textos):
+    lote = textos[:100]
+    sintomas = recomendacoes.extrair_sintomas_chave(TEXTO_SINTOMAS)
+    entrada = recomendacoes.TriagemInput(urgencia="media", sintomas_texto=TEXTO_SINTOMAS, resultado_triagem="")
+    return {
+        "classificar_sintomas/modelo": lambda: triagem.classificar_sintomas(TEXTO_MODELO),
+        "classificar_sintomas/regras": lambda: triagem.classificar_sintomas(TEXTO_CRITICO),
+        "classificar_lote/100": lambda: triagem.classificar_lote(lote),
+        "extrair_sintomas_chave": lambda: recomendacoes.extrair_sintomas_chave(TEXTO_SINTOMAS),
+        "recomendar_medicos/media": lambda: recomendacoes.recomendar_medicos("media", sintomas),
+        "recomendar_medicos/proximos": lambda: recomendacoes.recomendar_medicos("alta", [], LOCALIZACAO),
+        "montar_recomendacoes/media": lambda: recomendacoes.montar_recomendacoes(entrada),
+    }
+
+
+def medir(funcao, repeticoes: int) -> dict:
+    cronometro = timeit.Timer(funcao)
+    # Calibra o número de chamadas para ~0,2 s por repetição.
+    chamadas, _ = cronometro.autorange()
+    tempos = [t / chamadas * 1e6 for t in cronometro.repeat(repeat=repeticoes, number=chamadas)]
+    return {
+        "chamadas_por_repeticao": chamadas,
+        "mediana_us": round(statistics.median(tempos), 3),
+        "minimo_us": round(min(tempos), 3),
+        "desvio_us": round(statistics.stdev(tempos), 3) if len(tempos) > 1 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks dos agentes de triagem e recomendações.")
+    parser.add_argument("--repeticoes", type=int, default=7)
+    parser.add_argument("--filtro", default="", help="Executa só os casos que contêm este texto.")
+    parser.add_argument("--saida")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior; compara a mediana.")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="Piora aceitável da mediana (fração).")
+    args = parser.parse_args()
+
+    triagem = carregar_modulo_agente("agente_triagem_main", DIRETORIO_AGENTE_TRIAGEM)
+    recomendacoes = carregar_modulo_agente("agente_recomendacoes_main", DIRETORIO_AGENTE_RECOMENDACOES)
+    textos = carregar_textos()
+
+    resultados = {}
+    print(f"\n{'caso':<32} {'mediana (µs)':>13} {'mínimo (µs)':>12} {'desvio (µs)':>12}")
+    for nome, funcao in casos(triagem, recomendacoes, textos).items():
+        if args.filtro not in nome:
+            continue
+        r = resultados[nome] = medir(funcao, args.repeticoes)
+        print(f"{nome:<32} {r['mediana_us']:>13.2f} {r['minimo_us']:>12.2f} {r['desvio_us']:>12.2f}")
+
+    parametros = {"repeticoes": args.repeticoes, "filtro": args.filtro}
+    caminho = salvar_resultados("micro", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+    if args.comparar and comparar_resultados(args.comparar, resultados, "mediana_us", args.tolerancia):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
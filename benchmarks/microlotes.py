@@ -0,0 +1,111 @@
+# =================================================================================
+# microlotes.py - Benchmark do agrupamento de previsões no Agente de Triagem
+#
+# Uso: python -m benchmarks.microlotes [--modo processo|http] [--requisicoes 3000]
+#                                      [--concorrencia 32] [--tamanhos 1,16,64]
+#                                      [--janela-ms 2]
+#
+# Compara o caminho de classificação com diferentes tamanhos máximos de
+# micro-lote (tamanho 1 = uma previsão por requisição) e com o comportamento
+# antigo (endpoint síncrono: cada previsão em uma thread do threadpool).
+#   - processo: chama o agente em processo, isolando o modelo da pilha HTTP;
+#   - http: sobe o agente com uvicorn e dispara POST /triagem.
+# Os textos excluem saudações e casos críticos, para que todos cheguem ao modelo.
+# =================================================================================
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.carga import disparar
+from benchmarks.servicos import (
+    aguardar, carregar_textos, encerrar_servicos, iniciar_servico, resumir_latencias, salvar_resultados
+)
+from comum.regras_criticas import e_caso_critico
+
+PORTA_TRIAGEM = 18400
+# Tamanho padrão do threadpool do Starlette (AnyIO), usado pelos endpoints síncronos.
+THREADS_STARLETTE = 40
+
+
+async def disparar_em_processo(classificar, textos, requisicoes: int, concorrencia: int) -> dict:
+    latencias = []
+    indices = iter(range(requisicoes))
+
+    async def trabalhador():
+        for i in indices:
+            inicio = time.perf_counter()
+            await classificar(textos[i % len(textos)])
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    return resumir_latencias(latencias, time.perf_counter() - inicio)
+
+
+def medir_em_processo(textos, tamanhos, args) -> dict:
+    from gateway.no_unico import DIRETORIO_AGENTE_TRIAGEM, carregar_modulo_agente
+
+    triagem = carregar_modulo_agente("agente_triagem_main", DIRETORIO_AGENTE_TRIAGEM)
+    triagem.agrupador.janela_s = args.janela_ms / 1000
+    resultados = {}
+    executor = ThreadPoolExecutor(THREADS_STARLETTE)
+
+    async def threadpool(texto):
+        return await asyncio.get_running_loop().run_in_executor(executor, triagem.classificar_sintomas, texto)
+
+    resultados["threadpool"] = asyncio.run(
+        disparar_em_processo(threadpool, textos, args.requisicoes, args.concorrencia)
+    )
+    for tamanho in tamanhos:
+        triagem.agrupador.tamanho_max = tamanho
+        resultados[f"tamanho_{tamanho}"] = asyncio.run(disparar_em_processo(
+            triagem.classificar_sintomas_agrupado, textos, args.requisicoes, args.concorrencia
+        ))
+    executor.shutdown()
+    return resultados
+
+
+def medir_http(textos, tamanhos, args) -> dict:
+    corpo = lambda i: {"texto_sintomas": textos[i % len(textos)]}
+    url = f"http://127.0.0.1:{PORTA_TRIAGEM}/triagem"
+    resultados = {}
+    for tamanho in tamanhos:
+        env = {"TRIAGEM_LOTE_TAMANHO_MAX": str(tamanho), "TRIAGEM_LOTE_JANELA_MS": str(args.janela_ms)}
+        processos = [iniciar_servico("agente_triagem", PORTA_TRIAGEM, env)]
+        try:
+            aguardar(f"http://127.0.0.1:{PORTA_TRIAGEM}/docs")
+            resultados[f"tamanho_{tamanho}"] = asyncio.run(
+                disparar(url, corpo, args.requisicoes, args.concorrencia)
+            )
+        finally:
+            encerrar_servicos(processos)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara tamanhos de micro-lote no Agente de Triagem.")
+    parser.add_argument("--modo", choices=("processo", "http"), default="processo")
+    parser.add_argument("--requisicoes", type=int, default=3000)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--tamanhos", default="1,16,64")
+    parser.add_argument("--janela-ms", type=float, default=2.0)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    textos = [texto for texto in carregar_textos() if len(texto.split()) > 1 and not e_caso_critico(texto)]
+    tamanhos = [int(t) for t in args.tamanhos.split(",")]
+    medir = medir_em_processo if args.modo == "processo" else medir_http
+    resultados = medir(textos, tamanhos, args)
+
+    print(f"\n{'variante':<12} {'vazão (req/s)':>14} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for nome, r in resultados.items():
+        print(f"{nome:<12} {r['vazao_rps']:>14.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+    caminho = salvar_resultados(f"microlotes-{args.modo}", vars(args), resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
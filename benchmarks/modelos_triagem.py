@@ -0,0 +1,183 @@
+# =================================================================================
+# modelos_triagem.py - Custo e acurácia de configurações do modelo de triagem
+#
+# Uso: python -m benchmarks.modelos_triagem [--dados dados_triagem.csv] [--folds 5]
+#                                           [--configuracoes tfidf_logistica,...]
+#                                           [--recall-minimo 0.9] [--lote 64]
+#                                           [--repeticoes 300] [--saida resultados.json]
+#
+# Para cada configuração de vetorizador + classificador (as duas de produção,
+# `tfidf_logistica` e `hashing_sgd`, e variações de n-gramas, `max_features`,
+# n-gramas de caracteres e hashing), mede:
+#   - com validação cruzada estratificada: acurácia, precisão e recall da classe
+#     "alta" (só o modelo e com o pré-filtro de regras críticas do agente, como
+#     no serviço) e o tempo de treino;
+#   - com o modelo treinado em todos os dados: latência do `predict` de um texto
+#     e de um lote (por texto) e o tamanho do modelo serializado.
+# Ao fim, indica a configuração de menor latência que atinge o recall mínimo da
+# classe "alta" com as regras.
+# `--dados` aceita qualquer CSV rotulado no formato do dados_triagem.csv.
+# =================================================================================
+
+import argparse
+import os
+import pickle
+import statistics
+import sys
+import time
+
+from benchmarks.servicos import CORPUS_PADRAO, RAIZ, salvar_resultados
+
+sys.path.insert(0, os.path.join(RAIZ, "agente_triagem"))
+
+from comum.regras_criticas import e_caso_critico
+from modelo import TIPO_INCREMENTAL, TIPO_TFIDF, ler_dados_treino, treinar_pipeline
+
+CLASSE_ALTA = "alta"
+
+
+def _pipeline(vetorizador, classificador):
+    def treinar(textos, rotulos):
+        from sklearn.pipeline import Pipeline
+
+        modelo = Pipeline([("vectorizer", vetorizador()), ("classifier", classificador())])
+        return modelo.fit(textos, rotulos)
+    return treinar
+
+
+def _configuracoes() -> dict:
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.naive_bayes import ComplementNB
+
+    def logistica():
+        return LogisticRegression(max_iter=1000)
+
+    return {
+        TIPO_TFIDF: lambda textos, rotulos: treinar_pipeline(textos, rotulos, TIPO_TFIDF),
+        TIPO_INCREMENTAL: lambda textos, rotulos: treinar_pipeline(textos, rotulos, TIPO_INCREMENTAL),
+        "tfidf_bigramas": _pipeline(lambda: TfidfVectorizer(ngram_range=(1, 2)), logistica),
+        "tfidf_max_500": _pipeline(lambda: TfidfVectorizer(max_features=500), logistica),
+        "tfidf_caracteres": _pipeline(lambda: TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4)), logistica),
+        "hashing_logistica": _pipeline(
+            lambda: HashingVectorizer(n_features=2 ** 14, alternate_sign=False, ngram_range=(1, 2)), logistica
+        ),
+        "hashing_sgd_2e14": _pipeline(
+            lambda: HashingVectorizer(n_features=2 ** 14, alternate_sign=False),
+            lambda: SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=50, tol=None, random_state=42),
+        ),
+        "tfidf_complement_nb": _pipeline(lambda: TfidfVectorizer(ngram_range=(1, 2)), ComplementNB),
+    }
+
+
+def com_regras(textos, previsoes) -> list:
+    """Previsões como o agente as entrega: casos críticos viram "alta" antes do modelo."""
+    return [CLASSE_ALTA if e_caso_critico(texto) else previsao for texto, previsao in zip(textos, previsoes)]
+
+
+def validar(treinar, textos, rotulos, folds: int) -> dict:
+    from sklearn.metrics import accuracy_score, precision_score, recall_score
+    from sklearn.model_selection import StratifiedKFold
+
+    textos_teste, reais, previstos, tempos_treino = [], [], [], []
+    divisor = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    for indices_treino, indices_teste in divisor.split(textos, rotulos):
+        inicio = time.perf_counter()
+        modelo = treinar([textos[i] for i in indices_treino], [rotulos[i] for i in indices_treino])
+        tempos_treino.append(time.perf_counter() - inicio)
+        teste = [textos[i] for i in indices_teste]
+        textos_teste += teste
+        reais += [rotulos[i] for i in indices_teste]
+        previstos += list(modelo.predict(teste))
+
+    previstos_regras = com_regras(textos_teste, previstos)
+    metrica = dict(labels=[CLASSE_ALTA], average="micro", zero_division=0)
+    return {
+        "acuracia": round(accuracy_score(reais, previstos), 4),
+        "precisao_alta": round(precision_score(reais, previstos, **metrica), 4),
+        "recall_alta": round(recall_score(reais, previstos, **metrica), 4),
+        "acuracia_com_regras": round(accuracy_score(reais, previstos_regras), 4),
+        "recall_alta_com_regras": round(recall_score(reais, previstos_regras, **metrica), 4),
+        "treino_ms": round(statistics.fmean(tempos_treino) * 1000, 2),
+    }
+
+
+def medir_latencia(modelo, textos, lote: int, repeticoes: int) -> dict:
+    # Aquecimento: a primeira chamada paga importações e alocações preguiçosas.
+    modelo.predict(textos[:1])
+    unitarios = []
+    for i in range(repeticoes):
+        texto = textos[i % len(textos)]
+        inicio = time.perf_counter()
+        modelo.predict([texto])
+        unitarios.append((time.perf_counter() - inicio) * 1e6)
+    lotes = []
+    textos_lote = [textos[i % len(textos)] for i in range(lote)]
+    for _ in range(max(repeticoes // 10, 5)):
+        inicio = time.perf_counter()
+        modelo.predict(textos_lote)
+        lotes.append((time.perf_counter() - inicio) * 1e6 / lote)
+    quantis = statistics.quantiles(unitarios, n=100)
+    return {
+        "unitario_p50_us": round(quantis[49], 1),
+        "unitario_p99_us": round(quantis[98], 1),
+        "lote_por_texto_us": round(statistics.median(lotes), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Acurácia e custo de configurações do modelo de triagem.")
+    parser.add_argument("--dados", default=CORPUS_PADRAO, help="CSV rotulado (colunas texto;urgencia).")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--configuracoes", help="Nomes separados por vírgula (padrão: todas).")
+    parser.add_argument("--recall-minimo", type=float, default=0.9,
+                        help="Recall mínimo da classe 'alta' (com as regras) para recomendar uma configuração.")
+    parser.add_argument("--lote", type=int, default=64, help="Tamanho do lote na latência em lote.")
+    parser.add_argument("--repeticoes", type=int, default=300, help="Previsões unitárias medidas por configuração.")
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    textos, rotulos = ler_dados_treino(args.dados)
+    # O agente classifica o texto já em minúsculas.
+    textos = [texto.lower() for texto in textos]
+    configuracoes = _configuracoes()
+    if args.configuracoes:
+        nomes = args.configuracoes.split(",")
+        desconhecidas = set(nomes) - set(configuracoes)
+        if desconhecidas:
+            parser.error(f"configurações desconhecidas: {', '.join(sorted(desconhecidas))}")
+        configuracoes = {nome: configuracoes[nome] for nome in nomes}
+
+    print(f"{len(textos)} exemplos, {args.folds} folds")
+    print(f"\n{'configuração':<26} {'acurácia':>8} {'recall alta':>11} {'c/ regras':>9} {'treino ms':>9} "
+          f"{'1 texto p50/p99 µs':>19} {'lote µs/texto':>13} {'tamanho KiB':>11}")
+    resultados = {}
+    for nome, treinar in configuracoes.items():
+        r = validar(treinar, textos, rotulos, args.folds)
+        modelo = treinar(textos, rotulos)
+        r.update(medir_latencia(modelo, textos, args.lote, args.repeticoes))
+        r["tamanho_kib"] = round(len(pickle.dumps(modelo)) / 1024, 1)
+        resultados[nome] = r
+        print(
+            f"{nome:<26} {r['acuracia']:>8.3f} {r['recall_alta']:>11.3f} {r['recall_alta_com_regras']:>9.3f} "
+            f"{r['treino_ms']:>9.1f} {r['unitario_p50_us']:>10.1f} / {r['unitario_p99_us']:<6.1f} "
+            f"{r['lote_por_texto_us']:>13.1f} {r['tamanho_kib']:>11.1f}"
+        )
+
+    aprovadas = [nome for nome, r in resultados.items() if r["recall_alta_com_regras"] >= args.recall_minimo]
+    if aprovadas:
+        melhor = min(aprovadas, key=lambda nome: resultados[nome]["unitario_p50_us"])
+        print(f"\nMenor latência com recall da classe 'alta' >= {args.recall_minimo}: {melhor}")
+    else:
+        melhor = None
+        print(f"\nNenhuma configuração atingiu recall da classe 'alta' >= {args.recall_minimo}")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "saida"}
+    parametros["exemplos"] = len(textos)
+    caminho = salvar_resultados("modelos_triagem", parametros, {"configuracoes": resultados, "recomendada": melhor},
+                                args.saida)
+    print(f"Resultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
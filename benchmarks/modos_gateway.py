@@ -0,0 +1,58 @@
+# =================================================================================
+# modos_gateway.py - Benchmark: modo distribuído (HTTP) x modo nó único (in-process)
+#
+# Uso: python -m benchmarks.modos_gateway [--requisicoes 500] [--concorrencia 16]
+#
+# Sobe os serviços em localhost com uvicorn, dispara /triagem-completa com textos
+# do dataset de treino e compara latência (p50/p95/p99) e vazão dos dois modos.
+# O cache do Gateway é desativado para que todas as requisições cheguem aos agentes.
+# =================================================================================
+
+import argparse
+import asyncio
+
+from benchmarks.carga import disparar
+from benchmarks.servicos import aguardar, carregar_textos, encerrar_servicos, iniciar_servico
+
+PORTA_TRIAGEM, PORTA_RECOMENDACOES, PORTA_GATEWAY = 18100, 18101, 18180
+
+
+def medir_modo(modo: str, textos: list, args) -> dict:
+    env_gateway = {
+        "GATEWAY_MODO": modo,
+        "GATEWAY_CACHE_CAPACIDADE": "0",
+        "AGENTE_TRIAGEM_URL": f"http://127.0.0.1:{PORTA_TRIAGEM}",
+        "AGENTE_RECOMENDACOES_URL": f"http://127.0.0.1:{PORTA_RECOMENDACOES}",
+    }
+    processos = []
+    try:
+        if modo == "distribuido":
+            processos.append(iniciar_servico("agente_triagem", PORTA_TRIAGEM, {}))
+            processos.append(iniciar_servico("agente_recomendacoes", PORTA_RECOMENDACOES, {}))
+            aguardar(f"http://127.0.0.1:{PORTA_RECOMENDACOES}/health")
+        processos.append(iniciar_servico("gateway", PORTA_GATEWAY, env_gateway))
+        aguardar(f"http://127.0.0.1:{PORTA_GATEWAY}/")
+        if modo == "distribuido":
+            aguardar(f"http://127.0.0.1:{PORTA_TRIAGEM}/docs")
+        url = f"http://127.0.0.1:{PORTA_GATEWAY}/triagem-completa"
+        corpo = lambda i: {"texto_sintomas": textos[i % len(textos)]}
+        return asyncio.run(disparar(url, corpo, args.requisicoes, args.concorrencia))
+    finally:
+        encerrar_servicos(processos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os modos distribuído e nó único do Gateway.")
+    parser.add_argument("--requisicoes", type=int, default=500)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    args = parser.parse_args()
+
+    textos = carregar_textos()
+    print(f"{'modo':<12} {'vazão (req/s)':>14} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for modo in ("distribuido", "no_unico"):
+        r = medir_modo(modo, textos, args)
+        print(f"{modo:<12} {r['vazao_rps']:>14.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
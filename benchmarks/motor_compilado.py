@@ -0,0 +1,131 @@
+# =================================================================================
+# motor_compilado.py - Modelo de triagem compilado (NumPy) x pipeline do scikit-learn
+#
+# Uso: python -m benchmarks.motor_compilado [--repeticoes 5] [--chamadas 2000]
+#                                           [--lote 64] [--saida resultados.json]
+#
+# Compara os dois motores de previsão do Agente de Triagem (TRIAGEM_MOTOR):
+#   - em processos novos: tempo para importar o `main` do agente e carregar o
+#     modelo, e o pico de memória (RSS) do processo;
+#   - no mesmo processo: latência do `predict` de um texto e de um lote;
+#   - paridade: previsões divergentes e maior diferença entre as pontuações nos
+#     textos do corpus.
+# =================================================================================
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.servicos import CORPUS_PADRAO, RAIZ, carregar_textos, salvar_resultados
+
+DIRETORIO_AGENTE = os.path.join(RAIZ, "agente_triagem")
+sys.path.insert(0, DIRETORIO_AGENTE)
+
+from modelo import (
+    MOTOR_COMPILADO, MOTOR_SKLEARN, caminho_compilado, compilar_artefato, construir_artefato, salvar_artefato,
+    salvar_compilado,
+)
+from modelo_compilado import verificar_paridade
+
+# Importa o agente como no serviço e informa o tempo e o pico de memória do processo.
+# O pico vem de VmHWM: o ru_maxrss herdaria o pico deste processo, que o cria por fork.
+CODIGO_INICIALIZACAO = """
+import sys, time
+inicio = time.perf_counter()
+import main
+duracao = time.perf_counter() - inicio
+modulos = sorted(m for m in ("sklearn", "scipy", "joblib", "pandas") if m in sys.modules)
+pico_kib = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmHWM:"))
+print(duracao, pico_kib, ",".join(modulos) or "-")
+"""
+
+
+def medir_inicializacao(env: dict) -> dict:
+    saida = subprocess.run(
+        [sys.executable, "-c", CODIGO_INICIALIZACAO], cwd=DIRETORIO_AGENTE, env=env,
+        check=True, capture_output=True, text=True,
+    ).stdout.splitlines()[-1].split()
+    return {"segundos": float(saida[0]), "rss_max_mib": int(saida[1]) / 1024, "modulos": saida[2]}
+
+
+def latencia_us(predict, textos, lote: int, chamadas: int) -> dict:
+    predict(textos[:1])
+    unitarios = []
+    for i in range(chamadas):
+        inicio = time.perf_counter()
+        predict([textos[i % len(textos)]])
+        unitarios.append((time.perf_counter() - inicio) * 1e6)
+    textos_lote = [textos[i % len(textos)] for i in range(lote)]
+    lotes = []
+    for _ in range(max(chamadas // 20, 5)):
+        inicio = time.perf_counter()
+        predict(textos_lote)
+        lotes.append((time.perf_counter() - inicio) * 1e6 / lote)
+    quantis = statistics.quantiles(unitarios, n=100)
+    return {
+        "unitario_p50_us": round(quantis[49], 1),
+        "unitario_p99_us": round(quantis[98], 1),
+        "lote_por_texto_us": round(statistics.median(lotes), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motor compilado x scikit-learn no Agente de Triagem.")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Processos novos por motor.")
+    parser.add_argument("--chamadas", type=int, default=2000, help="Previsões unitárias medidas por motor.")
+    parser.add_argument("--lote", type=int, default=64)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        dados = os.path.join(tmp, "dados_triagem.csv")
+        shutil.copy(CORPUS_PADRAO, dados)
+        caminho_modelo = os.path.join(tmp, "modelo_triagem.joblib")
+        artefato = construir_artefato(dados)
+        salvar_artefato(artefato, caminho_modelo)
+
+        compilado = compilar_artefato(artefato, dados)
+        if compilado is None:
+            raise SystemExit("O modelo configurado não pode ser compilado (TRIAGEM_TIPO_MODELO=tfidf_logistica?).")
+        salvar_compilado(compilado, caminho_compilado(caminho_modelo))
+
+        textos = [texto.lower() for texto in carregar_textos()]
+        resultados["paridade"] = verificar_paridade(artefato["modelo"], compilado, textos)
+
+        for motor, modelo in ((MOTOR_SKLEARN, artefato["modelo"]), (MOTOR_COMPILADO, compilado)):
+            env = dict(
+                os.environ, PYTHONDONTWRITEBYTECODE="1", TRIAGEM_MOTOR=motor, TRIAGEM_ARQUIVO_DADOS=dados,
+                TRIAGEM_ARQUIVO_MODELO=caminho_modelo, TRIAGEM_INTERVALO_VERIFICACAO_S="0",
+            )
+            inicializacoes = [medir_inicializacao(env) for _ in range(args.repeticoes)]
+            resultados[motor] = {
+                "inicializacao_s": round(statistics.median(i["segundos"] for i in inicializacoes), 3),
+                "rss_max_mib": round(statistics.median(i["rss_max_mib"] for i in inicializacoes), 1),
+                "modulos_pesados": inicializacoes[-1]["modulos"],
+                **latencia_us(modelo.predict, textos, args.lote, args.chamadas),
+            }
+
+    paridade = resultados["paridade"]
+    print(f"\nParidade em {paridade['textos']} textos: {paridade['divergencias']} previsões divergentes, "
+          f"diferença máxima nas pontuações {paridade['diferenca_max']:.1e}")
+    print(f"\n{'motor':<10} {'import main (s)':>15} {'RSS máx (MiB)':>13} {'1 texto p50/p99 (µs)':>21} "
+          f"{'lote (µs/texto)':>15}  módulos pesados")
+    for motor in (MOTOR_SKLEARN, MOTOR_COMPILADO):
+        r = resultados[motor]
+        print(f"{motor:<10} {r['inicializacao_s']:>15.3f} {r['rss_max_mib']:>13.1f} "
+              f"{r['unitario_p50_us']:>11.1f} / {r['unitario_p99_us']:<7.1f} {r['lote_por_texto_us']:>15.2f}  "
+              f"{r['modulos_pesados']}")
+
+    parametros = {k: v for k, v in vars(args).items() if k != "saida"}
+    caminho = salvar_resultados("motor_compilado", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# =================================================================================
+# palavras_chave.py - Benchmark da busca de palavras-chave críticas
+#
+# Uso: python benchmarks/palavras_chave.py
+#
+# Compara a varredura antiga (`any(palavra in texto ...)`) com o autômato de
+# Aho–Corasick do pacote `comum` à medida que a lista de palavras-chave cresce.
+# =================================================================================
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comum.palavras_chave import AutomatoPalavrasChave, normalizar_texto
+
+TEXTOS = [
+    "Estou com dor de cabeça e febre desde ontem à noite",
+    "Minha garganta está arranhando um pouco e o nariz escorrendo",
+    "Sinto um leve cansaço e dor no corpo depois do trabalho",
+    "Tive uma tosse seca a semana inteira e agora estou com falta de ar",
+]
+
+
+def gerar_palavras(quantidade: int, semente: int = 42):
+    aleatorio = random.Random(semente)
+    letras = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        " ".join("".join(aleatorio.choice(letras) for _ in range(aleatorio.randint(4, 9)))
+                 for _ in range(aleatorio.randint(1, 3)))
+        for _ in range(quantidade)
+    ] + ["falta de ar"]
+
+
+def main():
+    print(f"{'palavras':>9} {'any/in (µs)':>12} {'autômato (µs)':>14}")
+    for quantidade in (35, 500, 5000, 20000):
+        palavras = gerar_palavras(quantidade)
+        automato = AutomatoPalavrasChave((p, "alta") for p in palavras)
+        repeticoes = 200
+
+        def varredura():
+            for texto in TEXTOS:
+                texto_lower = normalizar_texto(texto)
+                any(p in texto_lower for p in palavras)
+
+        def busca_automato():
+            for texto in TEXTOS:
+                automato.contem(texto)
+
+        t_linear = timeit.timeit(varredura, number=repeticoes) / (repeticoes * len(TEXTOS))
+        t_automato = timeit.timeit(busca_automato, number=repeticoes) / (repeticoes * len(TEXTOS))
+        print(f"{quantidade:>9} {t_linear * 1e6:>12.1f} {t_automato * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# =================================================================================
+# prefork.py - Memória e vazão do Agente de Triagem em modo pre-fork (gunicorn)
+#
+# Uso: python -m benchmarks.prefork [--workers 1,2,4] [--requisicoes 3000]
+#                                   [--concorrencia 32] [--saida resultados.json]
+#
+# Para cada número de workers, sobe o agente com gunicorn.conf.py com e sem
+# `preload_app` e mede, depois de uma rodada de carga em POST /triagem:
+#   - RSS de cada worker (inclui as páginas compartilhadas com o mestre);
+#   - USS (páginas privadas do worker: o que cada worker extra custa de fato);
+#   - PSS somado de mestre e workers (memória total do serviço);
+#   - vazão. Ela só cresce enquanto houver núcleos livres: com mais workers
+#     que CPUs, o resultado mostra o custo de memória sem ganho de vazão.
+# =================================================================================
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+from benchmarks.carga import disparar
+from benchmarks.servicos import RAIZ, aguardar, carregar_textos, encerrar_servicos, salvar_resultados
+from comum.regras_criticas import e_caso_critico
+
+PORTA = 18500
+
+
+def memoria_processo(pid: int) -> Dict[str, int]:
+    """RSS, PSS e USS (páginas privadas) do processo, em KiB, lidos de /proc."""
+    campos = {}
+    with open(f"/proc/{pid}/smaps_rollup") as arquivo:
+        for linha in arquivo:
+            partes = linha.split()
+            if len(partes) >= 2 and partes[0].endswith(":") and partes[1].isdigit():
+                campos[partes[0][:-1]] = int(partes[1])
+    return {
+        "rss_kib": campos.get("Rss", 0),
+        "pss_kib": campos.get("Pss", 0),
+        "uss_kib": campos.get("Private_Clean", 0) + campos.get("Private_Dirty", 0),
+    }
+
+
+def filhos(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as arquivo:
+        return [int(filho) for filho in arquivo.read().split()]
+
+
+def iniciar_gunicorn(workers: int, preload: bool) -> subprocess.Popen:
+    env = dict(
+        os.environ, TRIAGEM_WORKERS=str(workers), TRIAGEM_PRELOAD="1" if preload else "0",
+        TRIAGEM_BIND=f"127.0.0.1:{PORTA}", TRIAGEM_INTERVALO_VERIFICACAO_S="0",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=os.path.join(RAIZ, "agente_triagem"), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def medir(workers: int, preload: bool, textos: List[str], args) -> dict:
+    mestre = iniciar_gunicorn(workers, preload)
+    try:
+        aguardar(f"http://127.0.0.1:{PORTA}/docs", tempo_max=120)
+        carga = asyncio.run(disparar(
+            f"http://127.0.0.1:{PORTA}/triagem", lambda i: {"texto_sintomas": textos[i % len(textos)]},
+            args.requisicoes, args.concorrencia,
+        ))
+        pids = filhos(mestre.pid)
+        por_worker = [memoria_processo(pid) for pid in pids]
+        total_pss = memoria_processo(mestre.pid)["pss_kib"] + sum(m["pss_kib"] for m in por_worker)
+    finally:
+        encerrar_servicos([mestre])
+    return {
+        "workers": len(pids),
+        "rss_medio_mib": round(sum(m["rss_kib"] for m in por_worker) / len(pids) / 1024, 1),
+        "uss_medio_mib": round(sum(m["uss_kib"] for m in por_worker) / len(pids) / 1024, 1),
+        "pss_total_mib": round(total_pss / 1024, 1),
+        "vazao_rps": carga.get("vazao_rps", 0.0),
+        "p95_ms": carga.get("p95_ms"),
+        "erros": carga["erros"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória por worker e vazão do agente de triagem com gunicorn.")
+    parser.add_argument("--workers", default=None, help="Lista de workers (padrão: 1 e 2 até o nº de CPUs).")
+    parser.add_argument("--requisicoes", type=int, default=3000)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    cpus = len(os.sched_getaffinity(0))
+    if args.workers:
+        contagens = [int(n) for n in args.workers.split(",")]
+    else:
+        contagens = sorted({1, 2, *(n for n in (4, 8, 16) if n <= cpus), cpus})
+    # Só textos que chegam ao modelo, para a carga medir a predição.
+    textos = [t for t in carregar_textos() if not e_caso_critico(t) and len(t.split()) > 1]
+
+    resultados = {}
+    print(f"CPUs disponíveis: {cpus}")
+    print(f"\n{'preload':<8} {'workers':>7} {'RSS/worker':>11} {'USS/worker':>11} {'PSS total':>10} {'vazão':>9} {'p95':>8}")
+    for preload in (True, False):
+        for workers in contagens:
+            r = resultados[f"{'preload' if preload else 'sem_preload'}/{workers}"] = medir(workers, preload, textos, args)
+            print(
+                f"{'sim' if preload else 'não':<8} {r['workers']:>7} {r['rss_medio_mib']:>8.1f}MiB "
+                f"{r['uss_medio_mib']:>8.1f}MiB {r['pss_total_mib']:>7.1f}MiB {r['vazao_rps']:>6.0f}r/s "
+                f"{r['p95_ms'] or 0:>6.1f}ms"
+            )
+
+    parametros = {"cpus": cpus, "requisicoes": args.requisicoes, "concorrencia": args.concorrencia}
+    caminho = salvar_resultados("prefork", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# =================================================================================
+# rastreamento.py - Custo do rastreamento por requisição
+#
+# Uso: python -m benchmarks.rastreamento [--requisicoes 2000] [--rodadas 5] [--saida resultados.json]
+#
+# Mede o tempo de CPU por requisição (time.process_time) de POST /recomendacoes
+# pelo FastAPI, sem rede, em três situações:
+#   - sem_middleware: a rota sozinha;
+#   - desligado: com o middleware de rastreamento, sem pedir depuração
+#     (o caso de produção: só o ID de rastreamento);
+#   - depuracao: com `X-Debug: 1` (spans no corpo e no Server-Timing).
+# Como a variação entre rodadas pode ser maior que o custo medido, também mede
+# o middleware isolado, em volta de um app ASGI que só devolve um JSON fixo.
+# =================================================================================
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.respostas_serializadas import ENTRADA
+from benchmarks.servicos import salvar_resultados
+from comum.rastreamento import MiddlewareRastreamento, instrumentar_rastreamento
+from gateway.no_unico import DIRETORIO_AGENTE_RECOMENDACOES, carregar_modulo_agente
+
+
+async def cpu_por_requisicao(app: FastAPI, requisicoes: int, cabecalhos: dict) -> float:
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", headers=cabecalhos) as cliente:
+        for _ in range(min(200, requisicoes)):
+            (await cliente.post("/recomendacoes", json=ENTRADA)).raise_for_status()
+        inicio = time.process_time()
+        for _ in range(requisicoes):
+            await cliente.post("/recomendacoes", json=ENTRADA)
+        return (time.process_time() - inicio) / requisicoes * 1e6
+
+
+async def app_minimo(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"status":"ok"}'})
+
+
+async def tempo_middleware_isolado(app, cabecalhos: list, chamadas: int) -> float:
+    """Tempo de parede por chamada direta ao app ASGI, em microssegundos."""
+    escopo = {"type": "http", "headers": [(b"host", b"bench"), (b"accept", b"*/*"), *cabecalhos]}
+
+    async def receber():
+        return {"type": "http.request", "body": b""}
+
+    async def enviar(mensagem):
+        pass
+
+    inicio = time.perf_counter()
+    for _ in range(chamadas):
+        await app(escopo, receber, enviar)
+    return (time.perf_counter() - inicio) / chamadas * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU por requisição com e sem rastreamento.")
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    agente = carregar_modulo_agente("agente_recomendacoes_main", DIRETORIO_AGENTE_RECOMENDACOES)
+    app_sem, app_com = FastAPI(), FastAPI()
+    for app in (app_sem, app_com):
+        app.post("/recomendacoes")(agente.gerar_recomendacoes)
+    instrumentar_rastreamento(app_com, "bench")
+
+    situacoes = {
+        "sem_middleware": (app_sem, {}),
+        "desligado": (app_com, {}),
+        "depuracao": (app_com, {"X-Debug": "1"}),
+    }
+    # As situações se alternam a cada rodada e fica a menor medição de cada uma,
+    # para que variações da máquina não pesem só sobre uma delas.
+    medicoes = {nome: [] for nome in situacoes}
+    for _ in range(args.rodadas):
+        for nome, (app, cabecalhos) in situacoes.items():
+            medicoes[nome].append(asyncio.run(cpu_por_requisicao(app, args.requisicoes, cabecalhos)))
+
+    middleware = MiddlewareRastreamento(app_minimo, "bench")
+    isolados = {
+        "isolado/sem_middleware": (app_minimo, []),
+        "isolado/desligado": (middleware, []),
+        "isolado/depuracao": (middleware, [(b"x-debug", b"1")]),
+    }
+    for nome, (app, cabecalhos) in isolados.items():
+        medicoes[nome] = [
+            asyncio.run(tempo_middleware_isolado(app, cabecalhos, args.requisicoes * 10)) for _ in range(args.rodadas)
+        ]
+
+    resultados = {}
+    print(f"\n{'situação':<24} {'µs/requisição':>14}")
+    for nome, valores in medicoes.items():
+        resultados[nome] = {"us": round(min(valores), 2)}
+        print(f"{nome:<24} {min(valores):>14.1f}")
+
+    parametros = {"requisicoes": args.requisicoes, "rodadas": args.rodadas}
+    caminho = salvar_resultados("rastreamento", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
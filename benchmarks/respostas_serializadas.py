@@ -0,0 +1,140 @@
+# =================================================================================
+# respostas_serializadas.py - Benchmark das respostas pré-serializadas
+#
+# Uso: python -m benchmarks.respostas_serializadas [--requisicoes 3000] [--saida resultados.json]
+#
+# Mede o tempo de CPU por requisição (time.process_time) do caminho antigo,
+# reconstruído aqui, e do atual:
+#   - agente/funcao: só a montagem da resposta de /recomendacoes
+#     (modelos pydantic + model_dump_json contra fragmentos pré-serializados);
+#   - agente/asgi: a requisição inteira pelo FastAPI, sem rede, com o
+#     `response_model` validando a resposta (antigo) ou não (atual);
+#   - gateway/composicao: montagem de TriagemCompleta a partir do corpo do
+#     agente (json.loads + pydantic contra a cópia dos bytes).
+# Antes de medir, confere que os dois caminhos produzem o mesmo JSON.
+# =================================================================================
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.servicos import RAIZ, salvar_resultados
+from gateway.no_unico import DIRETORIO_AGENTE_RECOMENDACOES, carregar_modulo_agente
+
+ENTRADA = {
+    "urgencia": "media",
+    "sintomas_texto": "dor de cabeça forte, febre e enjoo depois do almoço",
+    "resultado_triagem": "Urgência MÉDIA. A análise sugere que uma teleconsulta ou consulta seja realizada.",
+    "latitude": -21.245,
+    "longitude": -45.0,
+}
+
+
+def montar_com_pydantic(agente, triagem):
+    """O caminho antigo: reconstrói os modelos pydantic a cada requisição."""
+    urgencia = triagem.urgencia.lower()
+    if urgencia not in agente.BASE_RECOMENDACOES:
+        urgencia = "baixa"
+    sintomas = agente.extrair_sintomas_chave(triagem.sintomas_texto)
+    medicos = agente.recomendar_medicos(urgencia, sintomas, (triagem.latitude, triagem.longitude))
+    return agente.RecomendacaoResponse(
+        urgencia=urgencia,
+        recomendacoes_gerais=agente.BASE_RECOMENDACOES[urgencia],
+        recomendacoes_especificas=agente.gerar_recomendacoes_especificas(sintomas),
+        medicos_recomendados=[agente.MedicoRecomendado(**medico) for medico in medicos],
+        observacoes=agente.OBSERVACOES[urgencia],
+    )
+
+
+def cpu_por_chamada(funcao, requisicoes: int) -> float:
+    """Tempo de CPU médio por chamada, em microssegundos."""
+    for _ in range(min(200, requisicoes)):
+        funcao()
+    inicio = time.process_time()
+    for _ in range(requisicoes):
+        funcao()
+    return (time.process_time() - inicio) / requisicoes * 1e6
+
+
+async def cpu_por_requisicao_asgi(app: FastAPI, requisicoes: int) -> float:
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        for _ in range(min(200, requisicoes)):
+            (await cliente.post("/recomendacoes", json=ENTRADA)).raise_for_status()
+        inicio = time.process_time()
+        for _ in range(requisicoes):
+            await cliente.post("/recomendacoes", json=ENTRADA)
+        return (time.process_time() - inicio) / requisicoes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU por requisição: respostas pydantic x pré-serializadas.")
+    parser.add_argument("--requisicoes", type=int, default=3000)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    agente = carregar_modulo_agente("agente_recomendacoes_main", DIRETORIO_AGENTE_RECOMENDACOES)
+    gateway = carregar_modulo_agente("gateway_main", os.path.join(RAIZ, "gateway"))
+    triagem = agente.TriagemInput(**ENTRADA)
+
+    corpo_antigo = montar_com_pydantic(agente, triagem).model_dump_json().encode()
+    corpo_atual = agente.montar_recomendacoes(triagem)
+    if json.loads(corpo_antigo) != json.loads(corpo_atual):
+        raise SystemExit("Os dois caminhos produziram respostas diferentes.")
+
+    # As duas rotas ficam em apps sem middlewares, para comparar só o tratamento da resposta.
+    app_antigo, app_atual = FastAPI(), FastAPI()
+
+    @app_antigo.post("/recomendacoes", response_model=agente.RecomendacaoResponse)
+    def recomendacoes_antigo(entrada: agente.TriagemInput):
+        return montar_com_pydantic(agente, entrada)
+
+    app_atual.post("/recomendacoes", response_model=agente.RecomendacaoResponse)(agente.gerar_recomendacoes)
+
+    campos = dict(
+        sintomas_originais=ENTRADA["sintomas_texto"], resultado_triagem=ENTRADA["resultado_triagem"],
+        urgencia="media", tempo_processamento=0.012, agentes_consultados=["agente_triagem", "agente_recomendacoes"],
+        modo_degradado=False,
+    )
+
+    def gateway_antigo():
+        return gateway.TriagemCompleta(recomendacoes=json.loads(corpo_atual), **campos).model_dump_json()
+
+    def gateway_atual():
+        return gateway.objeto_json(gateway.campos_triagem_completa(recomendacoes=corpo_atual, **campos))
+
+    if json.loads(gateway_antigo()) != json.loads(gateway_atual()):
+        raise SystemExit("O Gateway montou respostas diferentes nos dois caminhos.")
+
+    n = args.requisicoes
+    medicoes = {
+        "agente/funcao": (
+            cpu_por_chamada(lambda: montar_com_pydantic(agente, triagem).model_dump_json(), n),
+            cpu_por_chamada(lambda: agente.montar_recomendacoes(triagem), n),
+        ),
+        "agente/asgi": (
+            asyncio.run(cpu_por_requisicao_asgi(app_antigo, n)),
+            asyncio.run(cpu_por_requisicao_asgi(app_atual, n)),
+        ),
+        "gateway/composicao": (cpu_por_chamada(gateway_antigo, n), cpu_por_chamada(gateway_atual, n)),
+    }
+
+    resultados = {}
+    print(f"\n{'caso':<22} {'antigo (µs CPU)':>16} {'atual (µs CPU)':>15} {'economia':>10}")
+    for nome, (antigo, atual) in medicoes.items():
+        resultados[nome] = {
+            "antigo_us": round(antigo, 2), "atual_us": round(atual, 2), "economia_us": round(antigo - atual, 2)
+        }
+        print(f"{nome:<22} {antigo:>16.1f} {atual:>15.1f} {antigo - atual:>9.1f}µs")
+
+    caminho = salvar_resultados("respostas_serializadas", {"requisicoes": n}, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Funções compartilhadas pelos benchmarks: subir serviços, corpus, estatísticas e resultados."""
+
+import csv
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+CORPUS_PADRAO = os.path.join(RAIZ, "agente_triagem", "dados_triagem.csv")
+
+
+def iniciar_servico(diretorio: str, porta: int, env_extra: dict, alvo: str = "main:app") -> subprocess.Popen:
+    env = dict(os.environ, **env_extra)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", alvo, "--port", str(porta), "--log-level", "warning"],
+        cwd=os.path.join(RAIZ, diretorio), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def encerrar_servicos(processos: List[subprocess.Popen]) -> None:
+    for processo in processos:
+        processo.terminate()
+        processo.wait()
+
+
+def aguardar(url: str, tempo_max: float = 60.0) -> None:
+    limite = time.monotonic() + tempo_max
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Serviço não respondeu em {url}")
+
+
+def carregar_textos(caminho: str = CORPUS_PADRAO) -> List[str]:
+    """Corpus de sintomas: CSV com coluna `texto` (separador ';') ou um texto por linha."""
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        if caminho.endswith(".csv"):
+            return [linha["texto"] for linha in csv.DictReader(arquivo, delimiter=";")]
+        return [linha.strip() for linha in arquivo if linha.strip()]
+
+
+def resumir_latencias(latencias: List[float], duracao: float, erros: int = 0) -> Dict[str, float]:
+    """Vazão e quantis (em ms) de uma série de latências medidas em segundos."""
+    if len(latencias) < 2:
+        return {"requisicoes": len(latencias), "erros": erros, "vazao_rps": 0.0}
+    latencias = sorted(latencias)
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "vazao_rps": round(len(latencias) / duracao, 2),
+        "media_ms": round(statistics.fmean(latencias) * 1000, 3),
+        "p50_ms": round(quantis[49] * 1000, 3),
+        "p95_ms": round(quantis[94] * 1000, 3),
+        "p99_ms": round(quantis[98] * 1000, 3),
+        "max_ms": round(latencias[-1] * 1000, 3),
+    }
+
+
+def salvar_resultados(nome: str, parametros: dict, resultados: dict, saida: Optional[str] = None) -> str:
+    """Grava os resultados com os parâmetros e o ambiente da execução, para comparar execuções."""
+    if saida is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        saida = os.path.join(DIRETORIO_RESULTADOS, f"{nome}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    documento = {
+        "benchmark": nome,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+        "parametros": parametros,
+        "resultados": resultados,
+    }
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(documento, arquivo, ensure_ascii=False, indent=2)
+    return saida
+
+
+def comparar_resultados(
+    anterior_caminho: str, atuais: Dict[str, Dict[str, float]], metrica: str, tolerancia: float
+) -> List[str]:
+    """Compara `metrica` (quanto menor, melhor) com uma execução salva; devolve as regressões."""
+    with open(anterior_caminho, encoding="utf-8") as arquivo:
+        anteriores = json.load(arquivo)["resultados"]
+    regressoes = []
+    print(f"\nComparação com {anterior_caminho} ({metrica}):")
+    for nome, atual in atuais.items():
+        if nome not in anteriores or metrica not in atual or metrica not in anteriores[nome]:
+            continue
+        antes, depois = anteriores[nome][metrica], atual[metrica]
+        variacao = (depois - antes) / antes if antes else 0.0
+        marca = ""
+        if variacao > tolerancia:
+            marca = "  <-- REGRESSÃO"
+            regressoes.append(nome)
+        print(f"  {nome:<32} {antes:>10.3f} -> {depois:>10.3f} ({variacao:+.1%}){marca}")
+    return regressoes
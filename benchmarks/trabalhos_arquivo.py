@@ -0,0 +1,128 @@
+# =================================================================================
+# trabalhos_arquivo.py - Memória e vazão dos trabalhos de triagem de arquivos
+#
+# Uso: python -m benchmarks.trabalhos_arquivo [--linhas 10000,100000] [--formato csv]
+#                                             [--bloco 200] [--saida resultados.json]
+#
+# Sobe o Gateway em modo nó único, gera arquivos de casos com o corpus de
+# sintomas e, para cada tamanho, envia o arquivo a POST /trabalhos/triagem,
+# acompanha o progresso e baixa o resultado. Enquanto o trabalho roda, amostra
+# o RSS do processo do Gateway: o pico deve ficar praticamente igual entre os
+# tamanhos de arquivo (memória constante).
+# =================================================================================
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import httpx
+
+from benchmarks.carga import PORTA_GATEWAY
+from benchmarks.servicos import aguardar, carregar_textos, encerrar_servicos, iniciar_servico, salvar_resultados
+
+
+def rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as arquivo:
+        for linha in arquivo:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1])
+    return 0
+
+
+def gerar_arquivo(caminho: str, formato: str, linhas: int, textos: list) -> None:
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        if formato == "csv":
+            arquivo.write("id;texto\n")
+        for i in range(linhas):
+            # Um sufixo numérico evita que todas as linhas caiam no cache de triagem.
+            texto = f"{textos[i % len(textos)]} há {i % 97 + 1} dias"
+            if formato == "csv":
+                arquivo.write(f"{i};\"{texto}\"\n")
+            else:
+                arquivo.write(json.dumps({"id": i, "texto_sintomas": texto}, ensure_ascii=False) + "\n")
+
+
+def executar_trabalho(url: str, caminho: str, pid: int) -> dict:
+    picos = [rss_kib(pid)]
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(0.1):
+            picos.append(rss_kib(pid))
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    amostrador.start()
+    inicio = time.perf_counter()
+    with httpx.Client(base_url=url, timeout=120.0) as cliente:
+        with open(caminho, "rb") as arquivo:
+            resposta = cliente.post("/trabalhos/triagem", files={"arquivo": (os.path.basename(caminho), arquivo)})
+        resposta.raise_for_status()
+        id_trabalho = resposta.json()["id"]
+        while True:
+            estado = cliente.get(f"/trabalhos/{id_trabalho}").json()
+            if estado["estado"] not in ("na_fila", "processando"):
+                break
+            time.sleep(0.5)
+        duracao = time.perf_counter() - inicio
+        linhas_resultado = 0
+        with cliente.stream("GET", f"/trabalhos/{id_trabalho}/resultado") as download:
+            for _ in download.iter_lines():
+                linhas_resultado += 1
+        cliente.delete(f"/trabalhos/{id_trabalho}")
+    parar.set()
+    amostrador.join()
+    return {
+        "estado": estado["estado"],
+        "linhas_processadas": estado["linhas_processadas"],
+        "linhas_com_erro": estado["linhas_com_erro"],
+        "linhas_no_resultado": linhas_resultado,
+        "linhas_por_segundo": round(estado["linhas_processadas"] / duracao, 1),
+        "tamanho_arquivo_mib": round(os.path.getsize(caminho) / 1024 ** 2, 2),
+        "rss_inicial_mib": round(picos[0] / 1024, 1),
+        "rss_pico_mib": round(max(picos) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória e vazão dos trabalhos de triagem de arquivos.")
+    parser.add_argument("--linhas", default="10000,100000", help="Tamanhos de arquivo, em linhas.")
+    parser.add_argument("--formato", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--bloco", type=int, default=200)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    textos = carregar_textos()
+    url = f"http://127.0.0.1:{PORTA_GATEWAY}"
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        processo = iniciar_servico("gateway", PORTA_GATEWAY, {
+            "GATEWAY_MODO": "no_unico",
+            "GATEWAY_TRABALHOS_DIR": os.path.join(diretorio, "trabalhos"),
+            "GATEWAY_TRABALHOS_BLOCO": str(args.bloco),
+            "TRIAGEM_INTERVALO_VERIFICACAO_S": "0",
+        })
+        try:
+            aguardar(f"{url}/", tempo_max=120)
+            print(f"\n{'linhas':>9} {'arquivo':>10} {'linhas/s':>9} {'RSS inicial':>12} {'RSS pico':>10}  estado")
+            for linhas in (int(n) for n in args.linhas.split(",")):
+                caminho = os.path.join(diretorio, f"casos-{linhas}.{args.formato}")
+                gerar_arquivo(caminho, args.formato, linhas, textos)
+                r = resultados[str(linhas)] = executar_trabalho(url, caminho, processo.pid)
+                os.remove(caminho)
+                print(
+                    f"{linhas:>9} {r['tamanho_arquivo_mib']:>7.1f}MiB {r['linhas_por_segundo']:>9.0f} "
+                    f"{r['rss_inicial_mib']:>9.1f}MiB {r['rss_pico_mib']:>7.1f}MiB  {r['estado']}"
+                )
+        finally:
+            encerrar_servicos([processo])
+
+    parametros = {k: v for k, v in vars(args).items() if k != "saida"}
+    caminho = salvar_resultados("trabalhos_arquivo", parametros, resultados, args.saida)
+    print(f"\nResultados salvos em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
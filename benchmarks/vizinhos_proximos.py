@@ -0,0 +1,80 @@
+# =================================================================================
+# vizinhos_proximos.py - Benchmark da busca dos locais de atendimento mais próximos
+#
+# Uso: python benchmarks/vizinhos_proximos.py [--quantidade 100000] [--consultas 2000] [--k 2]
+#
+# Gera um catálogo sintético em escala regional, constrói o IndiceMedicos (árvores
+# k-d por balde) e mede o tempo por consulta, conferindo os resultados contra uma
+# busca exaustiva.
+# =================================================================================
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "agente_recomendacoes"))
+
+from create_database import criar_banco, inserir_medicos
+from gerar_dados_sinteticos import REGIAO, gerar_medicos
+from indice_espacial import RAIO_TERRA_KM
+from indice_medicos import IndiceMedicos
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(a))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da busca por locais mais próximos.")
+    parser.add_argument("--quantidade", type=int, default=100_000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=2)
+    args = parser.parse_args()
+
+    medicos = list(gerar_medicos(args.quantidade, 42))
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho_db = os.path.join(tmp, "medicos.db")
+        conn = criar_banco(caminho_db)
+        inserir_medicos(conn, medicos)
+        conn.close()
+
+        inicio = time.perf_counter()
+        indice = IndiceMedicos(caminho_db)
+        tempo_construcao = time.perf_counter() - inicio
+
+    aleatorio = random.Random(7)
+    (lat_min, lat_max), (lon_min, lon_max) = REGIAO
+    pontos = [(aleatorio.uniform(lat_min, lat_max), aleatorio.uniform(lon_min, lon_max)) for _ in range(args.consultas)]
+
+    cenarios = {"urgência": ("alta", None), "urgência + especialidade": ("media", "Neurologista")}
+    print(f"Catálogo: {args.quantidade} locais | índice construído em {tempo_construcao:.2f}s")
+    print(f"{'balde':<26} {'média (µs)':>11} {'p99 (µs)':>10}")
+    for nome, (urgencia, especialidade) in cenarios.items():
+        tempos = []
+        for lat, lon in pontos:
+            inicio = time.perf_counter()
+            indice.mais_proximos(urgencia, args.k, lat, lon, especialidade=especialidade)
+            tempos.append(time.perf_counter() - inicio)
+        p99 = statistics.quantiles(tempos, n=100)[98]
+        print(f"{nome:<26} {statistics.mean(tempos) * 1e6:>11.1f} {p99 * 1e6:>10.1f}")
+
+        # Conferência contra a busca exaustiva em algumas consultas.
+        candidatos = [m for m in medicos if m[4] == urgencia and (especialidade is None or m[1] == especialidade)]
+        for lat, lon in pontos[:50]:
+            esperado = sorted(haversine_km(lat, lon, m[5], m[6]) for m in candidatos)[:args.k]
+            obtido = [m["distancia_km"] for m in indice.mais_proximos(urgencia, args.k, lat, lon, especialidade=especialidade)]
+            assert [round(d, 1) for d in esperado] == obtido, (esperado, obtido)
+    print("Resultados conferidos contra busca exaustiva: OK")
+
+
+if __name__ == "__main__":
+    main()
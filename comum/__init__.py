@@ -0,0 +1 @@
+"""Código compartilhado entre o Gateway e os agentes do sistema TrIAgem."""
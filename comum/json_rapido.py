@@ -0,0 +1,40 @@
+"""Serialização JSON rápida e montagem de respostas a partir de fragmentos prontos.
+
+Usa o `orjson` quando instalado (bem mais rápido que o `json` da biblioteca
+padrão) e recorre ao `json` caso contrário; as duas opções produzem JSON
+compacto em UTF-8. Valores `bytes` passados a `objeto_json` são tratados como
+JSON já serializado e entram na resposta sem serem lidos de novo.
+"""
+
+import json
+from typing import Any, Iterable, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+
+def serializar(valor: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(valor)
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def desserializar(conteudo: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(conteudo)
+    return json.loads(conteudo)
+
+
+def objeto_json(campos: Iterable[Tuple[str, Any]]) -> bytes:
+    """Serializa um objeto JSON, na ordem dada, copiando como estão os valores já em `bytes`."""
+    partes = []
+    for nome, valor in campos:
+        partes.append(serializar(nome) + b":" + (valor if isinstance(valor, bytes) else serializar(valor)))
+    return b"{" + b",".join(partes) + b"}"
+
+
+def lista_json(itens: Iterable[bytes]) -> bytes:
+    """Junta fragmentos já serializados em uma lista JSON."""
+    return b"[" + b",".join(itens) + b"]"
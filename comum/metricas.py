@@ -0,0 +1,252 @@
+"""Métricas no formato de texto do Prometheus, sem dependências externas.
+
+Cada serviço cria um `RegistroMetricas`, registra contadores, medidores e
+histogramas, e expõe tudo em `GET /metrics` com `instrumentar_app`.
+O custo por observação é uma busca binária nos limites do histograma e
+algumas somas sob uma trava, barato o bastante para ficar ligado em produção.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from comum.rastreamento import registrar_span
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites padrão (em segundos) pensados para latências de 0,5 ms a 10 s.
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._trava = threading.Lock()
+
+    def _cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+
+    def exportar(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Contador(_Metrica):
+    """Valor que só cresce (ex.: total de erros)."""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, descricao, rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *valores_rotulos: str, valor: float = 1) -> None:
+        with self._trava:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + valor
+
+    def exportar(self) -> List[str]:
+        linhas = self._cabecalho()
+        with self._trava:
+            itens = list(self._valores.items())
+        for valores, total in itens:
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {_formatar_numero(total)}")
+        return linhas
+
+
+class Medidor(_Metrica):
+    """Valor que sobe e desce (ex.: requisições em andamento)."""
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, descricao, rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *valores_rotulos: str, valor: float = 1) -> None:
+        with self._trava:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + valor
+
+    def dec(self, *valores_rotulos: str, valor: float = 1) -> None:
+        self.inc(*valores_rotulos, valor=-valor)
+
+    def definir(self, *valores_rotulos: str, valor: float) -> None:
+        with self._trava:
+            self._valores[valores_rotulos] = valor
+
+    @contextmanager
+    def acompanhar(self, *valores_rotulos: str):
+        self.inc(*valores_rotulos)
+        try:
+            yield
+        finally:
+            self.dec(*valores_rotulos)
+
+    def exportar(self) -> List[str]:
+        linhas = self._cabecalho()
+        with self._trava:
+            itens = list(self._valores.items())
+        for valores, atual in itens:
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {_formatar_numero(atual)}")
+        return linhas
+
+
+class MedidorFuncao(_Metrica):
+    """Medidor lido sob demanda no momento da exportação (ex.: estatísticas de um cache)."""
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, descricao: str, funcao: Callable[[], Dict[Tuple[str, ...], float]], rotulos: Sequence[str] = ()):
+        super().__init__(nome, descricao, rotulos)
+        self._funcao = funcao
+
+    def exportar(self) -> List[str]:
+        linhas = self._cabecalho()
+        for valores, atual in self._funcao().items():
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {_formatar_numero(atual)}")
+        return linhas
+
+
+class Histograma(_Metrica):
+    """Distribuição de valores em faixas (ex.: latência por etapa)."""
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = (), limites: Sequence[float] = LIMITES_LATENCIA):
+        super().__init__(nome, descricao, rotulos)
+        self.limites = tuple(sorted(limites))
+        # Para cada combinação de rótulos: [contagem por faixa (não acumulada)..., soma, total].
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observar(self, valor: float, *valores_rotulos: str) -> None:
+        faixa = bisect.bisect_left(self.limites, valor)
+        with self._trava:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [0] * (len(self.limites) + 1) + [0.0, 0]
+            serie[faixa] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    @contextmanager
+    def cronometrar(self, *valores_rotulos: str):
+        """Mede o bloco; se a requisição estiver sendo rastreada, ele também vira um span."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.observar(duracao, *valores_rotulos)
+            # O prefixo do nome da métrica é o serviço (ex.: "triagem_etapa_duracao_segundos").
+            registrar_span(".".join(valores_rotulos) or self.nome, inicio, duracao, self.nome.split("_", 1)[0])
+
+    def exportar(self) -> List[str]:
+        linhas = self._cabecalho()
+        with self._trava:
+            itens = [(valores, list(serie)) for valores, serie in self._series.items()]
+        for valores, serie in itens:
+            acumulado = 0
+            for limite, quantidade in zip(self.limites + (float("inf"),), serie):
+                acumulado += quantidade
+                le = f'le="{_formatar_numero(limite)}"'
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, valores, le)} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, valores)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(serie[-2])}")
+            linhas.append(f"{self.nome}_count{rotulos} {serie[-1]}")
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas de um serviço."""
+
+    def __init__(self):
+        self._metricas: List[_Metrica] = []
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome: str, descricao: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self.registrar(Contador(nome, descricao, rotulos))
+
+    def medidor(self, nome: str, descricao: str, rotulos: Sequence[str] = ()) -> Medidor:
+        return self.registrar(Medidor(nome, descricao, rotulos))
+
+    def medidor_funcao(self, nome: str, descricao: str, funcao, rotulos: Sequence[str] = ()) -> MedidorFuncao:
+        return self.registrar(MedidorFuncao(nome, descricao, funcao, rotulos))
+
+    def histograma(self, nome: str, descricao: str, rotulos: Sequence[str] = (), limites: Sequence[float] = LIMITES_LATENCIA) -> Histograma:
+        return self.registrar(Histograma(nome, descricao, rotulos, limites))
+
+    def exportar(self) -> str:
+        linhas: List[str] = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+class MiddlewareMetricasHTTP:
+    """Middleware ASGI que mede a duração total e as requisições em andamento por rota."""
+
+    def __init__(self, app, registro: RegistroMetricas, prefixo: str):
+        self.app = app
+        self.em_andamento = registro.medidor(f"{prefixo}_requisicoes_em_andamento", "Requisições HTTP em andamento.")
+        self.duracao = registro.histograma(
+            f"{prefixo}_requisicao_duracao_segundos", "Duração total das requisições HTTP.", ("rota", "codigo")
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        codigo = ["500"]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                codigo[0] = str(mensagem["status"])
+            await send(mensagem)
+
+        inicio = time.perf_counter()
+        self.em_andamento.inc()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            self.em_andamento.dec()
+            # Usa o molde da rota (ex.: /jobs/{id}) para não criar uma série por URL.
+            rota = getattr(scope.get("route"), "path", "desconhecida")
+            self.duracao.observar(time.perf_counter() - inicio, rota, codigo[0])
+
+
+def instrumentar_app(app: FastAPI, registro: RegistroMetricas, prefixo: str) -> None:
+    """Adiciona o middleware de métricas HTTP e a rota `GET /metrics` ao app."""
+    app.add_middleware(MiddlewareMetricasHTTP, registro=registro, prefixo=prefixo)
+
+    @app.get("/metrics", include_in_schema=False)
+    def exportar_metricas():
+        return PlainTextResponse(registro.exportar(), media_type=TIPO_CONTEUDO)
+
@@ -0,0 +1,84 @@
+"""Busca de múltiplas palavras-chave em uma única passada (Aho–Corasick).
+
+O autômato é construído uma única vez (na inicialização do serviço) a partir
+de um mapeamento `palavra-chave -> rótulo`. A busca percorre o texto uma só
+vez, independentemente de quantas palavras-chave existam, e trabalha sobre o
+texto normalizado (minúsculas e sem acentos), de modo que "convulsão" e
+"convulsao" são tratadas como a mesma palavra-chave.
+"""
+
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Set, Tuple, Union
+
+
+def normalizar_texto(texto: str) -> str:
+    """Converte para minúsculas e remove acentos ("Convulsão" -> "convulsao")."""
+    decomposto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+class AutomatoPalavrasChave:
+    """Autômato de Aho–Corasick que associa cada palavra-chave a um rótulo."""
+
+    def __init__(self, palavras_chave: Union[Mapping[str, str], Iterable[Tuple[str, str]]]):
+        itens = palavras_chave.items() if isinstance(palavras_chave, Mapping) else palavras_chave
+        self._transicoes: List[Dict[str, int]] = [{}]
+        self._saidas: List[Set[str]] = [set()]
+        self.total_palavras = 0
+
+        for palavra, rotulo in itens:
+            palavra = normalizar_texto(palavra)
+            if not palavra:
+                continue
+            estado = 0
+            for caractere in palavra:
+                proximo = self._transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes[estado][caractere] = proximo
+                    self._transicoes.append({})
+                    self._saidas.append(set())
+                estado = proximo
+            self._saidas[estado].add(rotulo)
+            self.total_palavras += 1
+
+        self._construir_falhas()
+
+    def _construir_falhas(self) -> None:
+        # Busca em largura: a falha de um estado é o maior sufixo próprio que também é prefixo.
+        self._falhas = [0] * len(self._transicoes)
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for caractere, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falhas[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falhas[falha]
+                destino = self._transicoes[falha].get(caractere, 0)
+                self._falhas[proximo] = destino if destino != proximo else 0
+                # Herda as saídas do estado de falha para não precisar segui-las na busca.
+                self._saidas[proximo] |= self._saidas[self._falhas[proximo]]
+
+    def _percorrer(self, texto: str, parar_no_primeiro: bool) -> Set[str]:
+        transicoes, falhas, saidas = self._transicoes, self._falhas, self._saidas
+        encontrados: Set[str] = set()
+        estado = 0
+        for caractere in normalizar_texto(texto):
+            while estado and caractere not in transicoes[estado]:
+                estado = falhas[estado]
+            estado = transicoes[estado].get(caractere, 0)
+            if saidas[estado]:
+                encontrados |= saidas[estado]
+                if parar_no_primeiro:
+                    break
+        return encontrados
+
+    def encontrar(self, texto: str) -> Set[str]:
+        """Rótulos de todas as palavras-chave presentes no texto."""
+        return self._percorrer(texto, parar_no_primeiro=False)
+
+    def contem(self, texto: str) -> bool:
+        """Indica se alguma palavra-chave aparece no texto (para na primeira ocorrência)."""
+        return bool(self._percorrer(texto, parar_no_primeiro=True))
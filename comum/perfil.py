@@ -0,0 +1,179 @@
+"""Profiler por amostragem, sem dependências externas, e gravação do flamegraph.
+
+Uma thread anota, a cada `intervalo_s`, a pilha de chamadas de todas as outras
+threads do processo (`sys._current_frames`). As pilhas de threads ociosas
+(esperando trabalho ou eventos de rede) são descartadas. O resultado é gravado
+em dois arquivos:
+  - `.folded`: uma pilha por linha com a contagem de amostras, o formato aceito
+    pelo flamegraph.pl e pelo speedscope;
+  - `.svg`: um flamegraph simples, para abrir direto no navegador.
+
+Como o event loop é compartilhado, o perfil de uma requisição inclui o que as
+requisições concorrentes fizeram no mesmo intervalo.
+"""
+
+import html
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+# (arquivo, função) do frame mais interno de uma thread parada, esperando algo.
+FRAMES_OCIOSOS = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+LARGURA_SVG = 1200
+ALTURA_LINHA_SVG = 16
+
+
+def _descrever(frame) -> Tuple[str, str]:
+    codigo = frame.f_code
+    arquivo = os.path.basename(codigo.co_filename)
+    return arquivo, f"{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})"
+
+
+class AmostradorPerfil:
+    """Coleta as pilhas de chamadas do processo entre `iniciar` e `parar`."""
+
+    def __init__(self, intervalo_s: float = 0.001):
+        self.intervalo_s = intervalo_s
+        self.contagens: Counter = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name="amostrador-perfil", daemon=True)
+
+    def iniciar(self) -> "AmostradorPerfil":
+        self._inicio = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def parar(self) -> float:
+        """Encerra a coleta e devolve a duração, em segundos."""
+        self._parar.set()
+        self._thread.join()
+        return time.perf_counter() - self._inicio
+
+    def _amostrar(self) -> None:
+        propria = threading.get_ident()
+        while not self._parar.wait(self.intervalo_s):
+            self.amostras += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == propria:
+                    continue
+                arquivo, descricao = _descrever(frame)
+                if (arquivo, frame.f_code.co_name) in FRAMES_OCIOSOS:
+                    continue
+                pilha = [descricao]
+                frame = frame.f_back
+                while frame is not None:
+                    pilha.append(_descrever(frame)[1])
+                    frame = frame.f_back
+                self.contagens[";".join(reversed(pilha))] += 1
+
+    def gravar(self, caminho_base: str) -> str:
+        """Grava `<caminho_base>.folded` e `<caminho_base>.svg`; devolve o caminho do SVG."""
+        with open(caminho_base + ".folded", "w", encoding="utf-8") as arquivo:
+            for pilha, contagem in self.contagens.most_common():
+                arquivo.write(f"{pilha} {contagem}\n")
+        with open(caminho_base + ".svg", "w", encoding="utf-8") as arquivo:
+            arquivo.write(renderizar_svg(self.contagens, os.path.basename(caminho_base)))
+        return caminho_base + ".svg"
+
+
+def renderizar_svg(contagens: Dict[str, int], titulo: str) -> str:
+    """Flamegraph: a largura de cada função é proporcional às amostras em que ela aparece."""
+    # Árvore de chamadas: nome -> [amostras, filhos].
+    raiz = [0, {}]
+    for pilha, contagem in contagens.items():
+        raiz[0] += contagem
+        no = raiz
+        for funcao in pilha.split(";"):
+            no = no[1].setdefault(funcao, [0, {}])
+            no[0] += contagem
+
+    retangulos = []
+    profundidade_max = 0
+
+    def desenhar(filhos: dict, x: float, profundidade: int) -> None:
+        nonlocal profundidade_max
+        profundidade_max = max(profundidade_max, profundidade)
+        for funcao, (amostras, netos) in sorted(filhos.items()):
+            largura = amostras / raiz[0] * LARGURA_SVG
+            if largura >= 0.5:
+                retangulos.append((x, profundidade, largura, funcao, amostras))
+                desenhar(netos, x, profundidade + 1)
+            x += largura
+
+    if raiz[0]:
+        desenhar(raiz[1], 0.0, 0)
+    altura = (profundidade_max + 2) * ALTURA_LINHA_SVG + 24
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{LARGURA_SVG}" height="{altura}" '
+        f'font-family="monospace" font-size="11">',
+        f'<text x="4" y="14">{html.escape(titulo)} ({raiz[0]} amostras)</text>',
+    ]
+    gerador = random.Random(0)
+    for x, profundidade, largura, funcao, amostras in retangulos:
+        y = altura - (profundidade + 1) * ALTURA_LINHA_SVG
+        cor = f"rgb({205 + gerador.randint(0, 50)},{gerador.randint(80, 200)},{gerador.randint(0, 60)})"
+        nome = html.escape(funcao)
+        rotulo = nome[: int(largura / 7)] if largura > 21 else ""
+        partes.append(
+            f'<g><title>{nome}: {amostras} amostras ({amostras / raiz[0]:.1%})</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{largura:.1f}" height="{ALTURA_LINHA_SVG - 1}" fill="{cor}"/>'
+            f'<text x="{x + 2:.1f}" y="{y + 11}">{rotulo}</text></g>'
+        )
+    partes.append("</svg>")
+    return "\n".join(partes)
+
+
+class GerenciadorPerfis:
+    """Decide quais requisições passam pelo profiler e guarda os arquivos gerados."""
+
+    def __init__(self, diretorio: str, amostragem: float = 0.0, aceitar_cabecalho: bool = False,
+                 intervalo_s: float = 0.001, arquivos_max: int = 50):
+        self.diretorio = diretorio
+        self.amostragem = amostragem
+        self.aceitar_cabecalho = aceitar_cabecalho
+        self.intervalo_s = intervalo_s
+        self.arquivos_max = arquivos_max
+        # O amostrador vê o processo inteiro: um perfil por vez.
+        self._trava = threading.Lock()
+
+    def deve_perfilar(self, pedido_no_cabecalho: bool) -> bool:
+        if pedido_no_cabecalho and self.aceitar_cabecalho:
+            return True
+        return self.amostragem > 0 and random.random() < self.amostragem
+
+    def iniciar(self) -> Optional[AmostradorPerfil]:
+        """Começa um perfil, ou devolve None se já houver outro em andamento."""
+        if not self._trava.acquire(blocking=False):
+            return None
+        return AmostradorPerfil(self.intervalo_s).iniciar()
+
+    def concluir(self, amostrador: AmostradorPerfil, nome: str) -> str:
+        """Para o amostrador, grava o flamegraph e apaga os perfis mais antigos além do limite."""
+        try:
+            amostrador.parar()
+        finally:
+            self._trava.release()
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = amostrador.gravar(os.path.join(self.diretorio, nome))
+        svgs = sorted(
+            (entrada for entrada in os.scandir(self.diretorio) if entrada.name.endswith(".svg")),
+            key=lambda entrada: entrada.stat().st_mtime,
+        )
+        for entrada in svgs[: max(0, len(svgs) - self.arquivos_max)]:
+            for extensao in (".svg", ".folded"):
+                try:
+                    os.remove(entrada.path[: -len(".svg")] + extensao)
+                except FileNotFoundError:
+                    pass
+        return caminho
@@ -0,0 +1,231 @@
+"""Identificador de rastreamento entre os serviços e spans de depuração por requisição.
+
+Toda requisição recebe um ID de rastreamento: o do cabeçalho `X-Trace-Id`, se
+vier um válido, ou um novo. Ele volta no mesmo cabeçalho da resposta e o
+Gateway o repassa aos agentes, ligando as requisições dos três serviços.
+
+Os spans só são coletados quando pedidos:
+  - `X-Debug: 1`: a resposta JSON ganha uma seção `depuracao` com os spans
+    (as etapas medidas com `Histograma.cronometrar`, em ms) e o cabeçalho
+    `Server-Timing`;
+  - `X-Trace-Spans: 1`: só o `Server-Timing`. É o que o Gateway envia aos
+    agentes, para juntar os spans deles aos seus sem alterar o corpo;
+  - `X-Profile: 1` (se `RASTREAMENTO_PERFIL_CABECALHO=1`) ou a amostragem
+    `RASTREAMENTO_PERFIL_AMOSTRAGEM`: a requisição também passa pelo profiler
+    por amostragem (ver `perfil.py`), e o flamegraph vai para
+    `RASTREAMENTO_DIR_PERFIS`.
+
+Sem nenhum desses pedidos, o custo por requisição é gerar o ID e, por etapa
+medida, uma leitura de `ContextVar`.
+"""
+
+import asyncio
+import os
+import re
+import tempfile
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from comum.json_rapido import serializar
+from comum.perfil import GerenciadorPerfis
+
+CABECALHO_ID = "X-Trace-Id"
+CABECALHO_DEPURACAO = "X-Debug"
+CABECALHO_SPANS = "X-Trace-Spans"
+CABECALHO_PERFIL = "X-Profile"
+
+ID_VALIDO = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+perfis = GerenciadorPerfis(
+    diretorio=os.getenv("RASTREAMENTO_DIR_PERFIS", os.path.join(tempfile.gettempdir(), "triagem-perfis")),
+    amostragem=float(os.getenv("RASTREAMENTO_PERFIL_AMOSTRAGEM", 0)),
+    aceitar_cabecalho=os.getenv("RASTREAMENTO_PERFIL_CABECALHO", "0") == "1",
+    intervalo_s=float(os.getenv("RASTREAMENTO_PERFIL_INTERVALO_MS", 1)) / 1000,
+    arquivos_max=int(os.getenv("RASTREAMENTO_PERFIS_MAX", 50)),
+)
+
+
+class Rastro:
+    """Spans coletados durante uma requisição com depuração ligada."""
+
+    __slots__ = ("id", "servico", "inicio", "spans", "perfilando")
+
+    def __init__(self, id_rastro: str, servico: str, perfilando: bool = False):
+        self.id = id_rastro
+        self.servico = servico
+        self.inicio = time.perf_counter()
+        # (serviço, nome, início em relação à requisição ou None se remoto, duração), em segundos.
+        self.spans: List[Tuple[str, str, Optional[float], float]] = []
+        self.perfilando = perfilando
+
+    def registrar(self, nome: str, inicio: Optional[float], duracao: float, servico: Optional[str] = None) -> None:
+        inicio_relativo = None if inicio is None else inicio - self.inicio
+        self.spans.append((servico or self.servico, nome, inicio_relativo, duracao))
+
+    def secao_depuracao(self) -> Dict[str, object]:
+        return {
+            "id_rastro": self.id,
+            "servico": self.servico,
+            "duracao_ms": round((time.perf_counter() - self.inicio) * 1000, 3),
+            "spans": [
+                {
+                    # Spans de outro serviço levam o nome dele na frente (ex.: "triagem.total").
+                    "nome": nome if servico == self.servico else f"{servico}.{nome}",
+                    "inicio_ms": None if inicio is None else round(inicio * 1000, 3),
+                    "duracao_ms": round(duracao * 1000, 3),
+                }
+                for servico, nome, inicio, duracao in self.spans
+            ],
+        }
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{servico}.{nome};dur={duracao * 1000:.3f}" for servico, nome, _, duracao in self.spans)
+
+
+_id_rastro: ContextVar[Optional[str]] = ContextVar("id_rastro", default=None)
+_rastro: ContextVar[Optional[Rastro]] = ContextVar("rastro", default=None)
+
+
+def registrar_span(nome: str, inicio: float, duracao: float, servico: Optional[str] = None) -> None:
+    """Anota um span (tempos de `time.perf_counter`) se a requisição atual estiver sendo rastreada.
+
+    `servico` distingue as etapas dos agentes quando eles rodam no processo do Gateway (modo nó único).
+    """
+    rastro = _rastro.get()
+    if rastro is not None:
+        rastro.registrar(nome, inicio, duracao, servico)
+
+
+def id_rastro_atual() -> Optional[str]:
+    """ID de rastreamento da requisição atual (None fora de uma requisição)."""
+    return _id_rastro.get()
+
+
+def cabecalhos_propagacao() -> Dict[str, str]:
+    """Cabeçalhos a repassar nas chamadas a outro serviço dentro da requisição atual."""
+    id_rastro = _id_rastro.get()
+    if id_rastro is None:
+        return {}
+    cabecalhos = {CABECALHO_ID: id_rastro}
+    rastro = _rastro.get()
+    if rastro is not None:
+        cabecalhos[CABECALHO_SPANS] = "1"
+        if rastro.perfilando:
+            cabecalhos[CABECALHO_PERFIL] = "1"
+    return cabecalhos
+
+
+def incorporar_server_timing(valor: Optional[str]) -> None:
+    """Junta ao rastro atual os spans (`servico.etapa`) que outro serviço devolveu em `Server-Timing`."""
+    rastro = _rastro.get()
+    if rastro is None or not valor:
+        return
+    for metrica in valor.split(","):
+        nome_completo, _, parametros = metrica.strip().partition(";")
+        servico, _, nome = nome_completo.partition(".")
+        for parametro in parametros.split(";"):
+            chave, _, duracao = parametro.strip().partition("=")
+            if chave == "dur" and nome:
+                try:
+                    rastro.registrar(nome, None, float(duracao) / 1000, servico)
+                except ValueError:
+                    pass
+
+
+class MiddlewareRastreamento:
+    """Middleware ASGI que define o ID de rastreamento e, se pedido, coleta spans e o perfil."""
+
+    def __init__(self, app, servico: str):
+        self.app = app
+        self.servico = servico
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recebido = depurar = spans = pedir_perfil = None
+        for nome, valor in scope["headers"]:
+            if nome == b"x-trace-id":
+                recebido = valor.decode("latin-1")
+            elif nome == b"x-debug":
+                depurar = valor == b"1"
+            elif nome == b"x-trace-spans":
+                spans = valor == b"1"
+            elif nome == b"x-profile":
+                pedir_perfil = valor == b"1"
+        id_rastro = recebido if recebido and ID_VALIDO.match(recebido) else os.urandom(8).hex()
+        cabecalho_id = (b"x-trace-id", id_rastro.encode())
+        token_id = _id_rastro.set(id_rastro)
+
+        perfilar = perfis.deve_perfilar(bool(pedir_perfil))
+        if not (depurar or spans or perfilar):
+            async def enviar(mensagem):
+                if mensagem["type"] == "http.response.start":
+                    mensagem["headers"] = [*mensagem.get("headers", ()), cabecalho_id]
+                await send(mensagem)
+
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                _id_rastro.reset(token_id)
+            return
+
+        amostrador = perfis.iniciar() if perfilar else None
+        rastro = Rastro(id_rastro, self.servico, perfilando=amostrador is not None)
+        token_rastro = _rastro.set(rastro)
+        inicio_resposta = None
+        corpo: List[bytes] = []
+
+        async def concluir_perfil() -> Optional[str]:
+            nonlocal amostrador
+            if amostrador is None:
+                return None
+            perfil, amostrador = amostrador, None
+            nome = f"{self.servico}-{id_rastro}"
+            return await asyncio.get_running_loop().run_in_executor(None, perfis.concluir, perfil, nome)
+
+        async def enviar(mensagem):
+            nonlocal inicio_resposta
+            if mensagem["type"] == "http.response.start":
+                cabecalhos = [*mensagem.get("headers", ()), cabecalho_id]
+                tipo = next((v for n, v in cabecalhos if n.lower() == b"content-type"), b"")
+                if tipo.startswith(b"application/json"):
+                    # Respostas JSON são seguradas até o fim, para incluir os spans.
+                    inicio_resposta = dict(mensagem, headers=cabecalhos)
+                    return
+                await send(dict(mensagem, headers=cabecalhos))
+                return
+            if inicio_resposta is None or mensagem["type"] != "http.response.body":
+                await send(mensagem)
+                return
+            corpo.append(mensagem.get("body", b""))
+            if mensagem.get("more_body", False):
+                return
+            caminho_perfil = await concluir_perfil()
+            conteudo = b"".join(corpo)
+            if depurar and conteudo.startswith(b"{") and conteudo.endswith(b"}"):
+                secao = rastro.secao_depuracao()
+                if caminho_perfil:
+                    secao["perfil"] = caminho_perfil
+                separador = b"," if conteudo != b"{}" else b""
+                conteudo = conteudo[:-1] + separador + b'"depuracao":' + serializar(secao) + b"}"
+            cabecalhos = [(n, v) for n, v in inicio_resposta["headers"] if n.lower() != b"content-length"]
+            cabecalhos.append((b"content-length", str(len(conteudo)).encode()))
+            if rastro.spans:
+                cabecalhos.append((b"server-timing", rastro.server_timing().encode("latin-1", "replace")))
+            await send(dict(inicio_resposta, headers=cabecalhos))
+            await send({"type": "http.response.body", "body": conteudo, "more_body": False})
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            await concluir_perfil()
+            _rastro.reset(token_rastro)
+            _id_rastro.reset(token_id)
+
+
+def instrumentar_rastreamento(app, servico: str) -> None:
+    """Adiciona o middleware de rastreamento ao app."""
+    app.add_middleware(MiddlewareRastreamento, servico=servico)
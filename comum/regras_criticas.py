@@ -0,0 +1,30 @@
+"""Regras de casos críticos da triagem, compartilhadas entre o agente e o Gateway.
+
+O Agente de Triagem usa estas palavras-chave para classificar um caso como
+urgência ALTA antes de consultar o modelo; o Gateway usa as mesmas regras
+como uma pré-classificação barata (por exemplo, para nunca usar cache em
+casos críticos).
+"""
+
+from comum.palavras_chave import AutomatoPalavrasChave
+
+# A comparação ignora acentos, então cada palavra-chave só precisa aparecer uma vez.
+PALAVRAS_CHAVE_ALTA = [
+    "acidente", "avc", "boca torta", "convulsão", 
+    "confusão mental", "coração acelerado", "corte profundo", "derrame", 
+    "desmaio", "dor no peito", "dor excruciante", "engasgado", 
+    "envenenamento", "facada", "fala arrastada", "falta de ar", 
+    "fratura", "hemorragia", "infarto", "não consigo respirar", 
+    "pancada na cabeça", "paralisia", "perda de consciência", 
+    "pressão no peito", "queimadura grave", "rosto torto", 
+    "sangramento", "sufocando", "traumatismo", "visão dupla",
+    "baleado", "veneno", "suicidio"
+]
+
+# Autômato compilado uma única vez: encontra qualquer palavra-chave em uma só passada pelo texto.
+AUTOMATO_ALTA = AutomatoPalavrasChave((palavra, "alta") for palavra in PALAVRAS_CHAVE_ALTA)
+
+
+def e_caso_critico(texto: str) -> bool:
+    """Indica se o texto contém algum sintoma crítico (urgência ALTA imediata)."""
+    return AUTOMATO_ALTA.contem(texto)
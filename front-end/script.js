@@ -10,7 +10,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const chatMessages = document.getElementById('chat-messages');
     
     // Aponta para o endpoint do Gateway, que será redirecionado pelo Nginx.
-    const API_URL = '/api/triagem-completa';
+    // A versão em fluxo (NDJSON) mostra a urgência antes de as recomendações chegarem.
+    const API_URL = '/api/triagem-completa/stream';
 
     /**
      * Adiciona uma nova mensagem (do usuário ou do bot) na interface do chat.
@@ -36,12 +37,15 @@ document.addEventListener('DOMContentLoaded', () => {
     };
     
     /**
-     * Formata a resposta completa da API em um HTML legível.
+     * Formata o resultado da triagem (primeira parte da resposta).
      */
-    const formatarRespostaCompleta = (data) => {
-        let htmlResponse = `<p><strong>Resultado da Triagem:</strong> ${data.resultado_triagem}</p>`;
-        
-        const rec = data.recomendacoes;
+    const formatarTriagem = (data) => `<p><strong>Resultado da Triagem:</strong> ${data.resultado_triagem}</p>`;
+
+    /**
+     * Formata as recomendações e as sugestões de atendimento em um HTML legível.
+     */
+    const formatarRecomendacoes = (rec) => {
+        let htmlResponse = '';
         if (rec) {
             htmlResponse += `<p><em>${rec.observacoes || ''}</em></p>`;
             
@@ -70,12 +74,31 @@ document.addEventListener('DOMContentLoaded', () => {
                             <small>${medico.especialidade}</small><br>
                             <span>${medico.endereco}</span><br>
                             <span>Tel: ${medico.telefone || 'Não informado'}</span>
+                            ${medico.distancia_km != null ? `<br><small>${medico.distancia_km} km de distância</small>` : ''}
                         </div>`;
                  });
             }
         }
         return htmlResponse;
-    }
+    };
+
+    /**
+     * Lê a resposta NDJSON linha a linha, chamando `aoReceber` para cada evento assim que ele chega.
+     */
+    const lerEventos = async (response, aoReceber) => {
+        const leitor = response.body.getReader();
+        const decodificador = new TextDecoder();
+        let pendente = '';
+        while (true) {
+            const { value, done } = await leitor.read();
+            if (done) break;
+            pendente += decodificador.decode(value, { stream: true });
+            const linhas = pendente.split('\n');
+            pendente = linhas.pop();
+            linhas.filter(linha => linha.trim()).forEach(linha => aoReceber(JSON.parse(linha)));
+        }
+        if (pendente.trim()) aoReceber(JSON.parse(pendente));
+    };
 
 
     /**
@@ -109,16 +132,28 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify({ texto_sintomas: textoSintoma })
             });
 
-            chatMessages.removeChild(typingIndicator);
-
             if (!response.ok) {
                 const errorData = await response.json();
                 throw new Error(errorData.detail || `Erro na API: ${response.statusText}`);
             }
 
-            const data = await response.json();
-            const respostaFormatada = formatarRespostaCompleta(data);
-            adicionarMensagemNaTela(respostaFormatada, 'bot');
+            // A mensagem do bot é criada com a triagem e completada conforme os eventos chegam;
+            // o indicador de "digitando" fica abaixo dela até as recomendações chegarem.
+            let mensagemBot = null;
+            await lerEventos(response, (evento) => {
+                const texto = mensagemBot && mensagemBot.querySelector('.texto');
+                if (evento.tipo === 'triagem') {
+                    mensagemBot = adicionarMensagemNaTela(formatarTriagem(evento), 'bot');
+                    chatMessages.appendChild(typingIndicator);
+                } else if (evento.tipo === 'recomendacoes' && texto) {
+                    texto.insertAdjacentHTML('beforeend', formatarRecomendacoes(evento.recomendacoes));
+                } else if (evento.tipo === 'erro' && texto) {
+                    texto.insertAdjacentHTML('beforeend', `<p><small>Não foi possível carregar as recomendações agora. ${evento.detail || ''}</small></p>`);
+                }
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            });
+
+            chatMessages.removeChild(typingIndicator);
 
         } catch (error) {
             if (chatMessages.contains(typingIndicator)) {
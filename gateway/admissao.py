@@ -0,0 +1,122 @@
+"""Controle de admissão com prioridade para as chamadas do Gateway aos agentes.
+
+No máximo `limite` requisições ficam em andamento junto aos agentes ao mesmo
+tempo; as demais esperam em uma fila de prioridade. Casos críticos (pelas
+mesmas palavras-chave do Agente de Triagem) passam à frente e nunca são
+descartados. Os demais são recusados, com um tempo sugerido para tentar de
+novo, se a fila estiver cheia ou se a espera passar de `espera_max_s`.
+
+Quando uma requisição termina, a vaga passa direto para a próxima da fila:
+enquanto houver alguém esperando, `em_andamento` continua igual a `limite`.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+PRIORIDADE_ALTA = 0
+PRIORIDADE_NORMAL = 1
+# Trabalho em segundo plano (ex.: triagem de arquivos): só usa vagas que sobram.
+PRIORIDADE_BAIXA = 2
+NOMES_PRIORIDADE = {PRIORIDADE_ALTA: "alta", PRIORIDADE_NORMAL: "normal", PRIORIDADE_BAIXA: "baixa"}
+
+
+class RequisicaoRejeitada(Exception):
+    """A requisição foi descartada para proteger o sistema (resposta 429)."""
+
+    def __init__(self, motivo: str, tentar_apos_s: int):
+        super().__init__(f"Requisição rejeitada ({motivo})")
+        self.motivo = motivo
+        self.tentar_apos_s = tentar_apos_s
+
+
+class ControleAdmissao:
+    """Limite de concorrência com fila de prioridade e descarte de carga."""
+
+    def __init__(self, limite: int = 64, espera_max_s: float = 0.25, fila_max: int = 256):
+        # limite <= 0 desativa o controle (toda requisição entra na hora).
+        self.limite = limite
+        self.espera_max_s = espera_max_s
+        self.fila_max = fila_max
+        self.em_andamento = 0
+        self._fila: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequencia = itertools.count()
+        self.na_fila: Dict[int, int] = {prioridade: 0 for prioridade in NOMES_PRIORIDADE}
+        self.admitidas = 0
+        self.rejeitadas = 0
+        # Média móvel da duração das requisições, para estimar o Retry-After.
+        self.duracao_media_s = 0.0
+
+    @property
+    def ativo(self) -> bool:
+        return self.limite > 0
+
+    def tentar_apos_s(self) -> int:
+        """Segundos sugeridos no Retry-After: o tempo estimado para esvaziar a fila atual."""
+        fila = sum(self.na_fila.values()) + 1
+        return max(1, math.ceil(fila / max(1, self.limite) * self.duracao_media_s))
+
+    async def entrar(self, prioridade: int, tempo_max: Optional[float] = None, descartavel: bool = True) -> float:
+        """Aguarda uma vaga e devolve o tempo de espera, em segundos.
+
+        Levanta `RequisicaoRejeitada` se a requisição for descartável (não é
+        crítica) e a fila estiver cheia ou a espera passar do limite, e
+        `asyncio.TimeoutError` se `tempo_max` acabar antes da vaga.
+        """
+        if not self.ativo or self.em_andamento < self.limite:
+            self.em_andamento += 1
+            self.admitidas += 1
+            return 0.0
+
+        descartavel = descartavel and prioridade != PRIORIDADE_ALTA
+        espera_max = tempo_max
+        if descartavel:
+            if self.na_fila[prioridade] >= self.fila_max:
+                self.rejeitadas += 1
+                raise RequisicaoRejeitada("fila_cheia", self.tentar_apos_s())
+            espera_max = self.espera_max_s if tempo_max is None else min(tempo_max, self.espera_max_s)
+
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._fila, (prioridade, next(self._sequencia), futuro))
+        self.na_fila[prioridade] += 1
+        inicio = time.monotonic()
+        try:
+            await asyncio.wait_for(futuro, espera_max)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if futuro.done() and not futuro.cancelled():
+                # A vaga chegou junto com o fim da espera: repassa a quem vem depois.
+                self.sair()
+            if isinstance(e, asyncio.TimeoutError) and descartavel and (tempo_max is None or espera_max < tempo_max):
+                self.rejeitadas += 1
+                raise RequisicaoRejeitada("espera", self.tentar_apos_s()) from None
+            raise
+        finally:
+            self.na_fila[prioridade] -= 1
+        self.admitidas += 1
+        return time.monotonic() - inicio
+
+    def sair(self, duracao_s: Optional[float] = None) -> None:
+        """Libera a vaga; se houver alguém na fila, ela passa direto para o primeiro."""
+        if duracao_s is not None:
+            self.duracao_media_s += 0.1 * (duracao_s - self.duracao_media_s)
+        while self._fila:
+            _, _, futuro = heapq.heappop(self._fila)
+            # Entradas de quem desistiu (tempo esgotado) ficam na fila até chegar a vez delas.
+            if not futuro.done():
+                futuro.set_result(None)
+                return
+        self.em_andamento -= 1
+
+    def estatisticas(self) -> Dict[str, object]:
+        return {
+            "ativo": self.ativo,
+            "limite": self.limite,
+            "em_andamento": self.em_andamento,
+            "fila": {NOMES_PRIORIDADE[p]: n for p, n in self.na_fila.items()},
+            "admitidas": self.admitidas,
+            "rejeitadas": self.rejeitadas,
+            "duracao_media_s": round(self.duracao_media_s, 4),
+        }
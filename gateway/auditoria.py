@@ -0,0 +1,366 @@
+"""Trilha de auditoria das decisões de triagem, para revisão clínica.
+
+Cada triagem concluída pelo Gateway vira um registro com o texto de entrada,
+a urgência, a mensagem e a versão do modelo do Agente de Triagem, a origem da
+decisão (filtro de entrada, regras ou modelo, e se veio do cache) e os locais
+de atendimento sugeridos.
+
+O caminho da requisição só anexa o registro a uma fila em memória, sem tocar
+no disco. Uma tarefa em segundo plano esvazia a fila em lotes de até
+`tamanho_lote` registros a cada `intervalo_s` (ou assim que um lote enche), e
+a serialização e a escrita rodam em uma thread própria. Os arquivos só
+recebem registros no fim (JSONL) ou inserções (SQLite), e são trocados por
+um novo quando passam de `tamanho_max_bytes`.
+
+A fila é limitada a `capacidade` registros: se a escrita não acompanhar o
+tráfego, os registros excedentes são descartados e contados, em vez de segurar
+as requisições. Os descartes, a ocupação da fila e o tempo de cada lote
+aparecem em `/metrics` e em `/estatisticas`.
+
+Os trabalhos de arquivo (ver trabalhos.py) têm uma fila própria, limitada a
+`capacidade_trabalhos`: cada bloco entra de uma vez por `registrar_trabalho`,
+que espera a gravação abrir espaço em vez de descartar. Um arquivo grande
+desacelera só o próprio trabalho e não ocupa a fila das requisições.
+
+Política de fsync (`politica_fsync`):
+  - `lote`: cada lote só é dado como gravado depois do fsync;
+  - `intervalo`: fsync no máximo a cada `intervalo_fsync_s` (padrão);
+  - `nunca`: a gravação no disco fica a cargo do sistema operacional.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from comum.json_rapido import desserializar, serializar
+
+logger = logging.getLogger(__name__)
+
+FORMATO_JSONL = "jsonl"
+FORMATO_SQLITE = "sqlite"
+
+FSYNC_LOTE = "lote"
+FSYNC_INTERVALO = "intervalo"
+FSYNC_NUNCA = "nunca"
+
+COLUNAS_SQLITE = (
+    "registrado_em", "id_rastro", "rota", "texto", "urgencia", "resultado_triagem",
+    "origem", "do_cache", "versao_modelo", "locais", "modo_degradado",
+)
+CRIAR_TABELA = (
+    "CREATE TABLE IF NOT EXISTS auditoria_triagem (id INTEGER PRIMARY KEY, registrado_em TEXT NOT NULL, "
+    "id_rastro TEXT, rota TEXT NOT NULL, texto TEXT NOT NULL, urgencia TEXT NOT NULL, "
+    "resultado_triagem TEXT NOT NULL, origem TEXT, do_cache INTEGER NOT NULL, versao_modelo TEXT, locais TEXT, "
+    "modo_degradado INTEGER NOT NULL)"
+)
+INSERIR_REGISTRO = (
+    f"INSERT INTO auditoria_triagem ({', '.join(COLUNAS_SQLITE)}) "
+    f"VALUES ({', '.join('?' * len(COLUNAS_SQLITE))})"
+)
+
+
+def _fsync_caminho(caminho: str) -> None:
+    if not os.path.exists(caminho):
+        return
+    descritor = os.open(caminho, os.O_RDONLY)
+    try:
+        os.fsync(descritor)
+    finally:
+        os.close(descritor)
+
+
+def locais_sugeridos(recomendacoes: bytes) -> List[Dict[str, Any]]:
+    """Locais da resposta do Agente de Recomendações (vazia no modo degradado)."""
+    try:
+        medicos = desserializar(recomendacoes).get("medicos_recomendados") or []
+    except (ValueError, AttributeError):
+        return []
+    return [
+        {campo: medico.get(campo) for campo in ("nome_local", "especialidade", "distancia_km")}
+        for medico in medicos
+    ]
+
+
+class EscritorJsonl:
+    """Um registro JSON por linha, sempre anexado ao fim do arquivo."""
+
+    extensao = "jsonl"
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._arquivo = open(caminho, "ab")
+
+    def gravar(self, registros: List[Dict[str, Any]]) -> None:
+        self._arquivo.write(b"".join(serializar(registro) + b"\n" for registro in registros))
+        self._arquivo.flush()
+
+    def sincronizar(self) -> None:
+        os.fsync(self._arquivo.fileno())
+
+    def tamanho(self) -> int:
+        return self._arquivo.tell()
+
+    def fechar(self) -> None:
+        self._arquivo.close()
+
+
+class EscritorSqlite:
+    """Uma linha por registro na tabela `auditoria_triagem`; cada lote é uma transação."""
+
+    extensao = "db"
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # O fsync fica com a política da auditoria (ver `sincronizar`), não com cada commit.
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(CRIAR_TABELA)
+        self._conn.commit()
+
+    def gravar(self, registros: List[Dict[str, Any]]) -> None:
+        linhas = [
+            tuple(serializar(registro[c]).decode() if c == "locais" else registro[c] for c in COLUNAS_SQLITE)
+            for registro in registros
+        ]
+        with self._conn:
+            self._conn.executemany(INSERIR_REGISTRO, linhas)
+
+    def sincronizar(self) -> None:
+        _fsync_caminho(f"{self.caminho}-wal")
+        _fsync_caminho(self.caminho)
+
+    def tamanho(self) -> int:
+        return sum(
+            os.path.getsize(caminho) for caminho in (self.caminho, f"{self.caminho}-wal") if os.path.exists(caminho)
+        )
+
+    def fechar(self) -> None:
+        self._conn.close()
+
+
+ESCRITORES = {FORMATO_JSONL: EscritorJsonl, FORMATO_SQLITE: EscritorSqlite}
+
+
+def montar_registro(
+    rota: str, texto: str, resultado_triagem: Dict[str, Any], urgencia: str, do_cache: bool,
+    recomendacoes: bytes, modo_degradado: bool, id_rastro: Optional[str] = None,
+) -> Dict[str, Any]:
+    # Só referências e um timestamp: a leitura das recomendações e a serialização ficam para a thread.
+    return {
+        "registrado_em": time.time(),
+        "id_rastro": id_rastro,
+        "rota": rota,
+        "texto": texto,
+        "urgencia": urgencia,
+        "resultado_triagem": resultado_triagem["resultado_triagem"],
+        # Quem decidiu no Agente de Triagem: filtro de entrada, regras críticas ou modelo.
+        "origem": resultado_triagem.get("origem"),
+        "do_cache": do_cache,
+        "versao_modelo": resultado_triagem.get("versao_modelo"),
+        "locais": recomendacoes,
+        "modo_degradado": modo_degradado,
+    }
+
+
+class AuditoriaTriagem:
+    """Fila limitada de registros de auditoria, gravada em lotes por uma tarefa em segundo plano."""
+
+    def __init__(
+        self,
+        diretorio: str,
+        formato: str = FORMATO_JSONL,
+        capacidade: int = 10000,
+        tamanho_lote: int = 500,
+        intervalo_s: float = 1.0,
+        politica_fsync: str = FSYNC_INTERVALO,
+        intervalo_fsync_s: float = 5.0,
+        tamanho_max_bytes: int = 64 * 1024 ** 2,
+        capacidade_trabalhos: int = 2000,
+    ):
+        # Sem diretório, a auditoria fica desligada e `registrar` não faz nada.
+        if formato not in ESCRITORES:
+            raise ValueError(f"Formato de auditoria desconhecido: '{formato}'")
+        if politica_fsync not in (FSYNC_LOTE, FSYNC_INTERVALO, FSYNC_NUNCA):
+            raise ValueError(f"Política de fsync desconhecida: '{politica_fsync}'")
+        self.diretorio = diretorio
+        self.formato = formato
+        self.capacidade = capacidade
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_s = intervalo_s
+        self.politica_fsync = politica_fsync
+        self.intervalo_fsync_s = intervalo_fsync_s
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.capacidade_trabalhos = capacidade_trabalhos
+        self._fila: Deque[Dict[str, Any]] = deque()
+        self._fila_trabalhos: Deque[Dict[str, Any]] = deque()
+        self._lote_cheio = asyncio.Event()
+        self._espaco_trabalhos = asyncio.Event()
+        self._tarefa: Optional[asyncio.Task] = None
+        self._parando = False
+        # Uma única thread: os lotes são gravados em ordem, sem disputar o arquivo.
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._escritor = None
+        self._ultimo_fsync = 0.0
+        self.registrados = 0
+        self.gravados = 0
+        self.descartados = 0
+        self.erros = 0
+        self.lotes = 0
+        self.arquivos = 0
+        self.ultimo_lote_s = 0.0
+
+    @property
+    def ativo(self) -> bool:
+        return bool(self.diretorio)
+
+    @property
+    def na_fila(self) -> int:
+        return len(self._fila) + len(self._fila_trabalhos)
+
+    @property
+    def na_fila_trabalhos(self) -> int:
+        return len(self._fila_trabalhos)
+
+    def registrar(
+        self, rota: str, texto: str, resultado_triagem: Dict[str, Any], urgencia: str, do_cache: bool,
+        recomendacoes: bytes, modo_degradado: bool, id_rastro: Optional[str] = None,
+    ) -> bool:
+        """Enfileira um registro sem bloquear; devolve False se a fila estiver cheia (registro descartado)."""
+        if not self.ativo:
+            return False
+        if len(self._fila) >= self.capacidade:
+            self.descartados += 1
+            return False
+        self._fila.append(montar_registro(
+            rota, texto, resultado_triagem, urgencia, do_cache, recomendacoes, modo_degradado, id_rastro
+        ))
+        self.registrados += 1
+        if self.na_fila >= self.tamanho_lote:
+            self._lote_cheio.set()
+        return True
+
+    async def registrar_trabalho(self, registros: List[Dict[str, Any]]) -> None:
+        """Enfileira os registros de um bloco de trabalho (`montar_registro`), esperando espaço na fila dos trabalhos."""
+        if not self.ativo or not registros:
+            return
+        # Com a fila vazia, o bloco entra mesmo que seja maior que a capacidade.
+        while (
+            self._tarefa is not None and self._fila_trabalhos
+            and len(self._fila_trabalhos) + len(registros) > self.capacidade_trabalhos
+        ):
+            self._espaco_trabalhos.clear()
+            self._lote_cheio.set()
+            await self._espaco_trabalhos.wait()
+        self._fila_trabalhos.extend(registros)
+        self.registrados += len(registros)
+        if self.na_fila >= self.tamanho_lote:
+            self._lote_cheio.set()
+
+    async def iniciar(self) -> None:
+        if not self.ativo or self._tarefa is not None:
+            return
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._parando = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auditoria")
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def fechar(self) -> None:
+        """Para a tarefa e grava o que ainda estiver na fila."""
+        if self._tarefa is None:
+            return
+        # Sem cancelar: um lote já retirado da fila termina de ser gravado (e contado).
+        self._parando = True
+        self._lote_cheio.set()
+        await asyncio.gather(self._tarefa, return_exceptions=True)
+        self._tarefa = None
+        while self.na_fila:
+            await self._gravar_proximo_lote()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._fechar_escritor)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    async def _executar(self) -> None:
+        while not self._parando:
+            try:
+                await asyncio.wait_for(self._lote_cheio.wait(), self.intervalo_s)
+            except asyncio.TimeoutError:
+                pass
+            self._lote_cheio.clear()
+            while self.na_fila:
+                await self._gravar_proximo_lote()
+
+    async def _gravar_proximo_lote(self) -> None:
+        # As requisições primeiro; o resto do lote é completado com os registros dos trabalhos.
+        lote = [self._fila.popleft() for _ in range(min(self.tamanho_lote, len(self._fila)))]
+        restante = min(self.tamanho_lote - len(lote), len(self._fila_trabalhos))
+        lote += [self._fila_trabalhos.popleft() for _ in range(restante)]
+        self._espaco_trabalhos.set()
+        inicio = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._gravar, lote)
+        except Exception as e:
+            # O lote se perde, mas a auditoria continua com os próximos.
+            self.erros += 1
+            logger.error(f"Falha ao gravar {len(lote)} registros de auditoria: {e}")
+            return
+        self.ultimo_lote_s = time.perf_counter() - inicio
+        self.gravados += len(lote)
+        self.lotes += 1
+
+    def _novo_caminho(self) -> str:
+        self.arquivos += 1
+        nome = f"auditoria-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self.arquivos}"
+        return os.path.join(self.diretorio, f"{nome}.{ESCRITORES[self.formato].extensao}")
+
+    def _gravar(self, lote: List[Dict[str, Any]]) -> None:
+        if self._escritor is not None and self._escritor.tamanho() >= self.tamanho_max_bytes:
+            self._fechar_escritor()
+        if self._escritor is None:
+            self._escritor = ESCRITORES[self.formato](self._novo_caminho())
+        for registro in lote:
+            registro["registrado_em"] = datetime.fromtimestamp(registro["registrado_em"]).isoformat(
+                timespec="milliseconds"
+            )
+            registro["locais"] = locais_sugeridos(registro["locais"])
+        self._escritor.gravar(lote)
+        agora = time.monotonic()
+        if self.politica_fsync == FSYNC_LOTE or (
+            self.politica_fsync == FSYNC_INTERVALO and agora - self._ultimo_fsync >= self.intervalo_fsync_s
+        ):
+            self._escritor.sincronizar()
+            self._ultimo_fsync = agora
+
+    def _fechar_escritor(self) -> None:
+        if self._escritor is None:
+            return
+        # O arquivo só é trocado depois de tudo o que foi escrito nele chegar ao disco.
+        if self.politica_fsync != FSYNC_NUNCA:
+            self._escritor.sincronizar()
+        self._escritor.fechar()
+        self._escritor = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "ativo": self.ativo,
+            "formato": self.formato,
+            "politica_fsync": self.politica_fsync,
+            "na_fila": self.na_fila,
+            "capacidade": self.capacidade,
+            "na_fila_trabalhos": self.na_fila_trabalhos,
+            "capacidade_trabalhos": self.capacidade_trabalhos,
+            "registrados": self.registrados,
+            "gravados": self.gravados,
+            "descartados": self.descartados,
+            "erros": self.erros,
+            "lotes": self.lotes,
+            "ultimo_lote_ms": round(self.ultimo_lote_s * 1000, 3),
+            "arquivo_atual": self._escritor.caminho if self._escritor is not None else None,
+        }
@@ -0,0 +1,108 @@
+"""Réplicas de um agente e a escolha de qual delas atende cada chamada.
+
+Cada agente pode ter várias réplicas (URLs separadas por vírgula em
+`AGENTE_TRIAGEM_URL` / `AGENTE_RECOMENDACOES_URL`). A saúde de cada uma vem
+de duas fontes:
+  - ativa: uma tarefa em segundo plano consulta o `/health` de todas a cada
+    `GATEWAY_SAUDE_INTERVALO_S` (ver `ClienteAgente.monitorar_saude`);
+  - passiva: cada réplica tem o seu `Disjuntor`, que a tira de circulação
+    depois de falhas seguidas em chamadas reais (ver `resiliencia.py`).
+
+Entre as réplicas saudáveis, a política `menos_pendentes` escolhe a que tem
+menos chamadas em andamento; a `ewma` escolhe a de menor latência média
+móvel, ponderada pelas chamadas em andamento (uma réplica rápida, mas já
+ocupada, deixa de parecer a melhor). Se nenhuma passar na verificação ativa,
+as que têm o disjuntor fechado voltam a ser candidatas: é melhor tentar do que
+recusar sem tentar.
+"""
+
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from resiliencia import Disjuntor
+
+POLITICA_MENOS_PENDENTES = "menos_pendentes"
+POLITICA_EWMA = "ewma"
+
+# Peso da última latência na média móvel.
+ALFA_EWMA = 0.3
+
+
+def separar_urls(valor: str) -> List[str]:
+    return [url.strip().rstrip("/") for url in valor.split(",") if url.strip()]
+
+
+class Replica:
+    """Uma instância de um agente, com a sua saúde e carga vistas pelo Gateway."""
+
+    def __init__(self, url: str, disjuntor: Disjuntor):
+        self.url = url
+        self.disjuntor = disjuntor
+        # Resultado da última verificação ativa (otimista até a primeira).
+        self.saudavel = True
+        self.em_andamento = 0
+        # Sem amostras, a latência estimada é 0: réplicas novas recebem chamadas logo.
+        self.latencia_ewma_s = 0.0
+        self.requisicoes_total = 0
+        self.falhas_total = 0
+        self.verificada_em: Optional[float] = None
+        self.ultimo_erro: Optional[str] = None
+
+    def registrar_sucesso(self, duracao_s: float) -> None:
+        if self.latencia_ewma_s == 0.0:
+            self.latencia_ewma_s = duracao_s
+        else:
+            self.latencia_ewma_s += ALFA_EWMA * (duracao_s - self.latencia_ewma_s)
+        self.disjuntor.registrar_sucesso()
+
+    def registrar_falha(self, erro: str) -> None:
+        self.falhas_total += 1
+        self.ultimo_erro = erro
+        self.disjuntor.registrar_falha()
+
+    def registrar_verificacao(self, saudavel: bool, erro: Optional[str] = None) -> None:
+        self.saudavel = saudavel
+        self.verificada_em = time.time()
+        self.ultimo_erro = None if saudavel else erro
+
+    @property
+    def em_circulacao(self) -> bool:
+        """Passou na última verificação ativa e o disjuntor aceita chamadas."""
+        return self.saudavel and self.disjuntor.disponivel()
+
+    def custo(self, politica: str) -> float:
+        if politica == POLITICA_EWMA:
+            return self.latencia_ewma_s * (self.em_andamento + 1)
+        return self.em_andamento
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "saudavel": self.saudavel,
+            "disjuntor": self.disjuntor.estado,
+            "disjuntor_aberturas": self.disjuntor.aberturas,
+            "em_andamento": self.em_andamento,
+            "latencia_ewma_ms": round(self.latencia_ewma_s * 1000, 3),
+            "requisicoes_total": self.requisicoes_total,
+            "falhas_total": self.falhas_total,
+            "verificada_em": self.verificada_em,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+def escolher_replica(replicas: List[Replica], politica: str, excluir: Optional[Replica] = None) -> Replica:
+    """A réplica de menor custo; `excluir` (ex.: a que acabou de falhar) só é usada se for a única opção.
+
+    Se nenhuma réplica estiver com o disjuntor fechado, devolve uma delas mesmo
+    assim: o `permitir` do disjuntor dela decide se a chamada falha na hora.
+    """
+    candidatas = [r for r in replicas if r.em_circulacao and r is not excluir]
+    if not candidatas:
+        disponiveis = [r for r in replicas if r.disjuntor.disponivel()]
+        candidatas = [r for r in disponiveis if r is not excluir] or disponiveis or replicas
+    if len(candidatas) == 1:
+        return candidatas[0]
+    menor = min(r.custo(politica) for r in candidatas)
+    # Empates são sorteados, para não concentrar as chamadas na primeira da lista.
+    return random.choice([r for r in candidatas if r.custo(politica) == menor])
@@ -0,0 +1,130 @@
+"""Cache LRU/TTL da classificação de triagem, com coalescência de requisições.
+
+Muitos pacientes descrevem sintomas quase idênticos; a chave do cache é o
+texto normalizado (minúsculas, sem acentos e com espaços colapsados). Quando
+várias requisições com a mesma chave chegam ao mesmo tempo, apenas a primeira
+consulta o agente e as demais aguardam o resultado dela.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from comum.palavras_chave import normalizar_texto
+
+# Origem do resultado devolvido por `obter_ou_calcular`.
+ORIGEM_AGENTE = "agente"
+ORIGEM_CACHE = "cache"
+ORIGEM_COALESCIDA = "coalescida"
+
+
+def chave_cache(texto: str) -> str:
+    return " ".join(normalizar_texto(texto).split())
+
+
+class CacheTriagem:
+    """Cache limitado por capacidade (LRU) e por tempo de vida (TTL)."""
+
+    def __init__(self, capacidade: int, ttl_s: float):
+        self.capacidade = capacidade
+        self.ttl_s = ttl_s
+        self._itens: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._em_andamento: Dict[str, asyncio.Future] = {}
+        self.acertos = 0
+        self.falhas = 0
+        self.coalescidas = 0
+        self.remocoes = 0
+        self.expiracoes = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.capacidade > 0 and self.ttl_s > 0
+
+    def _obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del self._itens[chave]
+            self.expiracoes += 1
+            return None
+        self._itens.move_to_end(chave)
+        return valor
+
+    def _armazenar(self, chave: str, valor: Dict[str, Any]) -> None:
+        self._itens[chave] = (time.monotonic() + self.ttl_s, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.capacidade:
+            self._itens.popitem(last=False)
+            self.remocoes += 1
+
+    async def obter_ou_calcular(
+        self,
+        chave: str,
+        calcular: Callable[[], Awaitable[Dict[str, Any]]],
+        armazenavel: Callable[[Dict[str, Any]], bool] = lambda valor: True,
+        tempo_max: Optional[float] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        """Devolve `(valor, origem)`, chamando `calcular` no máximo uma vez por chave em voo.
+
+        `tempo_max` limita a espera de uma requisição coalescida pela líder
+        (levanta `asyncio.TimeoutError`); a líder segue o próprio prazo. Se a
+        líder for cancelada, as coalescidas refazem a consulta em vez de
+        receberem o cancelamento dela.
+        """
+        valor = self._obter(chave)
+        if valor is not None:
+            self.acertos += 1
+            return valor, ORIGEM_CACHE
+
+        em_andamento = self._em_andamento.get(chave)
+        if em_andamento is not None:
+            self.coalescidas += 1
+            try:
+                # `shield` impede que o cancelamento de um seguidor cancele o líder.
+                return await asyncio.wait_for(asyncio.shield(em_andamento), tempo_max), ORIGEM_COALESCIDA
+            except asyncio.CancelledError:
+                if not em_andamento.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            # O líder foi cancelado (o cliente dele desconectou), não este seguidor: calcula por conta
+            # própria, e o primeiro a chegar aqui passa a ser o líder dos demais.
+            return await self.obter_ou_calcular(chave, calcular, armazenavel, tempo_max)
+
+        self.falhas += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_andamento[chave] = futuro
+        try:
+            valor = await calcular()
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            # Evita o aviso de "exception was never retrieved" quando não há seguidores.
+            futuro.exception()
+            raise
+        else:
+            futuro.set_result(valor)
+            if armazenavel(valor):
+                self._armazenar(chave, valor)
+            return valor, ORIGEM_AGENTE
+        finally:
+            del self._em_andamento[chave]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        consultas = self.acertos + self.falhas + self.coalescidas
+        return {
+            "ativo": self.ativo,
+            "itens": len(self._itens),
+            "capacidade": self.capacidade,
+            "ttl_s": self.ttl_s,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "coalescidas": self.coalescidas,
+            "remocoes": self.remocoes,
+            "expiracoes": self.expiracoes,
+            "em_andamento": len(self._em_andamento),
+            "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+        }
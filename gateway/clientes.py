@@ -0,0 +1,321 @@
+"""Clientes HTTP de longa duração usados pelo Gateway para falar com os agentes.
+
+Cada agente possui o seu próprio `httpx.AsyncClient`, criado uma única vez no
+ciclo de vida da aplicação, com pool de conexões keep-alive. Assim evitamos
+um novo handshake TCP a cada chamada e o esgotamento de portas efêmeras.
+
+`chamar` acrescenta ao pool o prazo da requisição, as retentativas, as
+requisições de reserva e os disjuntores (ver `resiliencia.py`). Cada chamada
+vai para uma das réplicas do agente (ver `balanceamento.py`), e cada réplica
+tem o seu disjuntor; uma retentativa ou requisição de reserva evita a réplica
+que acabou de ser usada.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import httpx
+from typing import Any, Dict, List, Optional
+
+from balanceamento import POLITICA_MENOS_PENDENTES, Replica, escolher_replica, separar_urls
+from comum.rastreamento import cabecalhos_propagacao, incorporar_server_timing
+from resiliencia import (
+    Disjuntor, JanelaLatencias, OrcamentoRetentativas, Prazo, PrazoEsgotado, espera_com_jitter
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _ler_float(nome: str, padrao: float) -> float:
+    return float(os.getenv(nome, padrao))
+
+
+def _ler_int(nome: str, padrao: int) -> int:
+    return int(os.getenv(nome, padrao))
+
+
+# --- Configuração dos pools (sobrescrevível via variáveis de ambiente) ---
+POOL_MAX_CONEXOES = _ler_int("GATEWAY_POOL_MAX_CONEXOES", 100)
+POOL_MAX_KEEPALIVE = _ler_int("GATEWAY_POOL_MAX_KEEPALIVE", 20)
+POOL_KEEPALIVE_EXPIRA_S = _ler_float("GATEWAY_POOL_KEEPALIVE_EXPIRA_S", 30.0)
+
+# --- Timeouts por etapa (em segundos) ---
+TIMEOUT_CONEXAO_S = _ler_float("GATEWAY_TIMEOUT_CONEXAO_S", 2.0)
+TIMEOUT_TRIAGEM_S = _ler_float("GATEWAY_TIMEOUT_TRIAGEM_S", 10.0)
+TIMEOUT_TRIAGEM_LOTE_S = _ler_float("GATEWAY_TIMEOUT_TRIAGEM_LOTE_S", 30.0)
+TIMEOUT_RECOMENDACOES_S = _ler_float("GATEWAY_TIMEOUT_RECOMENDACOES_S", 10.0)
+TIMEOUT_SAUDE_S = _ler_float("GATEWAY_TIMEOUT_SAUDE_S", 2.0)
+
+# --- Prazo de ponta a ponta de cada requisição ao Gateway (todas as etapas juntas) ---
+PRAZO_REQUISICAO_S = _ler_float("GATEWAY_PRAZO_S", 10.0)
+PRAZO_LOTE_S = _ler_float("GATEWAY_PRAZO_LOTE_S", 30.0)
+
+# --- Retentativas, requisições de reserva (hedging) e disjuntor ---
+RETENTATIVAS_MAX = _ler_int("GATEWAY_RETENTATIVAS_MAX", 2)
+RETENTATIVA_BASE_S = _ler_float("GATEWAY_RETENTATIVA_BASE_S", 0.05)
+RETENTATIVA_TETO_S = _ler_float("GATEWAY_RETENTATIVA_TETO_S", 1.0)
+# Fração das chamadas que pode virar tentativa extra (retentativa ou reserva).
+ORCAMENTO_RETENTATIVAS = _ler_float("GATEWAY_ORCAMENTO_RETENTATIVAS", 0.2)
+# Tentativas com menos tempo que isto pela frente nem são iniciadas.
+TENTATIVA_MINIMA_S = _ler_float("GATEWAY_TENTATIVA_MINIMA_S", 0.05)
+HEDGE_ATIVO = os.getenv("GATEWAY_HEDGE_ATIVO", "0") == "1"
+HEDGE_PERCENTIL = _ler_float("GATEWAY_HEDGE_PERCENTIL", 95.0)
+DISJUNTOR_FALHAS = _ler_int("GATEWAY_DISJUNTOR_FALHAS", 5)
+DISJUNTOR_ABERTO_S = _ler_float("GATEWAY_DISJUNTOR_ABERTO_S", 10.0)
+
+# --- Réplicas: política de escolha e verificação de saúde em segundo plano (0 desativa) ---
+POLITICA_BALANCEAMENTO = os.getenv("GATEWAY_BALANCEAMENTO", POLITICA_MENOS_PENDENTES)
+SAUDE_INTERVALO_S = _ler_float("GATEWAY_SAUDE_INTERVALO_S", 5.0)
+
+# Respostas que indicam um problema passageiro do agente (vale tentar de novo).
+STATUS_RETENTAVEIS = {502, 503, 504}
+
+
+def criar_timeout(total: float) -> httpx.Timeout:
+    """Timeout de uma etapa: `total` para leitura/escrita e um teto menor para conectar."""
+    return httpx.Timeout(total, connect=min(TIMEOUT_CONEXAO_S, total))
+
+
+class ClienteAgente:
+    """Cliente com pool de conexões para as réplicas de um agente."""
+
+    def __init__(self, nome: str, urls: str, timeout: float, endpoint_saude: str = "/health"):
+        # `urls`: uma ou mais URLs base, separadas por vírgula.
+        self.nome = nome
+        self.replicas = [
+            Replica(url, Disjuntor(DISJUNTOR_FALHAS, DISJUNTOR_ABERTO_S)) for url in separar_urls(urls)
+        ]
+        if not self.replicas:
+            raise ValueError(f"Nenhuma URL configurada para o {nome}")
+        self.endpoint_saude = endpoint_saude
+        self.timeout = criar_timeout(timeout)
+        self.limites = httpx.Limits(
+            max_connections=POOL_MAX_CONEXOES,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRA_S,
+        )
+        self.timeout_total = timeout
+        self._cliente: Optional[httpx.AsyncClient] = None
+        self.orcamento = OrcamentoRetentativas(ORCAMENTO_RETENTATIVAS)
+        self.latencias = JanelaLatencias()
+        self.requisicoes_total = 0
+        self.requisicoes_em_andamento = 0
+        self.erros_total = 0
+        self.retentativas = 0
+        self.reservas = 0
+        self._monitor: Optional[asyncio.Task] = None
+
+    @property
+    def urls(self) -> List[str]:
+        return [replica.url for replica in self.replicas]
+
+    @property
+    def saudavel(self) -> bool:
+        return any(replica.em_circulacao for replica in self.replicas)
+
+    @property
+    def disjuntor_aberto(self) -> bool:
+        """Verdadeiro se nenhuma réplica aceita chamadas agora (todas com o disjuntor aberto)."""
+        return not any(replica.disjuntor.disponivel() for replica in self.replicas)
+
+    @property
+    def monitorando(self) -> bool:
+        return self._monitor is not None and not self._monitor.done()
+
+    async def iniciar(self) -> None:
+        if self._cliente is None:
+            # Sem `base_url`: cada chamada monta a URL da réplica escolhida (o pool é por destino).
+            self._cliente = httpx.AsyncClient(timeout=self.timeout, limits=self.limites)
+        if SAUDE_INTERVALO_S > 0 and not self.monitorando:
+            self._monitor = asyncio.create_task(self.monitorar_saude())
+
+    async def fechar(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+
+    async def _verificar_replica(self, replica: Replica) -> None:
+        try:
+            resposta = await self.cliente.get(
+                f"{replica.url}{self.endpoint_saude}", timeout=criar_timeout(TIMEOUT_SAUDE_S)
+            )
+        except httpx.HTTPError as e:
+            replica.registrar_verificacao(False, f"{type(e).__name__}: {e}")
+            return
+        replica.registrar_verificacao(resposta.status_code == 200, f"HTTP {resposta.status_code}")
+
+    async def verificar_saude(self) -> bool:
+        """Consulta o endpoint de saúde de todas as réplicas; devolve se alguma está saudável."""
+        await asyncio.gather(*(self._verificar_replica(replica) for replica in self.replicas))
+        return self.saudavel
+
+    async def monitorar_saude(self) -> None:
+        while True:
+            saudaveis_antes = [replica.saudavel for replica in self.replicas]
+            await self.verificar_saude()
+            for replica, antes in zip(self.replicas, saudaveis_antes):
+                if replica.saudavel != antes:
+                    estado = "saudável" if replica.saudavel else f"fora de circulação ({replica.ultimo_erro})"
+                    logger.warning(f"Réplica {replica.url} do {self.nome}: {estado}")
+            await asyncio.sleep(SAUDE_INTERVALO_S)
+
+    def escolher(self, excluir: Optional[Replica] = None) -> Replica:
+        return escolher_replica(self.replicas, POLITICA_BALANCEAMENTO, excluir)
+
+    @property
+    def cliente(self) -> httpx.AsyncClient:
+        if self._cliente is None:
+            raise RuntimeError(f"Cliente do {self.nome} não foi iniciado")
+        return self._cliente
+
+    async def requisitar(
+        self, metodo: str, endpoint: str, timeout: Optional[float] = None, replica: Optional[Replica] = None, **kwargs
+    ) -> httpx.Response:
+        """Executa uma requisição em uma réplica (a escolhida pela política, se nenhuma for dada)."""
+        replica = replica or self.escolher()
+        if timeout is not None:
+            kwargs["timeout"] = criar_timeout(timeout)
+        # ID de rastreamento (e pedido de spans, se a requisição estiver em depuração).
+        cabecalhos = cabecalhos_propagacao()
+        if cabecalhos:
+            kwargs["headers"] = cabecalhos
+        self.requisicoes_total += 1
+        self.requisicoes_em_andamento += 1
+        replica.requisicoes_total += 1
+        replica.em_andamento += 1
+        inicio = time.perf_counter()
+        try:
+            resposta = await self.cliente.request(metodo, f"{replica.url}{endpoint}", **kwargs)
+        except Exception as e:
+            self.erros_total += 1
+            # Cancelamentos (ex.: a reserva que perdeu a corrida) não passam por aqui.
+            replica.registrar_falha(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            self.requisicoes_em_andamento -= 1
+            replica.em_andamento -= 1
+        if resposta.status_code < 500:
+            replica.registrar_sucesso(time.perf_counter() - inicio)
+        else:
+            replica.registrar_falha(f"HTTP {resposta.status_code}")
+        incorporar_server_timing(resposta.headers.get("server-timing"))
+        return resposta
+
+    async def post(
+        self, endpoint: str, json: Any, timeout: Optional[float] = None, replica: Optional[Replica] = None
+    ) -> httpx.Response:
+        return await self.requisitar("POST", endpoint, timeout=timeout, replica=replica, json=json)
+
+    async def get(self, endpoint: str, timeout: Optional[float] = None) -> httpx.Response:
+        return await self.requisitar("GET", endpoint, timeout=timeout)
+
+    async def chamar(
+        self, endpoint: str, json: Any, prazo: Prazo, idempotente: bool = True, timeout: Optional[float] = None
+    ) -> httpx.Response:
+        """POST dentro do prazo da requisição, com disjuntor e, se idempotente, retentativas.
+
+        Devolve a última resposta recebida (mesmo com erro 5xx, para o chamador
+        decidir); levanta `CircuitoAberto`, `PrazoEsgotado` ou o erro de transporte.
+        """
+        limite_tentativa = timeout or self.timeout_total
+        self.orcamento.depositar()
+        tentativa = 0
+        anterior: Optional[Replica] = None
+        while True:
+            restante = prazo.restante()
+            if restante < TENTATIVA_MINIMA_S:
+                raise PrazoEsgotado(f"Prazo esgotado antes de chamar o {self.nome}")
+            replica = self.escolher(excluir=anterior)
+            replica.disjuntor.permitir()
+            erro: Optional[Exception] = None
+            resposta: Optional[httpx.Response] = None
+            try:
+                resposta = await self._tentar(replica, endpoint, json, min(limite_tentativa, restante), idempotente)
+            except httpx.TransportError as e:
+                erro = e
+            # O disjuntor de cada réplica é atualizado em `requisitar`.
+            if resposta is not None and resposta.status_code < 500:
+                return resposta
+            anterior = replica
+
+            if erro is not None and prazo.restante() < TENTATIVA_MINIMA_S:
+                raise PrazoEsgotado(f"O {self.nome} não respondeu dentro do prazo") from erro
+            retentavel = erro is not None or resposta.status_code in STATUS_RETENTAVEIS
+            espera = espera_com_jitter(tentativa, RETENTATIVA_BASE_S, RETENTATIVA_TETO_S)
+            if (not idempotente or not retentavel or tentativa >= RETENTATIVAS_MAX
+                    or espera + TENTATIVA_MINIMA_S > prazo.restante() or not self.orcamento.retirar()):
+                if erro is not None:
+                    raise erro
+                return resposta
+            tentativa += 1
+            self.retentativas += 1
+            await asyncio.sleep(espera)
+
+    async def _medir(self, replica: Replica, endpoint: str, json: Any, timeout: float) -> httpx.Response:
+        inicio = time.perf_counter()
+        resposta = await self.post(endpoint, json=json, timeout=timeout, replica=replica)
+        if resposta.status_code < 500:
+            self.latencias.registrar(time.perf_counter() - inicio)
+        return resposta
+
+    async def _tentar(
+        self, replica: Replica, endpoint: str, json: Any, timeout: float, idempotente: bool
+    ) -> httpx.Response:
+        """Uma tentativa; com hedging, dispara uma reserva (em outra réplica) se a primeira passar do percentil."""
+        atraso = self.latencias.percentil(HEDGE_PERCENTIL) if HEDGE_ATIVO and idempotente else None
+        if atraso is None or atraso >= timeout:
+            return await self._medir(replica, endpoint, json, timeout)
+
+        primeira = asyncio.ensure_future(self._medir(replica, endpoint, json, timeout))
+        pendentes = {primeira}
+        try:
+            concluidas, _ = await asyncio.wait(pendentes, timeout=atraso)
+            if concluidas:
+                return await primeira
+            reserva = self.escolher(excluir=replica)
+            if not reserva.disjuntor.disponivel() or not self.orcamento.retirar():
+                return await primeira
+            reserva.disjuntor.permitir()
+            self.reservas += 1
+            pendentes.add(asyncio.ensure_future(self._medir(reserva, endpoint, json, timeout - atraso)))
+            while True:
+                concluidas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                for tarefa in concluidas:
+                    if tarefa.exception() is None and tarefa.result().status_code < 500:
+                        return tarefa.result()
+                if not pendentes:
+                    # Nenhuma das duas deu certo: devolve (ou levanta) o resultado da última.
+                    return tarefa.result()
+        finally:
+            # A tentativa que perdeu a corrida é cancelada (e sua conexão devolvida ao pool).
+            for tarefa in pendentes:
+                tarefa.cancel()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Estado atual do pool, útil para dimensionar os limites."""
+        conexoes = []
+        if self._cliente is not None:
+            # O httpx não expõe o pool publicamente; lemos o do transporte padrão.
+            pool = getattr(self._cliente._transport, "_pool", None)
+            conexoes = list(getattr(pool, "connections", []))
+        ociosas = sum(1 for c in conexoes if c.is_idle())
+        return {
+            "politica_balanceamento": POLITICA_BALANCEAMENTO,
+            "replicas": [replica.estatisticas() for replica in self.replicas],
+            "conexoes_abertas": len(conexoes),
+            "conexoes_ociosas": ociosas,
+            "conexoes_ativas": len(conexoes) - ociosas,
+            "max_conexoes": self.limites.max_connections,
+            "max_keepalive": self.limites.max_keepalive_connections,
+            "requisicoes_total": self.requisicoes_total,
+            "requisicoes_em_andamento": self.requisicoes_em_andamento,
+            "erros_total": self.erros_total,
+            "retentativas": self.retentativas,
+            "requisicoes_reserva": self.reservas,
+            "orcamento_retentativas": round(self.orcamento.fichas, 2),
+        }
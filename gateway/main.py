@@ -1,24 +1,142 @@
+import os
+import sys
 import uvicorn
 import httpx
 import asyncio
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from fastapi import FastAPI, File, HTTPException, Response, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 import logging
 
+# O pacote compartilhado `comum` fica na raiz do repositório (no Docker, em /app/comum).
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from comum.json_rapido import lista_json, objeto_json
+from comum.metricas import RegistroMetricas, instrumentar_app
+from comum.rastreamento import CABECALHO_ID, id_rastro_atual, instrumentar_rastreamento, registrar_span
+from comum.regras_criticas import e_caso_critico
+from admissao import (
+    ControleAdmissao, NOMES_PRIORIDADE, PRIORIDADE_ALTA, PRIORIDADE_BAIXA, PRIORIDADE_NORMAL, RequisicaoRejeitada
+)
+from auditoria import AuditoriaTriagem, FORMATO_JSONL, FSYNC_INTERVALO, montar_registro
+from cache import CacheTriagem, ORIGEM_CACHE, chave_cache
+from no_unico import AgentesLocais
+from clientes import (
+    ClienteAgente, PRAZO_LOTE_S, PRAZO_REQUISICAO_S, TIMEOUT_TRIAGEM_S, TIMEOUT_TRIAGEM_LOTE_S,
+    TIMEOUT_RECOMENDACOES_S
+)
+from resiliencia import CircuitoAberto, Prazo, PrazoEsgotado
+from trabalhos import (
+    ArquivoGrandeDemais, ArquivoInvalido, ESTADO_CONCLUIDO, GerenciadorTrabalhos, LimiteTamanhoUpload
+)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 print("Iniciando o Gateway de Comunicação entre Agentes...")
 
-AGENTE_TRIAGEM_URL = "http://agente-triagem:8000"
-AGENTE_RECOMENDACOES_URL = "http://agente-recomendacoes:8001"
+# Uma URL por réplica do agente, separadas por vírgula (ex.: "http://triagem-1:8000,http://triagem-2:8000").
+AGENTE_TRIAGEM_URL = os.getenv("AGENTE_TRIAGEM_URL", "http://agente-triagem:8000")
+AGENTE_RECOMENDACOES_URL = os.getenv("AGENTE_RECOMENDACOES_URL", "http://agente-recomendacoes:8001")
+
+# "distribuido": agentes em serviços separados, via HTTP (padrão).
+# "no_unico": agentes importados e executados no próprio processo do Gateway.
+MODO_DISTRIBUIDO = "distribuido"
+MODO_NO_UNICO = "no_unico"
+MODO_EXECUCAO = os.getenv("GATEWAY_MODO", MODO_DISTRIBUIDO)
+
+# Desativa o buffer de proxies (ex.: Nginx) para que cada linha do fluxo chegue assim que é enviada.
+CABECALHOS_STREAM = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Modo degradado: se o agente de recomendações falhar, devolve a triagem sem recomendações (em vez de 503).
+MODO_DEGRADADO_ATIVO = os.getenv("GATEWAY_MODO_DEGRADADO", "1") == "1"
+
+# Quantas chamadas ao agente de recomendações um lote pode fazer em paralelo.
+LOTE_CONCORRENCIA_RECOMENDACOES = int(os.getenv("GATEWAY_LOTE_CONCORRENCIA", 10))
+
+# Clientes HTTP de longa duração, um por agente, criados no ciclo de vida da aplicação
+# (que também inicia a verificação periódica de saúde das réplicas).
+cliente_triagem = ClienteAgente("agente_triagem", AGENTE_TRIAGEM_URL, TIMEOUT_TRIAGEM_S)
+cliente_recomendacoes = ClienteAgente("agente_recomendacoes", AGENTE_RECOMENDACOES_URL, TIMEOUT_RECOMENDACOES_S)
+CLIENTES_AGENTES = [cliente_triagem, cliente_recomendacoes]
+
+# Preenchido no ciclo de vida quando o Gateway roda no modo nó único.
+agentes_locais: Optional[AgentesLocais] = None
+
+# Cache da classificação de triagem (capacidade ou TTL igual a 0 desativa o cache).
+cache_triagem = CacheTriagem(
+    capacidade=int(os.getenv("GATEWAY_CACHE_CAPACIDADE", 10000)),
+    ttl_s=float(os.getenv("GATEWAY_CACHE_TTL_S", 300)),
+)
+
+# Controle de admissão: no máximo GATEWAY_ADMISSAO_LIMITE requisições junto aos agentes
+# (0 desativa); casos não críticos que esperariam mais que GATEWAY_ADMISSAO_ESPERA_MAX_MS
+# na fila recebem 429 com Retry-After.
+controle_admissao = ControleAdmissao(
+    limite=int(os.getenv("GATEWAY_ADMISSAO_LIMITE", 64)),
+    espera_max_s=float(os.getenv("GATEWAY_ADMISSAO_ESPERA_MAX_MS", 250)) / 1000,
+    fila_max=int(os.getenv("GATEWAY_ADMISSAO_FILA_MAX", 256)),
+)
+
+# Trabalhos de triagem de arquivos CSV/JSONL: blocos de GATEWAY_TRABALHOS_BLOCO linhas,
+# com prioridade baixa no controle de admissão (ver `processar_bloco_trabalho`).
+gerenciador_trabalhos = GerenciadorTrabalhos(
+    diretorio=os.getenv("GATEWAY_TRABALHOS_DIR", os.path.join(tempfile.gettempdir(), "triagem-trabalhos")),
+    # `processar_bloco_trabalho` é definida mais abaixo, junto das rotas.
+    processar_bloco=lambda textos: processar_bloco_trabalho(textos),
+    tamanho_bloco=int(os.getenv("GATEWAY_TRABALHOS_BLOCO", 200)),
+    simultaneos=int(os.getenv("GATEWAY_TRABALHOS_SIMULTANEOS", 1)),
+    tamanho_max_bytes=int(os.getenv("GATEWAY_TRABALHOS_TAMANHO_MAX_MB", 1024)) * 1024 ** 2,
+    ttl_s=float(os.getenv("GATEWAY_TRABALHOS_TTL_H", 24)) * 3600,
+)
+
+# Trilha de auditoria das triagens (vazio desativa): cada requisição só enfileira o registro,
+# que é gravado em lotes por uma tarefa em segundo plano (ver auditoria.py).
+auditoria = AuditoriaTriagem(
+    diretorio=os.getenv("GATEWAY_AUDITORIA_DIR", ""),
+    formato=os.getenv("GATEWAY_AUDITORIA_FORMATO", FORMATO_JSONL),
+    capacidade=int(os.getenv("GATEWAY_AUDITORIA_FILA_MAX", 10000)),
+    tamanho_lote=int(os.getenv("GATEWAY_AUDITORIA_LOTE", 500)),
+    intervalo_s=float(os.getenv("GATEWAY_AUDITORIA_INTERVALO_MS", 1000)) / 1000,
+    politica_fsync=os.getenv("GATEWAY_AUDITORIA_FSYNC", FSYNC_INTERVALO),
+    intervalo_fsync_s=float(os.getenv("GATEWAY_AUDITORIA_FSYNC_INTERVALO_S", 5)),
+    tamanho_max_bytes=int(os.getenv("GATEWAY_AUDITORIA_TAMANHO_MAX_MB", 64)) * 1024 ** 2,
+    capacidade_trabalhos=int(os.getenv("GATEWAY_AUDITORIA_FILA_TRABALHOS_MAX", 2000)),
+)
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    global agentes_locais
+    if MODO_EXECUCAO == MODO_NO_UNICO:
+        agentes_locais = AgentesLocais()
+        logger.info("Modo nó único: agentes carregados no processo do Gateway.")
+    else:
+        for cliente in CLIENTES_AGENTES:
+            await cliente.iniciar()
+        logger.info("Pools de conexão com os agentes iniciados.")
+    await auditoria.iniciar()
+    await gerenciador_trabalhos.iniciar()
+    yield
+    await gerenciador_trabalhos.fechar()
+    # Depois dos trabalhos, para gravar também os registros dos blocos que terminaram.
+    await auditoria.fechar()
+    if agentes_locais is not None:
+        agentes_locais.fechar()
+        agentes_locais = None
+    for cliente in CLIENTES_AGENTES:
+        await cliente.fechar()
 
 app = FastAPI(
     title="Gateway de Comunicação - Sistema TrIAgem",
     description="Gateway que orquestra a comunicação entre os agentes de IA do sistema de triagem médica.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=ciclo_de_vida
 )
 
 app.add_middleware(
@@ -27,11 +145,162 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Permite à interface web ler o ID de rastreamento e os tempos por etapa.
+    expose_headers=[CABECALHO_ID, "Server-Timing"],
+)
+# Recusa uploads grandes demais antes de o Starlette gravar o corpo em disco.
+app.add_middleware(
+    LimiteTamanhoUpload, caminho="/trabalhos/triagem", tamanho_max_bytes=gerenciador_trabalhos.tamanho_max_bytes
+)
+
+# Métricas em GET /metrics (formato Prometheus): duração por rota, por etapa e por agente.
+metricas = RegistroMetricas()
+instrumentar_app(app, metricas, "gateway")
+instrumentar_rastreamento(app, "gateway")
+duracao_etapas = metricas.histograma(
+    "gateway_etapa_duracao_segundos", "Duração de cada etapa da triagem completa.", ("etapa",)
+)
+chamadas_em_andamento = metricas.medidor(
+    "gateway_chamadas_agente_em_andamento", "Chamadas aos agentes em andamento.", ("agente",)
+)
+erros_agente = metricas.contador(
+    "gateway_erros_agente_total", "Falhas nas chamadas aos agentes, por tipo.", ("agente", "tipo")
+)
+metricas.medidor_funcao(
+    "gateway_cache_triagem", "Contadores e ocupação do cache de triagem.",
+    lambda: {
+        (campo,): valor for campo, valor in cache_triagem.estatisticas().items()
+        if campo in ("itens", "acertos", "falhas", "coalescidas", "remocoes", "expiracoes")
+    },
+    ("campo",),
+)
+metricas.medidor_funcao(
+    "gateway_pool_conexoes", "Conexões abertas e ativas no pool de cada agente.",
+    lambda: {
+        (cliente.nome, estado): cliente.estatisticas()[f"conexoes_{estado}"]
+        for cliente in CLIENTES_AGENTES for estado in ("abertas", "ativas")
+    },
+    ("agente", "estado"),
+)
+respostas_degradadas = metricas.contador(
+    "gateway_respostas_degradadas_total", "Triagens devolvidas sem recomendações (modo degradado)."
+)
+metricas.medidor_funcao(
+    "gateway_replica_saudavel", "1 se a réplica do agente está em circulação.",
+    lambda: {(cliente.nome, r.url): int(r.em_circulacao) for cliente in CLIENTES_AGENTES for r in cliente.replicas},
+    ("agente", "replica"),
+)
+metricas.medidor_funcao(
+    "gateway_replica_em_andamento", "Chamadas em andamento em cada réplica.",
+    lambda: {(cliente.nome, r.url): r.em_andamento for cliente in CLIENTES_AGENTES for r in cliente.replicas},
+    ("agente", "replica"),
+)
+metricas.medidor_funcao(
+    "gateway_replica_latencia_ewma_segundos", "Latência média móvel (EWMA) de cada réplica.",
+    lambda: {(cliente.nome, r.url): r.latencia_ewma_s for cliente in CLIENTES_AGENTES for r in cliente.replicas},
+    ("agente", "replica"),
+)
+metricas.medidor_funcao(
+    "gateway_disjuntor_aberto", "1 se todas as réplicas do agente estão com o disjuntor aberto.",
+    lambda: {(cliente.nome,): int(cliente.disjuntor_aberto) for cliente in CLIENTES_AGENTES},
+    ("agente",),
+)
+metricas.medidor_funcao(
+    "gateway_tentativas_extras", "Retentativas e requisições de reserva feitas a cada agente.",
+    lambda: {
+        (cliente.nome, tipo): valor for cliente in CLIENTES_AGENTES
+        for tipo, valor in (("retentativa", cliente.retentativas), ("reserva", cliente.reservas))
+    },
+    ("agente", "tipo"),
+)
+metricas.medidor_funcao(
+    "gateway_admissao_fila", "Requisições aguardando vaga, por prioridade.",
+    lambda: {(NOMES_PRIORIDADE[p],): n for p, n in controle_admissao.na_fila.items()},
+    ("prioridade",),
+)
+metricas.medidor_funcao(
+    "gateway_admissao_em_andamento", "Requisições admitidas em andamento junto aos agentes.",
+    lambda: {(): controle_admissao.em_andamento},
+)
+espera_admissao = metricas.histograma(
+    "gateway_admissao_espera_segundos", "Tempo na fila de admissão, por prioridade.", ("prioridade",)
+)
+rejeicoes_admissao = metricas.contador(
+    "gateway_admissao_rejeitadas_total", "Requisições descartadas por sobrecarga (429).", ("prioridade", "motivo")
+)
+metricas.medidor_funcao(
+    "gateway_trabalhos", "Trabalhos de triagem de arquivos, por estado.",
+    lambda: {(estado,): n for estado, n in gerenciador_trabalhos.contagem_por_estado().items()},
+    ("estado",),
 )
 
+metricas.medidor_funcao(
+    "gateway_auditoria_fila", "Registros de auditoria aguardando gravação e capacidade da fila.",
+    lambda: {
+        ("na_fila",): auditoria.na_fila, ("capacidade",): auditoria.capacidade,
+        ("na_fila_trabalhos",): auditoria.na_fila_trabalhos, ("capacidade_trabalhos",): auditoria.capacidade_trabalhos,
+    },
+    ("campo",),
+)
+metricas.medidor_funcao(
+    "gateway_auditoria_registros", "Registros de auditoria, por situação (descartados: fila cheia; erros: falha ao gravar).",
+    lambda: {
+        (campo,): auditoria.estatisticas()[campo] for campo in ("registrados", "gravados", "descartados", "erros")
+    },
+    ("campo",),
+)
+metricas.medidor_funcao(
+    "gateway_auditoria_ultimo_lote_segundos", "Duração da gravação do último lote de auditoria.",
+    lambda: {(): auditoria.ultimo_lote_s},
+)
+
+@contextmanager
+def medir_chamada(agente: str, etapa: str):
+    """Cronometra a chamada a um agente e a conta como em andamento enquanto durar."""
+    with chamadas_em_andamento.acompanhar(agente), duracao_etapas.cronometrar(etapa):
+        yield
+
+def resposta_json(campos: Iterable[Tuple[str, Any]]) -> Response:
+    """Serializa a resposta uma única vez (medindo o tempo) e a devolve sem revalidação."""
+    with duracao_etapas.cronometrar("serializacao"):
+        corpo = objeto_json(campos)
+    return Response(content=corpo, media_type="application/json")
+
+def prioridade_da_requisicao(sintomas: str) -> int:
+    """Pré-classificação barata: casos com palavras-chave críticas têm prioridade."""
+    return PRIORIDADE_ALTA if e_caso_critico(sintomas) else PRIORIDADE_NORMAL
+
+@asynccontextmanager
+async def admitir(prioridade: int, prazo: Prazo, descartavel: bool = True):
+    """Ocupa uma vaga junto aos agentes enquanto durar; sob sobrecarga, responde 429 ou 504."""
+    nome = NOMES_PRIORIDADE[prioridade]
+    try:
+        espera = await controle_admissao.entrar(prioridade, prazo.restante(), descartavel)
+    except RequisicaoRejeitada as e:
+        rejeicoes_admissao.inc(nome, e.motivo)
+        raise HTTPException(
+            status_code=429, detail="Gateway sobrecarregado. Tente novamente em instantes.",
+            headers={"Retry-After": str(e.tentar_apos_s)},
+        )
+    except asyncio.TimeoutError:
+        rejeicoes_admissao.inc(nome, "prazo")
+        raise HTTPException(status_code=504, detail="Prazo esgotado aguardando vaga no Gateway")
+    espera_admissao.observar(espera, nome)
+    registrar_span("espera_admissao", time.perf_counter() - espera, espera)
+    inicio = time.monotonic()
+    try:
+        yield
+    finally:
+        controle_admissao.sair(time.monotonic() - inicio)
+
 class SintomasInput(BaseModel):
     texto_sintomas: str
+    # Localização opcional do paciente, repassada ao agente de recomendações.
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
+# Os modelos de resposta documentam a API; as respostas são montadas direto em JSON
+# (ver `campos_triagem_completa`), com as recomendações do agente copiadas sem releitura.
 class TriagemCompleta(BaseModel):
     sintomas_originais: str
     resultado_triagem: str
@@ -39,58 +308,192 @@ class TriagemCompleta(BaseModel):
     recomendacoes: Dict[str, Any]
     tempo_processamento: float
     agentes_consultados: list
+    # Verdadeiro quando as recomendações ficaram de fora porque o agente falhou.
+    modo_degradado: bool = False
+
+class SintomasLoteInput(BaseModel):
+    textos_sintomas: List[str]
+
+class TriagemLoteResposta(BaseModel):
+    resultados: List[TriagemCompleta]
+    total: int
+    tempo_processamento: float
 
 class HealthStatus(BaseModel):
     gateway_status: str
     agente_triagem_status: str
     agente_recomendacoes_status: str
     timestamp: str
+    # Estado de cada réplica, como visto pela última verificação em segundo plano.
+    replicas: Dict[str, List[Dict[str, Any]]] = {}
 
-async def verificar_saude_agente(url: str, endpoint: str = "/docs") -> bool:
+async def status_agente(cliente: ClienteAgente) -> str:
+    if agentes_locais is not None:
+        # No modo nó único os agentes rodam neste processo: se o Gateway responde, eles também.
+        return "healthy"
+    if not cliente.monitorando:
+        # Verificação periódica desativada (GATEWAY_SAUDE_INTERVALO_S=0): consulta agora.
+        await cliente.verificar_saude()
+    return "healthy" if cliente.saudavel else "unhealthy"
+
+async def executar_no_prazo(corrotina, prazo: Prazo):
+    """No modo nó único, limita a execução local ao que resta do prazo da requisição."""
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{url}{endpoint}")
-            return response.status_code == 200
-    except Exception as e:
-        logger.error(f"Erro ao verificar saúde do agente {url}: {e}")
-        return False
+        return await asyncio.wait_for(corrotina, prazo.restante())
+    except asyncio.TimeoutError:
+        raise PrazoEsgotado("Agente local não respondeu dentro do prazo")
 
-async def chamar_agente_triagem(sintomas: str) -> Dict[str, Any]:
+async def chamar_agente_triagem(sintomas: str, prazo: Prazo) -> Dict[str, Any]:
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{AGENTE_TRIAGEM_URL}/triagem",
-                json={"texto_sintomas": sintomas}
-            )
+        with medir_chamada("agente_triagem", "chamada_agente_triagem"):
+            if agentes_locais is not None:
+                return await executar_no_prazo(agentes_locais.executar_triagem(sintomas), prazo)
+            response = await cliente_triagem.chamar("/triagem", {"texto_sintomas": sintomas}, prazo)
             response.raise_for_status()
             return response.json()
+    except CircuitoAberto:
+        erros_agente.inc("agente_triagem", "circuito_aberto")
+        raise HTTPException(status_code=503, detail="Agente de triagem indisponível")
+    except PrazoEsgotado as e:
+        erros_agente.inc("agente_triagem", "prazo")
+        logger.error(f"Prazo esgotado ao chamar agente de triagem: {e}")
+        raise HTTPException(status_code=504, detail="Agente de triagem não respondeu a tempo")
     except httpx.HTTPError as e:
+        erros_agente.inc("agente_triagem", "http")
         logger.error(f"Erro HTTP ao chamar agente de triagem: {e}")
         raise HTTPException(status_code=503, detail="Agente de triagem indisponível")
     except Exception as e:
+        erros_agente.inc("agente_triagem", "inesperado")
         logger.error(f"Erro inesperado ao chamar agente de triagem: {e}")
         raise HTTPException(status_code=500, detail="Erro interno no agente de triagem")
 
-async def chamar_agente_recomendacoes(urgencia: str, sintomas: str, resultado_triagem: str) -> Dict[str, Any]:
+async def chamar_agente_triagem_lote(textos: List[str], prazo: Prazo) -> List[Dict[str, Any]]:
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{AGENTE_RECOMENDACOES_URL}/recomendacoes",
-                json={
-                    "urgencia": urgencia,
-                    "sintomas_texto": sintomas,
-                    "resultado_triagem": resultado_triagem
-                }
+        with medir_chamada("agente_triagem", "chamada_agente_triagem_lote"):
+            if agentes_locais is not None:
+                return await executar_no_prazo(agentes_locais.executar_triagem_lote(textos), prazo)
+            response = await cliente_triagem.chamar(
+                "/triagem/lote", {"textos_sintomas": textos}, prazo, timeout=TIMEOUT_TRIAGEM_LOTE_S
             )
             response.raise_for_status()
-            return response.json()
+            return response.json()["resultados"]
+    except CircuitoAberto:
+        erros_agente.inc("agente_triagem", "circuito_aberto")
+        raise HTTPException(status_code=503, detail="Agente de triagem indisponível")
+    except PrazoEsgotado as e:
+        erros_agente.inc("agente_triagem", "prazo")
+        logger.error(f"Prazo esgotado ao chamar agente de triagem (lote): {e}")
+        raise HTTPException(status_code=504, detail="Agente de triagem não respondeu a tempo")
     except httpx.HTTPError as e:
+        erros_agente.inc("agente_triagem", "http")
+        logger.error(f"Erro HTTP ao chamar agente de triagem (lote): {e}")
+        raise HTTPException(status_code=503, detail="Agente de triagem indisponível")
+    except Exception as e:
+        erros_agente.inc("agente_triagem", "inesperado")
+        logger.error(f"Erro inesperado ao chamar agente de triagem (lote): {e}")
+        raise HTTPException(status_code=500, detail="Erro interno no agente de triagem")
+
+async def chamar_agente_recomendacoes(
+    urgencia: str, sintomas: str, resultado_triagem: str, prazo: Prazo,
+    latitude: Optional[float] = None, longitude: Optional[float] = None
+) -> bytes:
+    """Devolve o corpo JSON do agente como veio, para ser copiado na resposta sem ser relido."""
+    entrada = {
+        "urgencia": urgencia,
+        "sintomas_texto": sintomas,
+        "resultado_triagem": resultado_triagem
+    }
+    if latitude is not None and longitude is not None:
+        entrada.update(latitude=latitude, longitude=longitude)
+    try:
+        with medir_chamada("agente_recomendacoes", "chamada_agente_recomendacoes"):
+            if agentes_locais is not None:
+                return await executar_no_prazo(agentes_locais.gerar_recomendacoes(entrada), prazo)
+            response = await cliente_recomendacoes.chamar("/recomendacoes", entrada, prazo)
+            response.raise_for_status()
+            if not response.headers.get("content-type", "").startswith("application/json"):
+                raise ValueError(f"resposta sem JSON ({response.headers.get('content-type')})")
+            return response.content
+    except CircuitoAberto:
+        erros_agente.inc("agente_recomendacoes", "circuito_aberto")
+        raise HTTPException(status_code=503, detail="Agente de recomendações indisponível")
+    except PrazoEsgotado as e:
+        erros_agente.inc("agente_recomendacoes", "prazo")
+        logger.error(f"Prazo esgotado ao chamar agente de recomendações: {e}")
+        raise HTTPException(status_code=504, detail="Agente de recomendações não respondeu a tempo")
+    except httpx.HTTPError as e:
+        erros_agente.inc("agente_recomendacoes", "http")
         logger.error(f"Erro HTTP ao chamar agente de recomendações: {e}")
         raise HTTPException(status_code=503, detail="Agente de recomendações indisponível")
     except Exception as e:
+        erros_agente.inc("agente_recomendacoes", "inesperado")
         logger.error(f"Erro inesperado ao chamar agente de recomendações: {e}")
         raise HTTPException(status_code=500, detail="Erro interno no agente de recomendações")
 
+async def obter_resultado_triagem(sintomas: str, prazo: Prazo) -> Tuple[Dict[str, Any], bool]:
+    """Consulta a triagem passando pelo cache; devolve `(resultado, veio_do_cache)`.
+
+    Casos críticos nunca passam pelo cache: nem os que a pré-classificação por
+    palavras-chave identifica, nem os que o próprio agente sinalizar como críticos.
+    """
+    if not cache_triagem.ativo or e_caso_critico(sintomas):
+        return await chamar_agente_triagem(sintomas, prazo), False
+    try:
+        with duracao_etapas.cronometrar("triagem_com_cache"):
+            resultado, origem = await cache_triagem.obter_ou_calcular(
+                chave_cache(sintomas),
+                lambda: chamar_agente_triagem(sintomas, prazo),
+                armazenavel=lambda resultado: not resultado.get("critico", False),
+                tempo_max=prazo.restante(),
+            )
+    except asyncio.TimeoutError:
+        # Requisição coalescida: o prazo dela acabou antes de a requisição líder terminar.
+        erros_agente.inc("agente_triagem", "prazo")
+        raise HTTPException(status_code=504, detail="Agente de triagem não respondeu a tempo")
+    return resultado, origem == ORIGEM_CACHE
+
+async def obter_recomendacoes(
+    urgencia: str, sintomas: str, resultado_triagem: str, prazo: Prazo,
+    latitude: Optional[float] = None, longitude: Optional[float] = None
+) -> Tuple[bytes, bool]:
+    """Devolve `(recomendacoes_json, modo_degradado)`; no modo degradado, falhas viram `(b"{}", True)`."""
+    try:
+        recomendacoes = await chamar_agente_recomendacoes(
+            urgencia, sintomas, resultado_triagem, prazo, latitude=latitude, longitude=longitude
+        )
+        return recomendacoes, False
+    except HTTPException as e:
+        if not MODO_DEGRADADO_ATIVO:
+            raise
+        respostas_degradadas.inc()
+        logger.warning(f"Modo degradado: triagem devolvida sem recomendações ({e.detail})")
+        return b"{}", True
+
+def campos_triagem_completa(
+    sintomas_originais: str, resultado_triagem: str, urgencia: str, recomendacoes: bytes,
+    tempo_processamento: float, agentes_consultados: List[str], modo_degradado: bool
+) -> List[Tuple[str, Any]]:
+    """Campos de `TriagemCompleta`, na mesma ordem; `recomendacoes` já vem serializado."""
+    return [
+        ("sintomas_originais", sintomas_originais),
+        ("resultado_triagem", resultado_triagem),
+        ("urgencia", urgencia),
+        ("recomendacoes", recomendacoes),
+        ("tempo_processamento", round(tempo_processamento, 3)),
+        ("agentes_consultados", agentes_consultados),
+        ("modo_degradado", modo_degradado),
+    ]
+
+def auditar(
+    rota: str, texto: str, resultado_triagem: Dict[str, Any], urgencia: str, veio_do_cache: bool,
+    recomendacoes: bytes, modo_degradado: bool
+) -> None:
+    """Enfileira o registro de auditoria da triagem; nunca espera pelo disco."""
+    auditoria.registrar(
+        rota, texto, resultado_triagem, urgencia, veio_do_cache, recomendacoes, modo_degradado,
+        id_rastro=id_rastro_atual(),
+    )
+
 def extrair_urgencia_do_resultado(resultado: str) -> str:
     resultado_lower = resultado.lower()
     if "alta" in resultado_lower:
@@ -102,74 +505,281 @@ def extrair_urgencia_do_resultado(resultado: str) -> str:
 
 @app.post("/triagem-completa", response_model=TriagemCompleta, summary="Executa triagem completa com recomendações")
 async def executar_triagem_completa(sintomas: SintomasInput):
-    import time
+    with duracao_etapas.cronometrar("total"):
+        return await triagem_completa(sintomas)
+
+async def triagem_completa(sintomas: SintomasInput) -> Response:
     inicio = time.time()
+    # Um único prazo para a requisição inteira, compartilhado pelas duas etapas.
+    prazo = Prazo(PRAZO_REQUISICAO_S)
     logger.info(f"Iniciando triagem completa para: {sintomas.texto_sintomas[:50]}...")
     agentes_consultados = []
 
+    async with admitir(prioridade_da_requisicao(sintomas.texto_sintomas), prazo):
+        try:
+            logger.info("Consultando Agente de Triagem...")
+            resultado_triagem, veio_do_cache = await obter_resultado_triagem(sintomas.texto_sintomas, prazo)
+            agentes_consultados.append("cache_triagem" if veio_do_cache else "agente_triagem")
+            
+            urgencia = extrair_urgencia_do_resultado(resultado_triagem["resultado_triagem"])
+            logger.info(f"Urgência identificada: {urgencia}")
+            
+            logger.info("Consultando Agente de Recomendações...")
+            recomendacoes, modo_degradado = await obter_recomendacoes(
+                urgencia=urgencia,
+                sintomas=sintomas.texto_sintomas,
+                resultado_triagem=resultado_triagem["resultado_triagem"],
+                prazo=prazo,
+                latitude=sintomas.latitude,
+                longitude=sintomas.longitude
+            )
+            if not modo_degradado:
+                agentes_consultados.append("agente_recomendacoes")
+            auditar("triagem-completa", sintomas.texto_sintomas, resultado_triagem, urgencia, veio_do_cache,
+                    recomendacoes, modo_degradado)
+            
+            tempo_processamento = time.time() - inicio
+            
+            resposta_consolidada = campos_triagem_completa(
+                sintomas_originais=sintomas.texto_sintomas,
+                resultado_triagem=resultado_triagem["resultado_triagem"],
+                urgencia=urgencia,
+                recomendacoes=recomendacoes,
+                tempo_processamento=tempo_processamento,
+                agentes_consultados=agentes_consultados,
+                modo_degradado=modo_degradado
+            )
+            
+            logger.info(f"Triagem completa finalizada em {tempo_processamento:.3f}s")
+            return resposta_json(resposta_consolidada)
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Erro inesperado na triagem completa: {e}")
+            raise HTTPException(status_code=500, detail="Erro interno no gateway")
+
+def linha_ndjson(evento: Dict[str, Any]) -> bytes:
+    return objeto_json(evento.items()) + b"\n"
+
+@app.post("/triagem-completa/stream", summary="Executa triagem completa enviando cada etapa assim que fica pronta")
+async def executar_triagem_completa_stream(sintomas: SintomasInput):
+    """Triagem completa em NDJSON (uma linha JSON por evento), para conexões lentas.
+
+    Eventos, pelo campo `tipo`: `triagem` (assim que o agente de triagem responde),
+    `recomendacoes` (quando o agente de recomendações responde) e `fim`. Se as
+    recomendações falharem depois que o fluxo começou, o último evento é `erro`.
+    """
+    inicio = time.time()
+    prazo = Prazo(PRAZO_REQUISICAO_S)
+    logger.info(f"Iniciando triagem completa (stream) para: {sintomas.texto_sintomas[:50]}...")
+
+    # A triagem acontece antes de abrir o fluxo: se falhar, o cliente recebe o código HTTP de erro.
+    prioridade = prioridade_da_requisicao(sintomas.texto_sintomas)
     try:
-        logger.info("Consultando Agente de Triagem...")
-        resultado_triagem = await chamar_agente_triagem(sintomas.texto_sintomas)
-        agentes_consultados.append("agente_triagem")
-        
-        urgencia = extrair_urgencia_do_resultado(resultado_triagem["resultado_triagem"])
-        logger.info(f"Urgência identificada: {urgencia}")
-        
-        logger.info("Consultando Agente de Recomendações...")
-        recomendacoes = await chamar_agente_recomendacoes(
-            urgencia=urgencia,
-            sintomas=sintomas.texto_sintomas,
-            resultado_triagem=resultado_triagem["resultado_triagem"]
-        )
+        async with admitir(prioridade, prazo):
+            resultado_triagem, veio_do_cache = await obter_resultado_triagem(sintomas.texto_sintomas, prazo)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro inesperado na triagem completa (stream): {e}")
+        raise HTTPException(status_code=500, detail="Erro interno no gateway")
+    urgencia = extrair_urgencia_do_resultado(resultado_triagem["resultado_triagem"])
+    agentes_consultados = ["cache_triagem" if veio_do_cache else "agente_triagem"]
+
+    async def eventos():
+        yield linha_ndjson({
+            "tipo": "triagem",
+            "sintomas_originais": sintomas.texto_sintomas,
+            "resultado_triagem": resultado_triagem["resultado_triagem"],
+            "urgencia": urgencia,
+        })
+        try:
+            # Nova vaga para a segunda etapa; já admitida uma vez, a requisição não é mais descartada.
+            async with admitir(prioridade, prazo, descartavel=False):
+                recomendacoes = await chamar_agente_recomendacoes(
+                    urgencia=urgencia,
+                    sintomas=sintomas.texto_sintomas,
+                    resultado_triagem=resultado_triagem["resultado_triagem"],
+                    prazo=prazo,
+                    latitude=sintomas.latitude,
+                    longitude=sintomas.longitude
+                )
+        except HTTPException as e:
+            # A urgência já foi entregue ao paciente: entra na auditoria, sem os locais.
+            auditar("triagem-completa/stream", sintomas.texto_sintomas, resultado_triagem, urgencia, veio_do_cache,
+                    b"{}", True)
+            yield linha_ndjson({"tipo": "erro", "status": e.status_code, "detail": e.detail})
+            return
+        auditar("triagem-completa/stream", sintomas.texto_sintomas, resultado_triagem, urgencia, veio_do_cache,
+                recomendacoes, False)
         agentes_consultados.append("agente_recomendacoes")
-        
+        yield linha_ndjson({"tipo": "recomendacoes", "recomendacoes": recomendacoes})
         tempo_processamento = time.time() - inicio
-        
-        resposta_consolidada = TriagemCompleta(
-            sintomas_originais=sintomas.texto_sintomas,
+        yield linha_ndjson({
+            "tipo": "fim",
+            "tempo_processamento": round(tempo_processamento, 3),
+            "agentes_consultados": agentes_consultados,
+        })
+        logger.info(f"Triagem completa (stream) finalizada em {tempo_processamento:.3f}s")
+
+    return StreamingResponse(eventos(), media_type="application/x-ndjson", headers=CABECALHOS_STREAM)
+
+async def completar_lote(
+    textos: List[str], prazo: Prazo, inicio: float, rota: str,
+    registros_auditoria: Optional[List[Dict[str, Any]]] = None,
+) -> List[bytes]:
+    """Triagem em lote seguida das recomendações (com concorrência limitada); um JSON por texto.
+
+    Com `registros_auditoria`, os registros de auditoria são acrescentados à lista em vez de enfileirados.
+    """
+    resultados_triagem = await chamar_agente_triagem_lote(textos, prazo)
+    semaforo = asyncio.Semaphore(LOTE_CONCORRENCIA_RECOMENDACOES)
+
+    async def completar(texto: str, resultado_triagem: Dict[str, Any]) -> bytes:
+        urgencia = extrair_urgencia_do_resultado(resultado_triagem["resultado_triagem"])
+        async with semaforo:
+            recomendacoes, modo_degradado = await obter_recomendacoes(
+                urgencia=urgencia,
+                sintomas=texto,
+                resultado_triagem=resultado_triagem["resultado_triagem"],
+                prazo=prazo
+            )
+        if registros_auditoria is None:
+            auditar(rota, texto, resultado_triagem, urgencia, False, recomendacoes, modo_degradado)
+        else:
+            registros_auditoria.append(montar_registro(
+                rota, texto, resultado_triagem, urgencia, False, recomendacoes, modo_degradado, id_rastro_atual()
+            ))
+        return objeto_json(campos_triagem_completa(
+            sintomas_originais=texto,
             resultado_triagem=resultado_triagem["resultado_triagem"],
             urgencia=urgencia,
             recomendacoes=recomendacoes,
-            tempo_processamento=round(tempo_processamento, 3),
-            agentes_consultados=agentes_consultados
-        )
-        
-        logger.info(f"Triagem completa finalizada em {tempo_processamento:.3f}s")
-        return resposta_consolidada
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Erro inesperado na triagem completa: {e}")
-        raise HTTPException(status_code=500, detail="Erro interno no gateway")
+            tempo_processamento=time.time() - inicio,
+            agentes_consultados=["agente_triagem"] + ([] if modo_degradado else ["agente_recomendacoes"]),
+            modo_degradado=modo_degradado
+        ))
+
+    # asyncio.gather preserva a ordem de entrada nos resultados.
+    return await asyncio.gather(*(
+        completar(texto, resultado) for texto, resultado in zip(textos, resultados_triagem)
+    ))
+
+@app.post("/triagem-completa/lote", response_model=TriagemLoteResposta, summary="Executa triagem completa para vários casos")
+async def executar_triagem_completa_lote(lote: SintomasLoteInput):
+    with duracao_etapas.cronometrar("total_lote"):
+        return await triagem_completa_lote(lote)
+
+async def triagem_completa_lote(lote: SintomasLoteInput) -> Response:
+    inicio = time.time()
+    prazo = Prazo(PRAZO_LOTE_S)
+    logger.info(f"Iniciando triagem completa em lote para {len(lote.textos_sintomas)} casos...")
+
+    # O lote ocupa uma única vaga e só tem prioridade se algum dos casos for crítico.
+    prioridade = min(map(prioridade_da_requisicao, lote.textos_sintomas), default=PRIORIDADE_NORMAL)
+    async with admitir(prioridade, prazo):
+        try:
+            resultados = await completar_lote(lote.textos_sintomas, prazo, inicio, "triagem-completa/lote")
+            tempo_processamento = time.time() - inicio
+            logger.info(f"Triagem em lote de {len(resultados)} casos finalizada em {tempo_processamento:.3f}s")
+            return resposta_json([
+                ("resultados", lista_json(resultados)),
+                ("total", len(resultados)),
+                ("tempo_processamento", round(tempo_processamento, 3)),
+            ])
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Erro inesperado na triagem completa em lote: {e}")
+            raise HTTPException(status_code=500, detail="Erro interno no gateway")
+
+async def processar_bloco_trabalho(textos: List[str]) -> List[bytes]:
+    """Um bloco de um trabalho de arquivo: espera vaga atrás do tráfego interativo, sem ser descartado."""
+    prazo = Prazo(PRAZO_LOTE_S)
+    registros_auditoria: List[Dict[str, Any]] = []
+    with duracao_etapas.cronometrar("bloco_trabalho"):
+        async with admitir(PRIORIDADE_BAIXA, prazo, descartavel=False):
+            resultados = await completar_lote(textos, prazo, time.time(), "trabalhos/triagem", registros_auditoria)
+    # Fora da vaga de admissão: o bloco espera espaço na fila de auditoria dos trabalhos sem segurar o tráfego.
+    await auditoria.registrar_trabalho(registros_auditoria)
+    return resultados
+
+def buscar_trabalho(id_trabalho: str):
+    trabalho = gerenciador_trabalhos.obter(id_trabalho)
+    if trabalho is None:
+        raise HTTPException(status_code=404, detail="Trabalho não encontrado")
+    return trabalho
+
+@app.post("/trabalhos/triagem", status_code=202, summary="Envia um arquivo CSV ou JSONL para triagem em segundo plano")
+async def criar_trabalho_triagem(arquivo: UploadFile = File(...)):
+    try:
+        trabalho = await gerenciador_trabalhos.criar(arquivo, arquivo.filename, arquivo.content_type)
+    except ArquivoGrandeDemais as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ArquivoInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await arquivo.close()
+    return trabalho.resumo()
+
+@app.get("/trabalhos/{id_trabalho}", summary="Estado e progresso de um trabalho de triagem")
+async def consultar_trabalho(id_trabalho: str):
+    return buscar_trabalho(id_trabalho).resumo()
+
+@app.get("/trabalhos/{id_trabalho}/resultado", summary="Baixa os resultados do trabalho (JSONL, uma linha por caso)")
+async def baixar_resultado_trabalho(id_trabalho: str):
+    trabalho = buscar_trabalho(id_trabalho)
+    if trabalho.estado != ESTADO_CONCLUIDO:
+        raise HTTPException(status_code=409, detail=f"Trabalho ainda não concluído (estado: {trabalho.estado})")
+    # O arquivo é enviado em pedaços, sem ser carregado inteiro na memória.
+    return FileResponse(
+        trabalho.caminho_resultado, media_type="application/x-ndjson", filename=f"triagem-{trabalho.id}.jsonl"
+    )
+
+@app.delete("/trabalhos/{id_trabalho}", summary="Cancela o trabalho e apaga os arquivos dele")
+async def cancelar_trabalho(id_trabalho: str):
+    trabalho = await gerenciador_trabalhos.cancelar(id_trabalho)
+    if trabalho is None:
+        raise HTTPException(status_code=404, detail="Trabalho não encontrado")
+    return trabalho.resumo()
 
 @app.get("/health", response_model=HealthStatus, summary="Verifica o status de todos os componentes")
 async def verificar_saude_sistema():
     from datetime import datetime
-    tarefas = [
-        verificar_saude_agente(AGENTE_TRIAGEM_URL),
-        verificar_saude_agente(AGENTE_RECOMENDACOES_URL, "/health")
-    ]
-    resultados = await asyncio.gather(*tarefas, return_exceptions=True)
-    status_triagem = "healthy" if resultados[0] is True else "unhealthy"
-    status_recomendacoes = "healthy" if resultados[1] is True else "unhealthy"
-    
+    # Devolve o estado mantido pela verificação em segundo plano, sem consultar os agentes a cada chamada.
+    status_triagem, status_recomendacoes = await asyncio.gather(
+        status_agente(cliente_triagem), status_agente(cliente_recomendacoes)
+    )
+
     return HealthStatus(
         gateway_status="healthy",
         agente_triagem_status=status_triagem,
         agente_recomendacoes_status=status_recomendacoes,
-        timestamp=datetime.now().isoformat()
+        timestamp=datetime.now().isoformat(),
+        replicas={} if agentes_locais is not None else {
+            cliente.nome: [replica.estatisticas() for replica in cliente.replicas] for cliente in CLIENTES_AGENTES
+        }
     )
 
+@app.get("/estatisticas", summary="Estatísticas internas do Gateway")
+async def estatisticas_gateway():
+    return {
+        "pools_conexao": {cliente.nome: cliente.estatisticas() for cliente in CLIENTES_AGENTES},
+        "cache_triagem": cache_triagem.estatisticas(),
+        "admissao": controle_admissao.estatisticas(),
+        "trabalhos": gerenciador_trabalhos.contagem_por_estado(),
+        "auditoria": auditoria.estatisticas()
+    }
+
 @app.get("/", summary="Informações do Gateway")
 async def informacoes_gateway():
     return {
         "service": "Gateway TrIAgem", "version": "1.0.0",
         "description": "Gateway que orquestra a comunicação entre agentes de IA",
-        "agentes_conectados": {
-            "agente_triagem": AGENTE_TRIAGEM_URL,
-            "agente_recomendacoes": AGENTE_RECOMENDACOES_URL
-        }
+        "modo": MODO_EXECUCAO,
+        "agentes_conectados": {cliente.nome: cliente.urls for cliente in CLIENTES_AGENTES}
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+"""Modo "nó único": o Gateway executa os agentes no próprio processo.
+
+Em implantações pequenas, com os três serviços na mesma máquina, os dois
+saltos HTTP/JSON custam mais do que o trabalho em si. Neste modo o Gateway
+importa `executar_triagem` e `gerar_recomendacoes` diretamente dos agentes e
+os chama sem nenhuma chamada de rede (o trabalho bloqueante roda em um
+executor de threads). O contrato HTTP do Gateway não muda.
+"""
+
+import asyncio
+import contextvars
+import functools
+import importlib.util
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List
+
+DIRETORIO_RAIZ = Path(__file__).resolve().parent.parent
+DIRETORIO_AGENTE_TRIAGEM = os.getenv("GATEWAY_DIRETORIO_AGENTE_TRIAGEM", str(DIRETORIO_RAIZ / "agente_triagem"))
+DIRETORIO_AGENTE_RECOMENDACOES = os.getenv(
+    "GATEWAY_DIRETORIO_AGENTE_RECOMENDACOES", str(DIRETORIO_RAIZ / "agente_recomendacoes")
+)
+THREADS_EXECUTOR = int(os.getenv("GATEWAY_NO_UNICO_THREADS", min(32, (os.cpu_count() or 1) + 4)))
+
+
+def carregar_modulo_agente(nome_modulo: str, diretorio: str) -> ModuleType:
+    """Importa o `main.py` de um agente com um nome único (todos os serviços têm um `main`)."""
+    # Os módulos auxiliares do agente (ex.: `modelo`) são importados a partir da pasta dele.
+    if diretorio not in sys.path:
+        sys.path.append(diretorio)
+    spec = importlib.util.spec_from_file_location(nome_modulo, os.path.join(diretorio, "main.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nome_modulo] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+class AgentesLocais:
+    """Executa os agentes de triagem e de recomendações dentro do processo do Gateway."""
+
+    def __init__(self):
+        self.triagem = carregar_modulo_agente("agente_triagem_main", DIRETORIO_AGENTE_TRIAGEM)
+        self.recomendacoes = carregar_modulo_agente("agente_recomendacoes_main", DIRETORIO_AGENTE_RECOMENDACOES)
+        self._executor = ThreadPoolExecutor(max_workers=THREADS_EXECUTOR, thread_name_prefix="no-unico")
+        # O ciclo de vida do agente não roda aqui; a recarga automática do modelo é ligada à mão.
+        self.triagem.gerenciador_modelo.iniciar_monitoramento()
+
+    async def _executar(self, funcao, *args):
+        # Predição do modelo e consulta ao SQLite são bloqueantes: ficam fora do event loop.
+        # O contexto vai junto para a thread, com o rastreamento da requisição.
+        chamada = functools.partial(contextvars.copy_context().run, funcao, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, chamada)
+
+    async def executar_triagem(self, sintomas: str) -> Dict[str, Any]:
+        entrada = self.triagem.SintomasInput(texto_sintomas=sintomas)
+        # Assíncrono: a previsão já sai do event loop pelos micro-lotes do agente.
+        return await self.triagem.executar_triagem(entrada)
+
+    async def executar_triagem_lote(self, textos: List[str]) -> List[Dict[str, Any]]:
+        entrada = self.triagem.SintomasLoteInput(textos_sintomas=textos)
+        resposta = await self._executar(self.triagem.executar_triagem_lote, entrada)
+        return resposta["resultados"]
+
+    async def gerar_recomendacoes(self, entrada: Dict[str, Any]) -> bytes:
+        """Recebe o mesmo corpo JSON que seria enviado ao endpoint /recomendacoes."""
+        entrada = self.recomendacoes.TriagemInput(**entrada)
+        resposta = await self._executar(self.recomendacoes.gerar_recomendacoes, entrada)
+        # Os mesmos bytes que o agente devolveria pela rede.
+        return resposta.body
+
+    def fechar(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.triagem.gerenciador_modelo.parar_monitoramento()
+        self.triagem.agrupador.fechar()
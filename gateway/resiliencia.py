@@ -0,0 +1,142 @@
+"""Prazos, retentativas, requisições de reserva e disjuntores das chamadas aos agentes.
+
+Cada requisição ao Gateway recebe um único `Prazo`, compartilhado pelas duas
+etapas (triagem e recomendações): nenhuma tentativa espera além do que resta
+dele. Chamadas idempotentes podem ser repetidas com espera aleatória (jitter),
+limitadas por um `OrcamentoRetentativas`, e opcionalmente duplicadas quando a
+primeira demora mais que um percentil das latências recentes (hedging). Um
+`Disjuntor` por réplica do agente tira de circulação a réplica instável; se
+todas estiverem assim, a chamada falha imediatamente.
+"""
+
+import random
+import time
+from collections import deque
+from typing import Optional
+
+
+class PrazoEsgotado(Exception):
+    """O prazo da requisição acabou antes de o agente responder."""
+
+
+class CircuitoAberto(Exception):
+    """O disjuntor do agente está aberto: a chamada nem é tentada."""
+
+
+class Prazo:
+    """Prazo absoluto de uma requisição, medido no relógio monotônico."""
+
+    def __init__(self, total_s: float):
+        self.total_s = total_s
+        self.expira_em = time.monotonic() + total_s
+
+    def restante(self) -> float:
+        return max(0.0, self.expira_em - time.monotonic())
+
+    @property
+    def esgotado(self) -> bool:
+        return self.restante() <= 0
+
+
+def espera_com_jitter(tentativa: int, base_s: float, teto_s: float) -> float:
+    """Espera exponencial com jitter completo: sorteada entre 0 e base * 2^tentativa."""
+    return random.uniform(0, min(teto_s, base_s * (2 ** tentativa)))
+
+
+class OrcamentoRetentativas:
+    """Limita retentativas e requisições de reserva a uma fração do tráfego.
+
+    Cada chamada deposita `proporcao` fichas (até `maximo`) e cada tentativa
+    extra consome uma. Com o agente fora do ar, as retentativas param em vez de
+    multiplicar a carga sobre ele.
+    """
+
+    def __init__(self, proporcao: float = 0.2, maximo: float = 10.0):
+        self.proporcao = proporcao
+        self.maximo = maximo
+        self.fichas = maximo
+
+    def depositar(self) -> None:
+        self.fichas = min(self.maximo, self.fichas + self.proporcao)
+
+    def retirar(self) -> bool:
+        if self.fichas < 1:
+            return False
+        self.fichas -= 1
+        return True
+
+
+class Disjuntor:
+    """Disjuntor (circuit breaker) com os estados fechado, aberto e meio-aberto.
+
+    Abre após `limite_falhas` falhas seguidas. Depois de `tempo_aberto_s`, deixa
+    passar uma única chamada de sonda: se ela funcionar, o disjuntor fecha; se
+    falhar, volta a abrir.
+    """
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, limite_falhas: int = 5, tempo_aberto_s: float = 10.0):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto_s = tempo_aberto_s
+        self.estado = self.FECHADO
+        self.falhas_seguidas = 0
+        self.aberturas = 0
+        self._reabrir_em = 0.0
+        self._sonda_iniciada_em: Optional[float] = None
+
+    def permitir(self) -> None:
+        """Levanta `CircuitoAberto` se a chamada não deve ser feita agora."""
+        if self.estado == self.FECHADO:
+            return
+        agora = time.monotonic()
+        if self.estado == self.ABERTO:
+            if agora < self._reabrir_em:
+                raise CircuitoAberto()
+            self.estado = self.MEIO_ABERTO
+        # Meio-aberto: uma sonda por vez; uma sonda esquecida (ex.: cancelada) expira.
+        if self._sonda_iniciada_em is not None and agora - self._sonda_iniciada_em < self.tempo_aberto_s:
+            raise CircuitoAberto()
+        self._sonda_iniciada_em = agora
+
+    def disponivel(self) -> bool:
+        """Se `permitir` deixaria uma chamada passar agora (sem mudar o estado)."""
+        if self.estado == self.FECHADO:
+            return True
+        agora = time.monotonic()
+        if self.estado == self.ABERTO and agora < self._reabrir_em:
+            return False
+        return self._sonda_iniciada_em is None or agora - self._sonda_iniciada_em >= self.tempo_aberto_s
+
+    def registrar_sucesso(self) -> None:
+        self.estado = self.FECHADO
+        self.falhas_seguidas = 0
+        self._sonda_iniciada_em = None
+
+    def registrar_falha(self) -> None:
+        self.falhas_seguidas += 1
+        if self.estado == self.MEIO_ABERTO or self.falhas_seguidas >= self.limite_falhas:
+            if self.estado != self.ABERTO:
+                self.aberturas += 1
+            self.estado = self.ABERTO
+            self._reabrir_em = time.monotonic() + self.tempo_aberto_s
+            self._sonda_iniciada_em = None
+
+
+class JanelaLatencias:
+    """Latências das últimas chamadas bem-sucedidas, para o atraso das requisições de reserva."""
+
+    def __init__(self, tamanho: int = 200, minimo_amostras: int = 20):
+        self._amostras = deque(maxlen=tamanho)
+        self.minimo_amostras = minimo_amostras
+
+    def registrar(self, duracao_s: float) -> None:
+        self._amostras.append(duracao_s)
+
+    def percentil(self, p: float) -> Optional[float]:
+        if len(self._amostras) < self.minimo_amostras:
+            return None
+        ordenadas = sorted(self._amostras)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
@@ -0,0 +1,458 @@
+"""Trabalhos de triagem em massa: arquivos CSV ou JSONL processados em segundo plano.
+
+O arquivo enviado é copiado para o disco em pedaços e relido linha a linha. As
+linhas seguem em blocos de `tamanho_bloco` pela mesma função da triagem em
+lote, e cada resultado é anexado a um arquivo JSONL assim que o bloco termina.
+Só um bloco fica em memória por vez, então o consumo não depende do tamanho do
+arquivo (milhões de linhas ocupam o mesmo que algumas centenas).
+
+Os trabalhos ficam só na memória do processo: se o Gateway reiniciar, os que
+estavam em andamento se perdem e precisam ser enviados de novo. Por isso, ao
+iniciar, o gerenciador apaga as pastas de trabalhos deixadas no diretório por
+processos anteriores; depois, uma tarefa periódica apaga os trabalhos
+terminados há mais de `ttl_s`.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+from itertools import islice
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from comum.json_rapido import objeto_json
+
+logger = logging.getLogger(__name__)
+
+ESTADO_NA_FILA = "na_fila"
+ESTADO_PROCESSANDO = "processando"
+ESTADO_CONCLUIDO = "concluido"
+ESTADO_FALHOU = "falhou"
+ESTADO_CANCELADO = "cancelado"
+ESTADOS_FINAIS = (ESTADO_CONCLUIDO, ESTADO_FALHOU, ESTADO_CANCELADO)
+
+FORMATO_CSV = "csv"
+FORMATO_JSONL = "jsonl"
+
+# Colunas (CSV) ou chaves (JSONL) aceitas para o texto do caso, na ordem de preferência.
+CAMPOS_TEXTO = ("texto_sintomas", "texto")
+CAMPO_ID = "id"
+
+# Falhas passageiras do bloco (sobrecarga, agente fora, prazo) são tentadas de novo.
+STATUS_TRANSITORIOS = (429, 502, 503, 504)
+TENTATIVAS_BLOCO = 4
+
+TAMANHO_PEDACO_UPLOAD = 1024 * 1024
+# O corpo multipart tem, além do arquivo, delimitadores e cabeçalhos da parte.
+FOLGA_MULTIPART_BYTES = 64 * 1024
+
+INTERVALO_LIMPEZA_S = 60
+# Nome das pastas de trabalho (`uuid4().hex`): só essas são apagadas na limpeza do diretório.
+PADRAO_PASTA_TRABALHO = re.compile(r"[0-9a-f]{32}")
+
+
+class ArquivoInvalido(Exception):
+    """O arquivo enviado não pode ser lido como CSV ou JSONL de casos."""
+
+
+class ArquivoGrandeDemais(ArquivoInvalido):
+    pass
+
+
+class Caso(NamedTuple):
+    linha: int
+    id: Optional[str]
+    texto: Optional[str]
+    # Preenchido quando a linha não pôde ser lida; o caso não vai para a triagem.
+    erro: Optional[str] = None
+
+
+def detectar_formato(nome_arquivo: Optional[str], tipo_conteudo: Optional[str]) -> str:
+    nome = (nome_arquivo or "").lower()
+    tipo = (tipo_conteudo or "").lower()
+    if nome.endswith((".jsonl", ".ndjson")) or "ndjson" in tipo or "jsonl" in tipo:
+        return FORMATO_JSONL
+    if nome.endswith(".csv") or "csv" in tipo:
+        return FORMATO_CSV
+    raise ArquivoInvalido("Formato não reconhecido: envie um arquivo .csv ou .jsonl")
+
+
+class Trabalho:
+    """Estado e progresso de um arquivo em processamento."""
+
+    def __init__(self, diretorio: str, formato: str, nome_arquivo: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.diretorio = os.path.join(diretorio, self.id)
+        self.formato = formato
+        self.nome_arquivo = nome_arquivo
+        self.estado = ESTADO_NA_FILA
+        self.erro: Optional[str] = None
+        self.bytes_total = 0
+        self.bytes_lidos = 0
+        self.linhas_processadas = 0
+        self.linhas_com_erro = 0
+        self.criado_em = time.time()
+        self.iniciado_em: Optional[float] = None
+        self.concluido_em: Optional[float] = None
+        self.tarefa: Optional[asyncio.Task] = None
+
+    @property
+    def caminho_entrada(self) -> str:
+        return os.path.join(self.diretorio, f"entrada.{self.formato}")
+
+    @property
+    def caminho_resultado(self) -> str:
+        return os.path.join(self.diretorio, "resultado.jsonl")
+
+    def resumo(self) -> Dict[str, Any]:
+        fim = self.concluido_em or time.time()
+        decorrido = fim - self.iniciado_em if self.iniciado_em else 0.0
+        return {
+            "id": self.id,
+            "estado": self.estado,
+            "formato": self.formato,
+            "arquivo": self.nome_arquivo,
+            "progresso": round(self.bytes_lidos / self.bytes_total, 4) if self.bytes_total else 0.0,
+            "linhas_processadas": self.linhas_processadas,
+            "linhas_com_erro": self.linhas_com_erro,
+            "linhas_por_segundo": round(self.linhas_processadas / decorrido, 1) if decorrido > 0 else 0.0,
+            "tempo_decorrido_s": round(decorrido, 3),
+            "criado_em": self.criado_em,
+            "erro": self.erro,
+        }
+
+
+def _linhas_texto(arquivo: BinaryIO, trabalho: Trabalho) -> Iterator[str]:
+    """Decodifica o arquivo linha a linha, contando os bytes lidos para o progresso."""
+    for numero, linha in enumerate(arquivo):
+        trabalho.bytes_lidos += len(linha)
+        yield linha.decode("utf-8-sig" if numero == 0 else "utf-8", errors="replace")
+
+
+def _ler_csv(linhas: Iterator[str]) -> Iterator[Caso]:
+    cabecalho_bruto = next(linhas, "")
+    # Os CSVs do projeto usam ";" (ver dados_triagem.csv); planilhas exportadas costumam usar ",".
+    delimitador = ";" if cabecalho_bruto.count(";") > cabecalho_bruto.count(",") else ","
+    cabecalho = [campo.strip().lower() for campo in next(csv.reader([cabecalho_bruto], delimiter=delimitador), [])]
+    coluna_texto = next((cabecalho.index(c) for c in CAMPOS_TEXTO if c in cabecalho), None)
+    if coluna_texto is None:
+        raise ArquivoInvalido(f"O CSV precisa de uma coluna {' ou '.join(CAMPOS_TEXTO)} no cabeçalho")
+    coluna_id = cabecalho.index(CAMPO_ID) if CAMPO_ID in cabecalho else None
+
+    leitor = csv.reader(linhas, delimiter=delimitador)
+    for campos in leitor:
+        if not any(campo.strip() for campo in campos):
+            continue
+        # `line_num` conta as linhas físicas (o cabeçalho foi lido à parte).
+        linha = leitor.line_num + 1
+        identificador = campos[coluna_id] if coluna_id is not None and coluna_id < len(campos) else None
+        texto = campos[coluna_texto].strip() if coluna_texto < len(campos) else ""
+        yield Caso(linha, identificador, texto, None if texto else "texto vazio")
+
+
+def _ler_jsonl(linhas: Iterator[str]) -> Iterator[Caso]:
+    for linha, conteudo in enumerate(linhas, start=1):
+        if not conteudo.strip():
+            continue
+        try:
+            objeto = json.loads(conteudo)
+        except ValueError:
+            yield Caso(linha, None, None, "JSON inválido")
+            continue
+        identificador = None
+        if isinstance(objeto, dict):
+            identificador = objeto.get(CAMPO_ID)
+            objeto = next((objeto[c] for c in CAMPOS_TEXTO if c in objeto), None)
+        if not isinstance(objeto, str) or not objeto.strip():
+            yield Caso(linha, identificador, None, "texto vazio ou ausente")
+            continue
+        yield Caso(linha, identificador, objeto.strip())
+
+
+def ler_casos(arquivo: BinaryIO, formato: str, trabalho: Trabalho) -> Iterator[Caso]:
+    linhas = _linhas_texto(arquivo, trabalho)
+    return _ler_csv(linhas) if formato == FORMATO_CSV else _ler_jsonl(linhas)
+
+
+def linha_resultado(caso: Caso, resultado: Optional[bytes] = None, erro: Optional[str] = None) -> bytes:
+    campos = [("linha", caso.linha)]
+    if caso.id is not None:
+        campos.append(("id", caso.id))
+    campos.append(("resultado", resultado) if resultado is not None else ("erro", erro))
+    return objeto_json(campos) + b"\n"
+
+
+def _abrir_entrada(trabalho: Trabalho) -> BinaryIO:
+    os.makedirs(trabalho.diretorio)
+    return open(trabalho.caminho_entrada, "wb")
+
+
+def _abrir_processamento(trabalho: Trabalho) -> Tuple[BinaryIO, BinaryIO]:
+    entrada = open(trabalho.caminho_entrada, "rb")
+    try:
+        return entrada, open(trabalho.caminho_resultado, "wb")
+    except BaseException:
+        entrada.close()
+        raise
+
+
+def _fechar(*arquivos) -> None:
+    for arquivo in arquivos:
+        arquivo.close()
+
+
+def espera_retry_after(valor: Optional[str], padrao: float) -> float:
+    """Segundos pedidos pelo Retry-After (número ou data HTTP); `padrao` se ausente ou inválido."""
+    if valor is None:
+        return padrao
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return padrao
+
+
+def _validar_cabecalho_csv(trabalho: Trabalho) -> None:
+    # Um cabeçalho sem a coluna de texto é recusado já no envio.
+    with open(trabalho.caminho_entrada, "rb") as entrada:
+        next(ler_casos(entrada, FORMATO_CSV, trabalho), None)
+    trabalho.bytes_lidos = 0
+
+
+class LimiteTamanhoUpload:
+    """Middleware ASGI: recusa com 413 um envio cujo Content-Length já passa do limite.
+
+    O Starlette lê o formulário multipart inteiro (e o guarda em um arquivo
+    temporário) antes de a rota rodar; sem esta verificação, o limite só seria
+    aplicado depois de o arquivo todo ocupar o disco. Envios sem Content-Length
+    (chunked) continuam limitados apenas na cópia feita por `criar`.
+    """
+
+    def __init__(self, app, caminho: str, tamanho_max_bytes: int):
+        self.app = app
+        self.caminho = caminho
+        self.tamanho_max_bytes = tamanho_max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == self.caminho:
+            tamanho = dict(scope["headers"]).get(b"content-length", b"")
+            if tamanho.isdigit() and int(tamanho) > self.tamanho_max_bytes + FOLGA_MULTIPART_BYTES:
+                resposta = JSONResponse(
+                    {"detail": f"Arquivo maior que o limite de {self.tamanho_max_bytes // 1024 ** 2} MB"},
+                    status_code=413,
+                )
+                await resposta(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class GerenciadorTrabalhos:
+    """Recebe os arquivos, executa os trabalhos em segundo plano e guarda os resultados."""
+
+    def __init__(
+        self,
+        diretorio: str,
+        processar_bloco: Callable[[List[str]], Awaitable[List[bytes]]],
+        tamanho_bloco: int = 200,
+        simultaneos: int = 1,
+        tamanho_max_bytes: int = 1024 ** 3,
+        ttl_s: float = 24 * 3600,
+    ):
+        # `processar_bloco` devolve um JSON de TriagemCompleta por texto, na ordem de entrada.
+        self.diretorio = diretorio
+        self.processar_bloco = processar_bloco
+        self.tamanho_bloco = tamanho_bloco
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.ttl_s = ttl_s
+        self._vagas = asyncio.Semaphore(simultaneos)
+        self._trabalhos: Dict[str, Trabalho] = {}
+        self._tarefa_limpeza: Optional[asyncio.Task] = None
+
+    async def iniciar(self) -> None:
+        """Apaga as pastas deixadas por processos anteriores e agenda a limpeza periódica."""
+        removidas = await asyncio.get_running_loop().run_in_executor(None, self._remover_pastas_orfas)
+        if removidas:
+            logger.info(f"{removidas} pastas de trabalhos anteriores removidas de {self.diretorio}")
+        self._tarefa_limpeza = asyncio.create_task(self._limpar_periodicamente())
+
+    def _remover_pastas_orfas(self) -> int:
+        try:
+            nomes = os.listdir(self.diretorio)
+        except FileNotFoundError:
+            return 0
+        orfas = [nome for nome in nomes if PADRAO_PASTA_TRABALHO.fullmatch(nome) and nome not in self._trabalhos]
+        for nome in orfas:
+            shutil.rmtree(os.path.join(self.diretorio, nome), ignore_errors=True)
+        return len(orfas)
+
+    async def _limpar_periodicamente(self) -> None:
+        while True:
+            await asyncio.sleep(INTERVALO_LIMPEZA_S)
+            try:
+                await self.remover_expirados()
+            except Exception as e:
+                logger.warning(f"Falha ao remover trabalhos expirados: {e}")
+
+    def obter(self, id_trabalho: str) -> Optional[Trabalho]:
+        return self._trabalhos.get(id_trabalho)
+
+    def contagem_por_estado(self) -> Dict[str, int]:
+        contagem = dict.fromkeys((ESTADO_NA_FILA, ESTADO_PROCESSANDO, *ESTADOS_FINAIS), 0)
+        for trabalho in self._trabalhos.values():
+            contagem[trabalho.estado] += 1
+        return contagem
+
+    async def criar(self, arquivo, nome_arquivo: Optional[str], tipo_conteudo: Optional[str]) -> Trabalho:
+        """Copia o upload (`arquivo.read(n)` assíncrono) para o disco e agenda o processamento.
+
+        Quando a rota roda, o Starlette já guardou o upload inteiro em um arquivo
+        temporário: `tamanho_max_bytes` limita a cópia, mas o disco só é protegido
+        antes disso pelo `LimiteTamanhoUpload` (que depende do Content-Length).
+        """
+        loop = asyncio.get_running_loop()
+        trabalho = Trabalho(self.diretorio, detectar_formato(nome_arquivo, tipo_conteudo), nome_arquivo)
+        # A escrita e a releitura do arquivo rodam fora do event loop, como a leitura dos blocos.
+        destino = await loop.run_in_executor(None, _abrir_entrada, trabalho)
+        try:
+            try:
+                while pedaco := await arquivo.read(TAMANHO_PEDACO_UPLOAD):
+                    trabalho.bytes_total += len(pedaco)
+                    if trabalho.bytes_total > self.tamanho_max_bytes:
+                        raise ArquivoGrandeDemais(
+                            f"Arquivo maior que o limite de {self.tamanho_max_bytes // 1024 ** 2} MB"
+                        )
+                    await loop.run_in_executor(None, destino.write, pedaco)
+            finally:
+                await loop.run_in_executor(None, _fechar, destino)
+            if trabalho.bytes_total == 0:
+                raise ArquivoInvalido("Arquivo vazio")
+            if trabalho.formato == FORMATO_CSV:
+                await loop.run_in_executor(None, _validar_cabecalho_csv, trabalho)
+        except BaseException:
+            await loop.run_in_executor(None, lambda: shutil.rmtree(trabalho.diretorio, ignore_errors=True))
+            raise
+
+        self._trabalhos[trabalho.id] = trabalho
+        trabalho.tarefa = asyncio.create_task(self._executar(trabalho))
+        logger.info(f"Trabalho {trabalho.id} criado ({trabalho.formato}, {trabalho.bytes_total} bytes)")
+        return trabalho
+
+    async def cancelar(self, id_trabalho: str) -> Optional[Trabalho]:
+        """Interrompe o trabalho (se ainda estiver rodando) e apaga os arquivos dele."""
+        trabalho = self._trabalhos.pop(id_trabalho, None)
+        if trabalho is None:
+            return None
+        if trabalho.tarefa is not None and not trabalho.tarefa.done():
+            trabalho.tarefa.cancel()
+            await asyncio.gather(trabalho.tarefa, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: shutil.rmtree(trabalho.diretorio, ignore_errors=True)
+        )
+        return trabalho
+
+    async def remover_expirados(self) -> int:
+        """Esquece os trabalhos terminados há mais de `ttl_s` e apaga os arquivos deles."""
+        limite = time.time() - self.ttl_s
+        expirados = [
+            trabalho for trabalho in self._trabalhos.values()
+            if trabalho.estado in ESTADOS_FINAIS and (trabalho.concluido_em or 0) < limite
+        ]
+        for trabalho in expirados:
+            del self._trabalhos[trabalho.id]
+
+        def apagar():
+            for trabalho in expirados:
+                shutil.rmtree(trabalho.diretorio, ignore_errors=True)
+
+        if expirados:
+            await asyncio.get_running_loop().run_in_executor(None, apagar)
+        return len(expirados)
+
+    async def fechar(self) -> None:
+        if self._tarefa_limpeza is not None:
+            self._tarefa_limpeza.cancel()
+            await asyncio.gather(self._tarefa_limpeza, return_exceptions=True)
+            self._tarefa_limpeza = None
+        tarefas = [t.tarefa for t in self._trabalhos.values() if t.tarefa is not None and not t.tarefa.done()]
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+    async def _processar_com_retentativas(self, textos: List[str]) -> List[bytes]:
+        for tentativa in range(TENTATIVAS_BLOCO):
+            try:
+                return await self.processar_bloco(textos)
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                if status not in STATUS_TRANSITORIOS or tentativa == TENTATIVAS_BLOCO - 1:
+                    raise
+                # Respeita o Retry-After do controle de admissão, se houver.
+                retry_after = (getattr(e, "headers", None) or {}).get("Retry-After")
+                await asyncio.sleep(espera_retry_after(retry_after, 2 ** tentativa))
+
+    async def _executar(self, trabalho: Trabalho) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._vagas:
+            trabalho.estado = ESTADO_PROCESSANDO
+            trabalho.iniciado_em = time.time()
+            try:
+                # Abrir, ler, gravar e fechar os arquivos: tudo fora do event loop.
+                entrada, saida = await loop.run_in_executor(None, _abrir_processamento, trabalho)
+                try:
+                    casos = ler_casos(entrada, trabalho.formato, trabalho)
+                    while True:
+                        bloco = await loop.run_in_executor(None, lambda: list(islice(casos, self.tamanho_bloco)))
+                        if not bloco:
+                            break
+                        await loop.run_in_executor(None, saida.write, await self._processar(trabalho, bloco))
+                finally:
+                    await loop.run_in_executor(None, _fechar, entrada, saida)
+            except asyncio.CancelledError:
+                trabalho.estado = ESTADO_CANCELADO
+                raise
+            except Exception as e:
+                logger.error(f"Trabalho {trabalho.id} falhou: {e}")
+                trabalho.estado = ESTADO_FALHOU
+                trabalho.erro = str(e)
+            else:
+                trabalho.estado = ESTADO_CONCLUIDO
+                logger.info(
+                    f"Trabalho {trabalho.id} concluído: {trabalho.linhas_processadas} linhas "
+                    f"({trabalho.linhas_com_erro} com erro)"
+                )
+            finally:
+                trabalho.concluido_em = time.time()
+
+    async def _processar(self, trabalho: Trabalho, bloco: List[Caso]) -> bytes:
+        """Triagem de um bloco; devolve as linhas JSONL na ordem do arquivo."""
+        validos = [caso for caso in bloco if caso.erro is None]
+        resultados: Dict[int, bytes] = {}
+        erro_bloco = None
+        if validos:
+            try:
+                respostas = await self._processar_com_retentativas([caso.texto for caso in validos])
+                resultados = {caso.linha: resposta for caso, resposta in zip(validos, respostas)}
+            except Exception as e:
+                # Um bloco que não foi triado vira linhas de erro; o trabalho segue com o próximo.
+                erro_bloco = str(getattr(e, "detail", None) or e)
+                logger.warning(f"Trabalho {trabalho.id}: bloco a partir da linha {validos[0].linha} falhou: {erro_bloco}")
+
+        partes = []
+        for caso in bloco:
+            resultado = resultados.get(caso.linha)
+            if resultado is None:
+                trabalho.linhas_com_erro += 1
+            partes.append(linha_resultado(caso, resultado, caso.erro or erro_bloco))
+        trabalho.linhas_processadas += len(bloco)
+        return b"".join(partes)
@@ -0,0 +1,15 @@
+"""Configuração comum dos testes: a raiz do repositório e as pastas dos serviços no sys.path.
+
+Os serviços importam os próprios módulos pelo nome (`import modelo`, `import cache`),
+como fazem ao rodar de dentro da sua pasta.
+"""
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for pasta in ("", "gateway", "agente_triagem", "agente_recomendacoes"):
+    caminho = os.path.join(RAIZ, pasta)
+    if caminho not in sys.path:
+        sys.path.insert(0, caminho)
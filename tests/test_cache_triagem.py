@@ -0,0 +1,97 @@
+"""Coalescência de requisições no cache de triagem do Gateway."""
+
+import asyncio
+
+import pytest
+
+from cache import ORIGEM_AGENTE, ORIGEM_CACHE, ORIGEM_COALESCIDA, CacheTriagem
+
+RESULTADO = {"resultado_triagem": "Urgência BAIXA."}
+
+
+def test_requisicoes_simultaneas_consultam_o_agente_uma_vez():
+    async def cenario():
+        cache = CacheTriagem(capacidade=10, ttl_s=60)
+        chamadas = 0
+
+        async def calcular():
+            nonlocal chamadas
+            chamadas += 1
+            await asyncio.sleep(0.01)
+            return RESULTADO
+
+        resultados = await asyncio.gather(*(cache.obter_ou_calcular("febre", calcular) for _ in range(5)))
+        depois = await cache.obter_ou_calcular("febre", calcular)
+        return chamadas, resultados, depois, cache
+
+    chamadas, resultados, depois, cache = asyncio.run(cenario())
+    assert chamadas == 1
+    assert sorted(origem for _, origem in resultados) == [ORIGEM_AGENTE] + [ORIGEM_COALESCIDA] * 4
+    assert all(valor == RESULTADO for valor, _ in resultados)
+    assert depois == (RESULTADO, ORIGEM_CACHE)
+    assert cache.estatisticas()["em_andamento"] == 0
+
+
+def test_erro_do_lider_chega_aos_seguidores():
+    async def cenario():
+        cache = CacheTriagem(capacidade=10, ttl_s=60)
+
+        async def calcular():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("agente indisponível")
+
+        return await asyncio.gather(
+            *(cache.obter_ou_calcular("febre", calcular) for _ in range(3)), return_exceptions=True
+        )
+
+    resultados = asyncio.run(cenario())
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+
+
+def test_cancelamento_do_lider_nao_cancela_os_seguidores():
+    async def cenario():
+        cache = CacheTriagem(capacidade=10, ttl_s=60)
+        chamadas = 0
+
+        async def calcular():
+            nonlocal chamadas
+            chamadas += 1
+            await asyncio.sleep(0.05)
+            return RESULTADO
+
+        lider = asyncio.create_task(cache.obter_ou_calcular("febre", calcular))
+        await asyncio.sleep(0)
+        seguidores = [asyncio.create_task(cache.obter_ou_calcular("febre", calcular)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        lider.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lider
+        resultados = await asyncio.gather(*seguidores)
+        return chamadas, resultados, cache
+
+    chamadas, resultados, cache = asyncio.run(cenario())
+    # Um dos seguidores assume a consulta; os outros dois se juntam a ele.
+    assert chamadas == 2
+    assert sorted(origem for _, origem in resultados) == [ORIGEM_AGENTE, ORIGEM_COALESCIDA, ORIGEM_COALESCIDA]
+    assert all(valor == RESULTADO for valor, _ in resultados)
+    assert cache.estatisticas()["em_andamento"] == 0
+
+
+def test_cancelamento_de_um_seguidor_nao_afeta_o_lider():
+    async def cenario():
+        cache = CacheTriagem(capacidade=10, ttl_s=60)
+
+        async def calcular():
+            await asyncio.sleep(0.03)
+            return RESULTADO
+
+        lider = asyncio.create_task(cache.obter_ou_calcular("febre", calcular))
+        await asyncio.sleep(0)
+        seguidor = asyncio.create_task(cache.obter_ou_calcular("febre", calcular))
+        await asyncio.sleep(0.01)
+        seguidor.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await seguidor
+        return await lider
+
+    assert asyncio.run(cenario()) == (RESULTADO, ORIGEM_AGENTE)
@@ -0,0 +1,67 @@
+"""Extração de sintomas pelo índice FTS5 do catálogo do Agente de Recomendações."""
+
+import sqlite3
+
+import pytest
+
+from catalogo_sintomas import CatalogoSintomas
+from create_database import DICAS, SINONIMOS, SINTOMAS, criar_banco, inserir_catalogo
+
+
+@pytest.fixture
+def caminho_db(tmp_path):
+    caminho = str(tmp_path / "medicos.db")
+    conn = criar_banco(caminho)
+    inserir_catalogo(conn, SINTOMAS, SINONIMOS, DICAS)
+    conn.close()
+    return caminho
+
+
+@pytest.fixture
+def catalogo(caminho_db):
+    return CatalogoSintomas(caminho_db, intervalo_verificacao_s=0)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Vomitou a noite toda", ("nausea",)),
+    ("vomitei duas vezes", ("nausea",)),
+    ("estou com vômitos", ("nausea",)),
+    ("muito enjoado", ("nausea",)),
+    ("ele tossiu bastante", ("tosse",)),
+    ("tossindo e febril", ("tosse", "febre")),
+    ("dor de cabeça e náuseas", ("dor_cabeca", "nausea")),
+    ("DOR DE GARGANTA", ("dor_garganta",)),
+])
+def test_encontra_sinonimos_e_flexoes(catalogo, texto, esperado):
+    assert catalogo.extrair(texto) == esperado
+
+
+@pytest.mark.parametrize("texto", ["o cabeçalho da página", "dor de cabe", "vomi", "tudo bem"])
+def test_compara_palavras_inteiras(catalogo, texto):
+    assert catalogo.extrair(texto) == ()
+
+
+def test_sinonimo_incluido_no_banco_vale_sem_reiniciar(caminho_db, catalogo):
+    assert catalogo.extrair("sinto calafrios") == ()
+    with sqlite3.connect(caminho_db) as conn:
+        conn.execute("INSERT INTO sinonimos (termo, sintoma) VALUES ('calafrio*', 'febre')")
+    assert catalogo.extrair("sinto calafrios") == ("febre",)
+
+
+def test_considera_so_o_inicio_de_textos_longos(caminho_db):
+    catalogo = CatalogoSintomas(caminho_db, intervalo_verificacao_s=0, palavras_max_texto=50)
+    enchimento = " ".join(f"palavra{i}" for i in range(20_000))
+    assert catalogo.extrair(f"tenho febre {enchimento}") == ("febre",)
+    assert catalogo.extrair(f"{enchimento} e tosse") == ()
+
+
+def test_cache_usa_as_palavras_normalizadas_e_cortadas(caminho_db):
+    catalogo = CatalogoSintomas(caminho_db, intervalo_verificacao_s=0, palavras_max_texto=5)
+    textos = [
+        "Dor de cabeça forte hoje",
+        "dor de CABECA, forte hoje!",
+        "dor de cabeça forte hoje e mais um texto enorme que passa do limite",
+    ]
+    assert {catalogo.extrair(texto) for texto in textos} == {("dor_cabeca",)}
+    estatisticas = catalogo.estatisticas()
+    assert (estatisticas["cache_falhas"], estatisticas["cache_acertos"], estatisticas["cache_itens"]) == (1, 2, 1)
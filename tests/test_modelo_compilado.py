@@ -0,0 +1,70 @@
+"""Paridade do modelo compilado (só NumPy) com o pipeline do scikit-learn que o originou."""
+
+import numpy as np
+import pytest
+
+from modelo import (
+    ARQUIVO_DADOS, TIPO_INCREMENTAL, compilar_artefato, construir_artefato, ler_dados_treino, treinar_pipeline,
+)
+from modelo_compilado import TOLERANCIA_PARIDADE, ModeloCompilado, exportar
+
+TEXTOS_AVULSOS = [
+    "dor no peito e falta de ar",
+    "DOR DE CABEÇA forte há 3 dias!!",
+    "febre, tosse e dor de garganta",
+    "só queria renovar a receita",
+    "",
+    "texto sem nenhuma palavra do vocabulário xyzw",
+]
+
+
+@pytest.fixture(scope="module")
+def dados():
+    return ler_dados_treino(ARQUIVO_DADOS)
+
+
+@pytest.fixture(scope="module")
+def pipeline(dados):
+    return treinar_pipeline(*dados)
+
+
+@pytest.fixture(scope="module")
+def compilado(pipeline):
+    return exportar(pipeline)
+
+
+def test_previsoes_iguais_no_corpus(dados, pipeline, compilado):
+    textos, _ = dados
+    assert list(compilado.predict(textos)) == list(pipeline.predict(textos))
+    np.testing.assert_allclose(
+        compilado.decision_function(textos), pipeline.decision_function(textos), rtol=0, atol=TOLERANCIA_PARIDADE
+    )
+
+
+@pytest.mark.parametrize("texto", TEXTOS_AVULSOS)
+def test_previsao_igual_em_texto_avulso(pipeline, compilado, texto):
+    assert list(compilado.predict([texto])) == list(pipeline.predict([texto]))
+    np.testing.assert_allclose(
+        compilado.decision_function([texto]), pipeline.decision_function([texto]), rtol=0, atol=TOLERANCIA_PARIDADE
+    )
+
+
+def test_salvar_e_carregar_mantem_previsoes(tmp_path, dados, pipeline, compilado):
+    caminho = str(tmp_path / "modelo.npz")
+    compilado.salvar(caminho)
+    carregado = ModeloCompilado.carregar(caminho)
+    textos = dados[0] + TEXTOS_AVULSOS
+    assert list(carregado.predict(textos)) == list(pipeline.predict(textos))
+
+
+def test_compilar_artefato_confere_paridade():
+    artefato = construir_artefato(ARQUIVO_DADOS)
+    compilado = compilar_artefato(artefato, ARQUIVO_DADOS)
+    assert compilado is not None
+    assert compilado.metadados["hash_dados"] == artefato["hash_dados"]
+
+
+def test_modelo_incremental_nao_e_compilado(dados):
+    with pytest.raises(ValueError):
+        exportar(treinar_pipeline(*dados, tipo=TIPO_INCREMENTAL))
+    assert compilar_artefato({"tipo": TIPO_INCREMENTAL}, ARQUIVO_DADOS) is None
@@ -0,0 +1,62 @@
+"""Trabalhos de triagem de arquivos do Gateway."""
+
+import asyncio
+import io
+import json
+import time
+from email.utils import formatdate
+
+import pytest
+from fastapi import HTTPException
+
+from trabalhos import ESTADO_CONCLUIDO, GerenciadorTrabalhos, espera_retry_after
+
+
+class Upload:
+    """O mínimo do UploadFile usado pelo gerenciador: `read(n)` assíncrono."""
+
+    def __init__(self, conteudo: bytes):
+        self._arquivo = io.BytesIO(conteudo)
+
+    async def read(self, tamanho: int) -> bytes:
+        return self._arquivo.read(tamanho)
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    (None, 4.0),
+    ("3", 3.0),
+    ("0.5", 0.5),
+    ("-2", 0.0),
+    ("depois", 4.0),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+])
+def test_espera_retry_after(valor, esperado):
+    assert espera_retry_after(valor, 4.0) == esperado
+
+
+def test_espera_retry_after_com_data_futura():
+    assert 8 <= espera_retry_after(formatdate(time.time() + 10, usegmt=True), 4.0) <= 10
+
+
+def test_trabalho_tolera_retry_after_em_data_http(tmp_path):
+    chamadas = []
+
+    async def processar_bloco(textos):
+        chamadas.append(len(textos))
+        if len(chamadas) == 1:
+            raise HTTPException(status_code=503, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        return [json.dumps({"texto": texto}).encode() for texto in textos]
+
+    async def rodar():
+        gerenciador = GerenciadorTrabalhos(str(tmp_path), processar_bloco, tamanho_bloco=2)
+        trabalho = await gerenciador.criar(Upload(b"texto_sintomas\nfebre\ntosse\ndor de cabeca\n"), "casos.csv", None)
+        await trabalho.tarefa
+        await gerenciador.fechar()
+        return trabalho
+
+    trabalho = asyncio.run(rodar())
+    assert trabalho.estado == ESTADO_CONCLUIDO
+    assert (trabalho.linhas_processadas, trabalho.linhas_com_erro) == (3, 0)
+    assert chamadas == [2, 2, 1]
+    with open(trabalho.caminho_resultado, "rb") as resultado:
+        assert len(resultado.read().splitlines()) == 3
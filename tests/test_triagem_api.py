@@ -0,0 +1,78 @@
+"""Endpoints do Agente de Triagem."""
+
+import importlib.util
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import RAIZ
+
+
+@pytest.fixture(scope="module")
+def triagem():
+    # Carregado pelo caminho: os três serviços têm um módulo `main`.
+    spec = importlib.util.spec_from_file_location("main_triagem", os.path.join(RAIZ, "agente_triagem", "main.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.fixture
+def cliente(triagem):
+    return TestClient(triagem.app)
+
+
+@pytest.mark.parametrize("rota", ["/modelo/recarregar", "/modelo/casos-rotulados"])
+def test_endpoints_administrativos_desativados_sem_token_configurado(triagem, cliente, monkeypatch, rota):
+    monkeypatch.setattr(triagem, "TOKEN_ADMIN", "")
+    resposta = cliente.post(rota, json={"casos": [{"texto": "dor", "urgencia": "alta"}]})
+    assert resposta.status_code == 403
+
+
+@pytest.mark.parametrize("cabecalhos", [{}, {"X-Token-Admin": "errado"}])
+@pytest.mark.parametrize("rota", ["/modelo/recarregar", "/modelo/casos-rotulados"])
+def test_endpoints_administrativos_exigem_token(triagem, cliente, monkeypatch, rota, cabecalhos):
+    monkeypatch.setattr(triagem, "TOKEN_ADMIN", "segredo")
+    versao = triagem.gerenciador_modelo.versao
+    resposta = cliente.post(rota, json={"casos": [{"texto": "dor", "urgencia": "alta"}]}, headers=cabecalhos)
+    assert resposta.status_code == 401
+    assert triagem.gerenciador_modelo.versao == versao
+
+
+def test_recarga_com_token_valido(triagem, cliente, monkeypatch):
+    monkeypatch.setattr(triagem, "TOKEN_ADMIN", "segredo")
+    resposta = cliente.post("/modelo/recarregar", headers={"X-Token-Admin": "segredo"})
+    assert resposta.status_code == 200
+    assert resposta.json()["versao"] == triagem.gerenciador_modelo.versao
+
+
+class ModeloQueTrocaAoPrever:
+    """Simula uma troca de modelo durante a previsão."""
+
+    def __init__(self, gerenciador, novo_artefato):
+        self.gerenciador = gerenciador
+        self.novo_artefato = novo_artefato
+
+    def predict(self, textos):
+        self.gerenciador.artefato = self.novo_artefato
+        return ["baixa"] * len(textos)
+
+
+@pytest.fixture
+def troca_durante_previsao(triagem, monkeypatch):
+    gerenciador = triagem.gerenciador_modelo
+    monkeypatch.setattr(gerenciador, "artefato", dict(gerenciador.artefato))
+    novo = {**gerenciador.artefato, "versao": "nova"}
+    gerenciador.artefato["versao"] = "antiga"
+    gerenciador.artefato["modelo"] = ModeloQueTrocaAoPrever(gerenciador, novo)
+
+
+def test_resposta_informa_o_modelo_que_previu(cliente, troca_durante_previsao):
+    resposta = cliente.post("/triagem", json={"texto_sintomas": "estou com uma coceira leve no braço"})
+    assert resposta.json()["versao_modelo"] == "antiga"
+
+
+def test_lote_informa_o_modelo_que_previu(cliente, troca_durante_previsao):
+    resposta = cliente.post("/triagem/lote", json={"textos_sintomas": ["coceira leve no braço", "unha encravada"]})
+    assert [item["versao_modelo"] for item in resposta.json()["resultados"]] == ["antiga", "antiga"]